@@ -0,0 +1,201 @@
+#!/usr/bin/env python3.5
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import statistics
+import urllib.request
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+# Compares the CPU usage and latency of the player handoff modes (see lsgui_lib.transport.HANDOFF_MODES).
+# The script plays all of the roles: the stream's server, a stub livestreamer that hands the stream over to the
+# player the way the mode's options make livestreamer do it, and a stub player that reads the stream and notes
+# when the first byte arrived. In passthrough mode the player fetches the stream itself.
+
+CHUNK_SIZE = 64 * 1024
+MODES = ("stdout", "passthrough", "fifo", "http")
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+	"""Serves the stream's bytes, optionally at a limited rate, like a CDN serving segments."""
+
+	def do_GET(self):
+		size, rate = self.server.stream_size, self.server.stream_rate
+		chunk = b"\x47" * CHUNK_SIZE	# The MPEG-TS sync byte
+		self.send_response(200)
+		self.send_header("Content-Type", "video/mp2t")
+		self.send_header("Content-Length", str(size))
+		self.end_headers()
+		started = time.monotonic()
+		sent = 0
+		try:
+			while sent < size:
+				data = chunk[:min(CHUNK_SIZE, size - sent)]
+				self.wfile.write(data)
+				sent += len(data)
+				if rate:
+					delay = started + sent / rate - time.monotonic()
+					if delay > 0:
+						time.sleep(delay)
+		except OSError:
+			pass
+
+	def log_message(self, format, *args):
+		pass
+
+
+def get_cpu_time():
+	times = os.times()
+	return times.user + times.system
+
+def report(role, **values):
+	values["role"] = role
+	sys.stderr.write("BENCHMARK {}\n".format(json.dumps(values)))
+	sys.stderr.flush()
+
+def copy_stream(source, destination):
+	for data in iter(lambda: source.read(CHUNK_SIZE), b""):
+		destination.write(data)
+
+def run_player(path):
+	"""The stub player: reads the stream from stdin ("-"), a file or a URL."""
+	if path == "-":
+		source = sys.stdin.buffer
+	elif path.startswith("http"):
+		source = urllib.request.urlopen(path)
+	else:
+		source = open(path, "rb")
+	first_byte = None
+	received = 0
+	for data in iter(lambda: source.read(CHUNK_SIZE), b""):
+		if first_byte is None:
+			first_byte = time.time()
+		received += len(data)
+	report("player", first_byte=first_byte, bytes=received, cpu=get_cpu_time())
+
+def run_livestreamer(mode, url, player):
+	"""The stub livestreamer: downloads the stream and hands it over to the player like livestreamer does in the mode."""
+	player = player.split()
+	if mode == "passthrough":
+		subprocess.call(player + [url])
+	elif mode == "stdout":
+		process = subprocess.Popen(player + ["-"], stdin=subprocess.PIPE)
+		try:
+			copy_stream(urllib.request.urlopen(url), process.stdin)
+		except BrokenPipeError:
+			pass
+		process.stdin.close()
+		process.wait()
+	elif mode == "fifo":
+		directory = tempfile.mkdtemp()
+		fifo = os.path.join(directory, "stream")
+		os.mkfifo(fifo)
+		process = subprocess.Popen(player + [fifo])
+		try:
+			with open(fifo, "wb") as f:
+				copy_stream(urllib.request.urlopen(url), f)
+		except BrokenPipeError:
+			pass
+		process.wait()
+		shutil.rmtree(directory)
+	elif mode == "http":
+		class PlayerHandler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				self.send_response(200)
+				self.send_header("Content-Type", "video/mp2t")
+				self.end_headers()
+				try:
+					copy_stream(urllib.request.urlopen(url), self.wfile)
+				except OSError:
+					pass
+
+			def log_message(self, format, *args):
+				pass
+
+		server = HTTPServer(("127.0.0.1", 0), PlayerHandler)
+		threading.Thread(target=server.handle_request, daemon=True).start()
+		subprocess.call(player + ["http://127.0.0.1:{}/".format(server.server_address[1])])
+		server.server_close()
+	# The CPU time of livestreamer itself, without the player's, which the player reports
+	report("livestreamer", cpu=get_cpu_time())
+
+def benchmark_mode(mode, url, runs):
+	script = os.path.abspath(__file__)
+	player = "{} {} --role player".format(sys.executable, script)
+	results = []
+	for run in range(runs):
+		started = time.time()
+		process = subprocess.Popen([sys.executable, script, "--role", "livestreamer", "--mode", mode, "--url", url, "--player", player], stderr=subprocess.PIPE)
+		_, output = process.communicate()
+		finished = time.time()
+		values = {}
+		for line in output.decode("utf-8", "replace").splitlines():
+			if line.startswith("BENCHMARK "):
+				message = json.loads(line[10:])
+				values[message["role"]] = message
+		if process.returncode != 0 or "player" not in values or values["player"]["first_byte"] is None:
+			raise RuntimeError("The {} run failed:\n{}".format(mode, output.decode("utf-8", "replace")))
+		results.append({
+			"latency": values["player"]["first_byte"] - started,
+			"duration": finished - started,
+			"livestreamer_cpu": values["livestreamer"]["cpu"],
+			"player_cpu": values["player"]["cpu"],
+			"bytes": values["player"]["bytes"],
+		})
+	return results
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Compares the CPU usage and latency of the player handoff modes with a stub livestreamer and player.")
+	parser.add_argument("--size", type=int, default=200, metavar="MB", help="How much of the stream is played per run (default: %(default)s)")
+	parser.add_argument("--rate", type=float, default=0, metavar="MB/S", help="Limit the stream's rate, like a live stream; 0 for no limit (default: %(default)s)")
+	parser.add_argument("--runs", type=int, default=3, help="How many runs per mode; the medians are reported (default: %(default)s)")
+	parser.add_argument("--modes", default=",".join(MODES), help="The modes to compare (default: %(default)s)")
+	parser.add_argument("--role", choices=("livestreamer", "player"), help=argparse.SUPPRESS)
+	parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+	parser.add_argument("--url", help=argparse.SUPPRESS)
+	parser.add_argument("--player", help=argparse.SUPPRESS)
+	parser.add_argument("path", nargs="?", help=argparse.SUPPRESS)
+	return parser.parse_args()
+
+if __name__ == "__main__":
+	args = parse_arguments()
+	if args.role == "player":
+		run_player(args.path)
+		sys.exit(0)
+	if args.role == "livestreamer":
+		run_livestreamer(args.mode, args.url, args.player)
+		sys.exit(0)
+
+	modes = [mode for mode in args.modes.split(",") if mode]
+	if platform.system() == "Windows" and "fifo" in modes:
+		print("Skipping the fifo mode, which needs named pipes of the Unix kind.")
+		modes.remove("fifo")
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+	server.stream_size = args.size * 1024 * 1024
+	server.stream_rate = args.rate * 1024 * 1024
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	url = "http://127.0.0.1:{}/stream.ts".format(server.server_address[1])
+
+	print("{} MB per run, {}, median of {} run(s)".format(args.size, "{} MB/s".format(args.rate) if args.rate else "unlimited rate", args.runs))
+	row_format = "{:<12} {:>12} {:>10} {:>18} {:>12} {:>10}"
+	print(row_format.format("mode", "latency", "duration", "livestreamer CPU", "player CPU", "MB/s"))
+	for mode in modes:
+		results = benchmark_mode(mode, url, args.runs)
+		median = lambda name: statistics.median(result[name] for result in results)
+		print(row_format.format(mode, "{:.1f} ms".format(median("latency") * 1000), "{:.2f} s".format(median("duration")),
+			"{:.2f} s".format(median("livestreamer_cpu")), "{:.2f} s".format(median("player_cpu")),
+			"{:.1f}".format(median("bytes") / median("duration") / 1024 / 1024)))
+	server.shutdown()
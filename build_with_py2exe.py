@@ -1,8 +1,8 @@
-#!/usr/bin/env python3.4
+#!/usr/bin/env python3.5
 # -*- coding: utf-8 -*-
 
-# Requires: py -3.4 -m pip install livestreamer PyQt5
-# Execute with: py -3.4 build_with_py2exe.py py2exe
+# Requires: py -3.5 -m pip install livestreamer PyQt5
+# Execute with: py -3.5 build_with_py2exe.py py2exe
 
 import os.path, site
 MY_SITE_PACKAGES = site.getsitepackages().pop()
@@ -19,7 +19,7 @@ setup(
 				"optimize": 2,
 				"compressed": True,
 				"bundle_files": 2,
-				"includes": ["sip", "PyQt5.QtCore", "PyQt5.QtGui"]
+				"includes": ["sip", "PyQt5.QtCore", "PyQt5.QtGui", "PyQt5.QtNetwork"]
 			}
 		},
 		data_files = [
@@ -1,16 +1,115 @@
-#!/usr/bin/env python3.4
+#!/usr/bin/env python3.5
 # -*- coding: utf-8 -*-
 
+import time
+STARTED = time.perf_counter()	# A profiled startup is timed from here on, before anything else is imported
+
 import sys
-from PyQt5.QtWidgets import QApplication
+import argparse
+
+from lsgui_lib.startup_profile import StartupProfiler
+
+EXIT_OVER_BUDGET = 3	# Exit code of --profile-startup when the startup took longer than --startup-budget
 
-from lsgui_lib.database import Config
-from lsgui_lib.gui import MainWindow
-from lsgui_lib.constants import DBVERSION
 
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="A GUI for Livestreamer. If the GUI is already running, the command is passed on to it.")
+	parser.add_argument("--profile-startup", action="store_true", help="Time the phases of the startup, write a report and quit")
+	parser.add_argument("--profile-report", default="startup_profile.txt", metavar="PATH", help="Where the startup report is written (default: %(default)s)")
+	parser.add_argument("--profile-calls", action="store_true", help="Add the function calls taking the most time (cProfile) to the startup report")
+	parser.add_argument("--trace-memory", action="store_true", help="Add the peak memory of each phase (tracemalloc) to the startup report")
+	parser.add_argument("--startup-budget", type=float, metavar="MS", help="Exit with code {} if the profiled startup takes longer than this".format(EXIT_OVER_BUDGET))
+	parser.add_argument("--telemetry-report", action="store_true", help="Print the percentiles of the recorded probe, player start and session times and quit")
+	parser.add_argument("--telemetry-days", type=int, default=30, metavar="DAYS", help="How many days back the telemetry report covers (default: %(default)s)")
+	subparsers = parser.add_subparsers(dest="command")
+	play_parser = subparsers.add_parser("play", help="Play a channel")
+	play_parser.add_argument("channel", help="The name of the channel")
+	play_parser.add_argument("quality", nargs="?", help="The stream quality; the default quality is used if not given")
+	play_parser.add_argument("--streamer", help="The streamer of the channel, if several have a channel with the name")
+	return parser.parse_args()
+
+def print_telemetry_report(days):
+	import sqlite3
+	from lsgui_lib.constants import CONFIGFILE
+	from lsgui_lib.telemetry import get_telemetry_report
+	try:
+		connection = sqlite3.connect("file:{}?mode=ro".format(CONFIGFILE), uri=True)
+		print(get_telemetry_report(connection, days), end="")
+	except sqlite3.Error as e:
+		print("Failed to read the telemetry: {}".format(str(e)), file=sys.stderr)
+		return 1
+	return 0
 
 if __name__ == "__main__":
+	# The helper processes of the GUI are started as modules of the interpreter, but a frozen build (py2exe)
+	# has none, so there they're started as the GUI's own executable with one of these arguments
+	if len(sys.argv) > 1 and sys.argv[1] == "--supervisor":
+		from lsgui_lib.supervisor import main
+		sys.exit(main(sys.argv[2:]))
+	if len(sys.argv) > 1 and sys.argv[1] == "--probe-daemon":
+		from lsgui_lib.probe_daemon import main
+		sys.exit(main())
+	args = parse_arguments()
+	if args.telemetry_report:
+		sys.exit(print_telemetry_report(args.telemetry_days))
+	if args.command == "play":
+		message = {"command": "play", "channel": args.channel, "quality": args.quality, "streamer": args.streamer}
+	else:
+		message = {"command": "show"}
+	profiler = StartupProfiler(args.profile_startup, args.profile_calls, args.trace_memory, STARTED)
+	profiler.mark("Script imports and argument parsing")
+
+	# Hand the command over to a running instance before the database or the GUI is touched.
+	# A profiled startup is always a cold one, and leaves the running instance alone.
+	from lsgui_lib.single_instance import send_to_running_instance
+	profiler.mark("Import single_instance (QtCore, QtNetwork)")
+	if not args.profile_startup and send_to_running_instance(message):
+		sys.exit(0)
+
+	from PyQt5.QtWidgets import QApplication
+	profiler.mark("Import PyQt5")
+
+	from lsgui_lib.database import Config
+	from lsgui_lib.gui import MainWindow
+	from lsgui_lib.single_instance import InstanceServer
+	from lsgui_lib.constants import DBVERSION
+	profiler.mark("Import lsgui_lib")
+
+	app = QApplication(sys.argv[:1])
+	profiler.mark("QApplication")
+	if not args.profile_startup:
+		# Listen before the database is opened, so that an instance started at the same time
+		# hands its command over instead of opening (and migrating) the database alongside this one
+		instance_server = InstanceServer()
+		listening = instance_server.listen()
+		if not listening and send_to_running_instance(message):
+			# Another instance started at the same time, and got to listen first
+			sys.exit(0)
+		if not listening:
+			error = "Failed to listen for other instances: {}".format(instance_server.server.errorString())
+			print(error, file=sys.stderr)
+
 	config = Config(DBVERSION)
-	app = QApplication(sys.argv)
+	profiler.mark("Config (VACUUM, ANALYZE, cache cleaning)")
+	if args.profile_startup:
+		window = MainWindow(config, profiler)
+		app.processEvents()
+		profiler.mark("First event loop iteration")
+		profiler.stop()
+		window.on_close_override()
+
+		profiler.write_report(args.profile_report, args.startup_budget)
+		print("Startup took {:.1f} ms; the report is in {}".format(profiler.total_time, args.profile_report))
+		if args.startup_budget is not None and profiler.is_over_budget(args.startup_budget):
+			print("The startup budget of {} ms was exceeded!".format(args.startup_budget), file=sys.stderr)
+			sys.exit(EXIT_OVER_BUDGET)
+		sys.exit(0)
+
+	app.aboutToQuit.connect(instance_server.close)
 	window = MainWindow(config)
+	if not listening:
+		window.insertText("{}. Starting the GUI again opens another window instead of this one.".format(error))
+	instance_server.messageReceived.connect(window.handle_instance_message)
+	if message["command"] == "play":
+		window.handle_instance_message(message)
 	sys.exit(app.exec_())
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+STATUS_TEXT = {
+	200: "OK",
+	202: "Accepted",
+	400: "Bad Request",
+	403: "Forbidden",
+	404: "Not Found",
+	405: "Method Not Allowed",
+	409: "Conflict",
+	500: "Internal Server Error",
+	502: "Bad Gateway",
+	503: "Service Unavailable",
+}
+
+class EventLoopThread(threading.Thread):
+	"""Runs an asyncio event loop next to the Qt event loop, so network servers never block the GUI thread."""
+
+	def __init__(self):
+		super().__init__(daemon=True)
+		self.loop = asyncio.new_event_loop()
+		self.started = threading.Event()
+
+	def run(self):
+		asyncio.set_event_loop(self.loop)
+		self.loop.call_soon(self.started.set)
+		self.loop.run_forever()
+		self.loop.close()
+
+	def start(self):
+		super().start()
+		self.started.wait()
+
+	def submit(self, coroutine):
+		"""Schedules the coroutine on the loop from any thread and returns a concurrent.futures.Future."""
+		return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+	def call(self, callback, *args):
+		self.loop.call_soon_threadsafe(callback, *args)
+
+	def stop(self, timeout=5):
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		self.join(timeout)
+
+
+class HTTPError(Exception):
+	def __init__(self, status, message=None):
+		super().__init__(message or STATUS_TEXT.get(status, ""))
+		self.status = status
+
+
+class Request(object):
+	def __init__(self, method, target, headers, body):
+		self.method = method
+		self.target = target
+		parts = urlsplit(target)
+		self.path = parts.path
+		self.query = dict((name, values[-1]) for name, values in parse_qs(parts.query).items())
+		self.headers = headers	# Lowercased names
+		self.body = body
+
+	@property
+	def keep_alive(self):
+		return self.headers.get("connection", "").lower() != "close"
+
+
+async def read_request(reader, max_body_size=1024 * 1024):
+	"""Reads one HTTP/1.1 request, or returns None if the client closed the connection."""
+	line = await reader.readline()
+	if not line:
+		return None
+	try:
+		method, target, version = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+	except ValueError:
+		raise HTTPError(400)
+	headers = {}
+	while True:
+		line = await reader.readline()
+		if line in (b"\r\n", b"\n", b""):
+			break
+		name, _, value = line.decode("latin-1").partition(":")
+		headers[name.strip().lower()] = value.strip()
+	try:
+		length = int(headers.get("content-length") or 0)
+	except ValueError:
+		raise HTTPError(400)
+	if length > max_body_size:
+		raise HTTPError(400, "Request body too large")
+	body = await reader.readexactly(length) if length else b""
+	return Request(method.upper(), target, headers, body)
+
+def write_head(writer, status, content_type=None, length=None, headers=None, keep_alive=True):
+	lines = ["HTTP/1.1 {} {}".format(status, STATUS_TEXT.get(status, ""))]
+	if content_type is not None:
+		lines.append("Content-Type: {}".format(content_type))
+	if length is not None:
+		lines.append("Content-Length: {}".format(length))
+	lines.append("Connection: {}".format("keep-alive" if keep_alive else "close"))
+	for name, value in (headers or {}).items():
+		lines.append("{}: {}".format(name, value))
+	writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+async def send_response(writer, status, body=b"", content_type="text/plain; charset=utf-8", headers=None, keep_alive=True, drain_timeout=None):
+	if isinstance(body, str):
+		body = body.encode("utf-8")
+	write_head(writer, status, content_type, len(body), headers, keep_alive)
+	writer.write(body)
+	await drain(writer, drain_timeout)
+
+async def drain(writer, timeout=None):
+	"""Waits until the client has taken the buffered data. A client that is too slow gets a TimeoutError."""
+	if timeout is None:
+		await writer.drain()
+	else:
+		await asyncio.wait_for(writer.drain(), timeout)
@@ -0,0 +1,56 @@
+import os
+import re
+import stat
+import platform
+import subprocess
+
+# The flags worth reporting when an executable is checked; all flags found in the help are stored
+NOTABLE_FLAGS = ("--json", "--player-passthrough", "--player-http", "--player-fifo", "--player-external-http", "--stream-url",
+	"--hls-segment-threads", "--ringbuffer-size", "--hls-live-edge", "--stream-timeout", "--http-timeout")
+
+FLAG_PATTERN = re.compile(r"(?<![\w-])(--[a-z0-9][a-z0-9-]*)")
+VERSION_PATTERN = re.compile(r"\d+(?:\.\d+)+\S*")
+
+class ExecutableCapabilities(object):
+	"""What an executable is and supports, as found by running it, for a given modification time of its file."""
+
+	__slots__ = ("path", "mtime", "version", "flags")
+
+	def __init__(self, path, mtime, version=None, flags=()):
+		self.path = path
+		self.mtime = mtime
+		self.version = version
+		self.flags = frozenset(flags)
+
+	def supports(self, flag):
+		return flag in self.flags
+
+	def describe(self):
+		notable = [flag for flag in NOTABLE_FLAGS if flag in self.flags]
+		version = "version {}".format(self.version) if self.version else "unknown version"
+		return "{}; supports {}".format(version, ", ".join(notable)) if notable else version
+
+
+def get_executable_mtime(path):
+	"""Returns the modification time of the executable's file. Raises OSError if it's not a file."""
+	result = os.stat(path)
+	if not stat.S_ISREG(result.st_mode):
+		raise OSError("Not a file: {}".format(path))
+	return result.st_mtime
+
+def run_for_output(arguments, timeout):
+	startup_info = None
+	if platform.system() == "Windows":
+		startup_info = subprocess.STARTUPINFO()
+		startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
+	result = subprocess.run(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, startupinfo=startup_info)
+	return result.stdout.decode("utf-8", "replace")
+
+def probe_executable(path, timeout=15):
+	"""Runs livestreamer with --version and --help, and returns its ExecutableCapabilities. Only meant for livestreamer:
+	other programs, such as players, may open a window or not exit at all. Blocks, so it's meant to be run outside the
+	GUI thread. Raises OSError or subprocess.SubprocessError if it can't be run."""
+	mtime = get_executable_mtime(path)
+	match = VERSION_PATTERN.search(run_for_output([path, "--version"], timeout))
+	flags = FLAG_PATTERN.findall(run_for_output([path, "--help"], timeout))
+	return ExecutableCapabilities(path, mtime, match.group(0) if match is not None else None, flags)
@@ -1,6 +1,7 @@
 APPVERSION = "0.2.4"
-DBVERSION = 4			# Make sure this is an integer
+DBVERSION = 25			# Make sure this is an integer
 MANDATORY_DBVERSION = 4 # What version of the database has to be used for the application to run at all
 
 CONFIGFILE = "config.db"
 IMAGESROOT = "images"
+SUPERVISOR_KEYFILE = "supervisor.key"
@@ -0,0 +1,255 @@
+import re
+import json
+import shlex
+import asyncio
+import concurrent.futures
+from urllib.parse import unquote
+
+from PyQt5 import QtCore
+
+from .aio import HTTPError, read_request, send_response, write_head, drain
+
+class GUIBridge(QtCore.QObject):
+	"""Runs functions in the GUI thread on behalf of the event loop thread. Qt widgets and the Config connection may only be used from the GUI thread."""
+
+	request = QtCore.pyqtSignal(object)
+
+	def __init__(self, parent=None):
+		super().__init__(parent)	# Must be created in the GUI thread
+		self.request.connect(self.run_request, QtCore.Qt.QueuedConnection)
+
+	def run_request(self, item):
+		function, args, future = item
+		if not future.set_running_or_notify_cancel():
+			return
+		try:
+			future.set_result(function(*args))
+		except Exception as e:
+			future.set_exception(e)
+
+	def call(self, function, *args):
+		"""Returns an asyncio future of the function's result. Call from the event loop thread only."""
+		future = concurrent.futures.Future()
+		self.request.emit((function, args, future))
+		return asyncio.wrap_future(future)
+
+
+class ControlServer(object):
+	"""A JSON API for controlling the GUI from scripts, served from the event loop thread.
+
+	GET  /streamers                             The streamers
+	GET  /streamers/<streamer>/channels         The channels of a streamer
+	GET  /streamers/<streamer>/channels/<channel>/streams
+	                                            The channel's streams, probed unless they're cached
+	POST /streamers/<streamer>/channels/<channel>/streams
+	                                            Probe the channel's streams again, and return them
+	GET  /session                               The running session, or null
+	POST /session                               Start a session: {"streamer", "channel", "quality", "mode"}
+	POST /session/stop                          Stop the running session
+	GET  /log                                   The session log as server-sent events, one line per event
+
+	Only requests with the bound address in the Host header are served, so that a web page can't reach
+	the API through a DNS name of its own that resolves to the loopback address.
+	"""
+
+	keepalive_interval = 15		# How often an idle event stream gets a comment line in seconds
+	log_queue_size = 1000		# How many log lines a client can fall behind before it's dropped
+
+	STREAMS_PATH = re.compile(r"^/streamers/([^/]+)/channels/([^/]+)/streams$")
+	CHANNELS_PATH = re.compile(r"^/streamers/([^/]+)/channels$")
+
+	def __init__(self, loop_thread, window, host="127.0.0.1", port=0, socket_path=None, client_timeout=10):
+		self.loop_thread = loop_thread
+		self.window = window
+		self.bridge = GUIBridge()
+		self.host = host
+		self.port = port
+		self.socket_path = socket_path	# A Unix socket is used instead of TCP if given
+		self.client_timeout = client_timeout
+		self.server = None
+		self.connections = set()
+
+	def get_allowed_hosts(self):
+		"""The values of the Host header the server answers to, or None for a Unix socket, which web pages can't reach."""
+		if self.socket_path:
+			return None
+		host = "[{}]".format(self.host) if ":" in self.host else self.host
+		return {"{}:{}".format(host, self.port), "localhost:{}".format(self.port)}
+
+	@property
+	def address(self):
+		return self.socket_path if self.socket_path else "http://{}:{}/".format(self.host, self.port)
+
+	def start(self):
+		self.loop_thread.submit(self.start_server()).result()
+
+	async def start_server(self):
+		if self.socket_path:
+			self.server = await asyncio.start_unix_server(self.handle_client, self.socket_path)
+		else:
+			self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+			self.port = self.server.sockets[0].getsockname()[1]
+
+	def stop(self):
+		if self.server is not None:
+			self.loop_thread.submit(self.stop_server()).result()
+
+	async def stop_server(self):
+		self.server.close()
+		for writer in self.connections:
+			writer.close()
+		await self.server.wait_closed()
+		self.server = None
+
+	async def handle_client(self, reader, writer):
+		self.connections.add(writer)
+		try:
+			while True:
+				try:
+					request = await read_request(reader)
+					if request is None:
+						break
+					allowed_hosts = self.get_allowed_hosts()
+					if allowed_hosts is not None and request.headers.get("host", "").lower() not in allowed_hosts:
+						raise HTTPError(403, "Unexpected Host header")
+					if request.path == "/log" and request.method == "GET":
+						await self.stream_log(writer)
+						break
+					status, result = await self.handle_request(request)
+					await self.send_json(writer, status, result, request.keep_alive)
+				except HTTPError as e:
+					await self.send_json(writer, e.status, {"error": str(e)}, False)
+					break
+				if not request.keep_alive:
+					break
+		except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+			pass
+		finally:
+			self.connections.discard(writer)
+			writer.close()
+
+	async def send_json(self, writer, status, result, keep_alive):
+		body = json.dumps(result).encode("utf-8")
+		await send_response(writer, status, body, "application/json", keep_alive=keep_alive, drain_timeout=self.client_timeout)
+
+	async def handle_request(self, request):
+		path = unquote(request.path.rstrip("/")) or "/"
+		if request.method == "POST":
+			# Browsers can't send JSON to another origin without asking first, so a web page can't drive the GUI
+			if not request.headers.get("content-type", "").startswith("application/json"):
+				raise HTTPError(400, "The request body must be JSON")
+			try:
+				body = json.loads(request.body.decode("utf-8") or "{}")
+			except ValueError:
+				raise HTTPError(400, "Invalid JSON")
+			if path == "/session":
+				return 202, await self.bridge.call(self.start_session, body)
+			if path == "/session/stop":
+				return 200, await self.bridge.call(self.window.stop_session)
+			match = self.STREAMS_PATH.match(path)
+			if match is not None:
+				return 200, await self.get_streams(match.group(1), match.group(2), True)
+			raise HTTPError(404)
+		if request.method != "GET":
+			raise HTTPError(405)
+
+		if path == "/streamers":
+			return 200, await self.bridge.call(self.get_streamers)
+		if path == "/session":
+			return 200, await self.bridge.call(self.window.get_session_state)
+		match = self.CHANNELS_PATH.match(path)
+		if match is not None:
+			return 200, await self.bridge.call(self.get_channels, match.group(1))
+		match = self.STREAMS_PATH.match(path)
+		if match is not None:
+			return 200, await self.get_streams(match.group(1), match.group(2), False)
+		raise HTTPError(404)
+
+	# These run in the GUI thread
+
+	def get_streamers(self):
+		return [{"name": streamer["name"], "url": streamer["url"], "favorite": bool(streamer["favorite"])} for streamer in self.window.config.get_streamers()]
+
+	def get_channels(self, streamer_name):
+		if self.window.config.get_streamer(streamer_name) is None:
+			raise HTTPError(404, "No such streamer")
+		return [{"name": channel["name"], "url": channel["url"], "favorite": bool(channel["favorite"])} for channel in self.window.config.get_streamer_channels(streamer_name)]
+
+	def get_or_probe_streams(self, streamer_name, channel_name, refresh):
+		"""Returns the cached streams, or a future of the probed streams and their metadata."""
+		config = self.window.config
+		streamer = config.get_streamer(streamer_name)
+		channel = config.get_streamer_channel(streamer_name, channel_name) if streamer is not None else None
+		if channel is None:
+			raise HTTPError(404, "No such channel")
+		if not refresh:
+			streams = config.get_quality_from_cache(streamer_name, channel_name)
+			if len(streams) > 0:
+				return streams, None
+		url = self.window.get_channel_url(streamer, channel)
+		command = None
+		if self.window.get_prober().needs_command:
+			livestreamer = config.get_config_value("livestreamer-path")
+			if not livestreamer:
+				raise HTTPError(503, "Livestreamer path is not configured")
+			command = shlex.split(config.get_config_value("probe-command-format").format(livestreamer=livestreamer, url=url))
+		return None, self.window.start_probe(streamer, channel, url, command, refresh)
+
+	def cache_streams(self, streamer_name, channel_name, streams, metadata):
+		self.window.config.clean_quality_cache(streamer_name, channel_name, True)
+		if streams:
+			self.window.config.add_quality_to_cache(streamer_name, channel_name, streams, metadata)
+
+	def start_session(self, body):
+		for name in ("streamer", "channel"):
+			if not isinstance(body.get(name), str):
+				raise HTTPError(400, "'{}' is required".format(name))
+		error = self.window.play_channel(body["channel"], body.get("quality"), body["streamer"], body.get("mode"))
+		if error is not None:
+			raise HTTPError(409, error)
+		return {"streamer": body["streamer"], "channel": body["channel"]}
+
+	# These run in the event loop thread
+
+	async def get_streams(self, streamer_name, channel_name, refresh):
+		streams, future = await self.bridge.call(self.get_or_probe_streams, streamer_name, channel_name, refresh)
+		if streams is None:
+			try:
+				streams, metadata = await asyncio.wrap_future(future)
+			except Exception as e:
+				raise HTTPError(502, "Probing failed; {}".format(str(e)))
+			await self.bridge.call(self.cache_streams, streamer_name, channel_name, streams, metadata)
+		return streams
+
+	async def stream_log(self, writer):
+		loop = asyncio.get_event_loop()
+		queue = asyncio.Queue(self.log_queue_size)
+		overflowed = []
+
+		def put(text):
+			try:
+				queue.put_nowait(text)
+			except asyncio.QueueFull:
+				overflowed.append(True)
+
+		def listener(text):
+			# Called in the GUI thread for every piece of text written to the log
+			loop.call_soon_threadsafe(put, text)
+
+		write_head(writer, 200, "text/event-stream; charset=utf-8", headers={"Cache-Control": "no-cache"}, keep_alive=False)
+		await drain(writer, self.client_timeout)
+		# Appending to and removing from a list is atomic, and the GUI thread iterates over a copy of it
+		self.window.log_listeners.append(listener)
+		try:
+			partial = ""
+			while not overflowed:
+				try:
+					text = await asyncio.wait_for(queue.get(), self.keepalive_interval)
+				except asyncio.TimeoutError:
+					writer.write(b": keepalive\n\n")
+				else:
+					*lines, partial = (partial + text).split("\n")
+					writer.write("".join("data: {}\n\n".format(line) for line in lines).encode("utf-8"))
+				await drain(writer, self.client_timeout)
+		finally:
+			self.window.log_listeners.remove(listener)
@@ -1,18 +1,24 @@
+import json
 import sqlite3
+from contextlib import contextmanager
 import os.path
 import shutil
 from datetime import datetime
 from .constants import CONFIGFILE
 from .database_migrations import DatabaseMigrations
+from .transport import TRANSPORT_COLUMNS
 
 class Config(object):
 	"""Reads and writes config data to an SQLite database."""
 	INITIAL_DBVERSION = 1
+	UPDATE_TRANSPORT_PROFILE = "UPDATE transport_profile SET {} WHERE channel_id = :channel_id".format(", ".join("{0} = :{0}".format(column) for column in TRANSPORT_COLUMNS))
 
 	connection = None
 
 	def __init__(self, dbversion):
 		self.expected_version = dbversion
+		self.batch_depth = 0
+		self.deferred_values = {}	# Write-behind config values, name => value
 
 		do_db_init = False
 		if not os.path.exists(CONFIGFILE):
@@ -60,6 +66,34 @@ class Config(object):
 		self.do_connect()
 		return backup_file
 
+	def commit(self):
+		"""Commits the writes made so far, unless they are part of a batch, which commits them at its end."""
+		if self.batch_depth > 0:
+			return
+		if self.deferred_values:
+			self.write_config_values(self.deferred_values)
+			self.deferred_values = {}
+		self.connection.commit()
+
+	@contextmanager
+	def batch(self):
+		"""Groups the writes made in the with block into a single transaction. Batches can be nested; the outermost one commits, or rolls back on an exception."""
+		self.batch_depth += 1
+		try:
+			yield self
+		except:
+			self.batch_depth -= 1
+			if self.batch_depth == 0:
+				self.connection.rollback()
+			raise
+		self.batch_depth -= 1
+		self.commit()
+
+	def flush(self):
+		"""Writes the write-behind config values to the database."""
+		if self.deferred_values:
+			self.commit()
+
 	def init_db(self):
 		"""Initializes the database."""
 		self.init_config_tables()
@@ -73,7 +107,6 @@ class Config(object):
 		# Create the config table
 		c.execute("CREATE TABLE config (name TEXT PRIMARY KEY, intval INTEGER, strval TEXT)")
 
-		c.execute("BEGIN")
 		# Populate the config table with integer data
 		c.execute("INSERT INTO config (name, intval) VALUES ('db-version', :version)", {"version": self.INITIAL_DBVERSION})
 		values = [
@@ -101,7 +134,7 @@ class Config(object):
 			"('button-foreground-delete', '#BD0B0E')",
 			]
 		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
-		self.connection.commit()
+		self.commit()
 		c.close()
 
 	def init_streamer_tables(self):
@@ -116,11 +149,10 @@ class Config(object):
 		c.execute("CREATE UNIQUE INDEX channel_unique_url ON channel(streamer_id, url)")
 		c.execute("CREATE INDEX channel_streamer_id ON channel(streamer_id)")
 		
-		c.execute("BEGIN")
 		# Add streamers
 		c.execute("INSERT INTO streamer VALUES (null, 'twitch.tv', 'http://www.twitch.tv', 'twitch.gif', 1)")
 		# c.execute("INSERT INTO streamer VALUES (null, 'Youtube', 'https://www.youtube.com/something', 'youtube.gif', 0)")
-		self.connection.commit()
+		self.commit()
 
 		c.close()
 
@@ -134,6 +166,8 @@ class Config(object):
 
 	def get_config_value(self, name):
 		"""Gets the value of a named config option. The return is either an integer or a string."""
+		if name in self.deferred_values:
+			return self.deferred_values[name]
 		c = self.connection.cursor()
 		c.execute("SELECT intval, strval FROM config WHERE name = :name", {"name": name})
 		row = c.fetchone()
@@ -145,18 +179,37 @@ class Config(object):
 		else:
 			return row['strval']
 
-	def set_config_value(self, name, value):
-		"""Sets an existing config option's value. Be sure to use the correct type!"""
+	def get_config_values(self, names):
+		"""Gets the values of several config options with a single query. Returns a dict of the names and values."""
 		c = self.connection.cursor()
-		s = ["UPDATE config SET"]
-		if type(value) is int:
-			s.append("intval")
-		else:
-			s.append("strval")
-		s.append("= :value WHERE name = :name")
-		c.execute("BEGIN")
-		c.execute(' '.join(s), {"name": name, "value": value})
-		self.connection.commit()
+		c.execute("SELECT name, intval, strval FROM config WHERE name IN ({})".format(",".join("?" * len(names))), list(names))
+		values = {}
+		for row in c:
+			values[row["name"]] = row["intval"] if row["intval"] is not None else row["strval"]
+		c.close()
+		for name in names:
+			if name in self.deferred_values:
+				values[name] = self.deferred_values[name]
+		return values
+
+	def set_config_value(self, name, value, deferred=False):
+		"""Sets an existing config option's value. Be sure to use the correct type!
+
+		A deferred value isn't worth a write of its own; it's written along with the next commit or flush."""
+		if deferred:
+			self.deferred_values[name] = value
+			return
+		self.deferred_values.pop(name, None)
+		self.write_config_values({name: value})
+		self.commit()
+
+	def write_config_values(self, values):
+		c = self.connection.cursor()
+		for name, value in values.items():
+			if type(value) is int:
+				c.execute("UPDATE config SET intval = :value WHERE name = :name", {"name": name, "value": value})
+			else:
+				c.execute("UPDATE config SET strval = :value WHERE name = :name", {"name": name, "value": value})
 		c.close()
 
 	def get_streamer(self, name):
@@ -166,55 +219,108 @@ class Config(object):
 		c.close()
 		return row
 
+	def get_streamer_by_id(self, streamer_id):
+		c = self.connection.cursor()
+		c.execute("SELECT * FROM streamer WHERE id = :id", {"id": streamer_id})
+		row = c.fetchone()
+		c.close()
+		return row
+
+	def set_streamer_status_api_url(self, streamer_name, url):
+		"""Sets the base URL of the streamer's live status API, or None to probe its channels one by one."""
+		c = self.connection.cursor()
+		c.execute("UPDATE streamer SET status_api_url = :url WHERE name = :name", {"url": url or None, "name": streamer_name})
+		self.commit()
+		c.close()
+
 	def get_streamers(self, only_favorite=False):
 		"""Gets all streamers or only the favorite one."""
 		c = self.connection.cursor()
-		s = ["SELECT * FROM streamer"]
 		if only_favorite:
-			s.append("WHERE favorite")
-		s.append("ORDER BY name")
-		c.execute(' '.join(s))
+			c.execute("SELECT * FROM streamer WHERE favorite ORDER BY name")
+		else:
+			c.execute("SELECT * FROM streamer ORDER BY name")
 		rows = c.fetchall()
 		c.close()
 		return rows[0] if only_favorite else rows
 
 	def get_streamer_channel(self, streamer_name, channel_name):
+		return self.get_channel_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def get_channel_by_id(self, channel_id):
 		c = self.connection.cursor()
-		c.execute("SELECT * FROM channel WHERE streamer_id = (SELECT streamer_id FROM streamer WHERE name = :streamer_name LIMIT 1) AND name = :channel_name", {"streamer_name": streamer_name, "channel_name": channel_name})
+		c.execute("SELECT * FROM channel WHERE id = :id", {"id": channel_id})
 		row = c.fetchone()
 		c.close()
 		return row
 
 	def get_streamer_channels(self, streamer_name):
+		streamer = self.get_streamer(streamer_name)
+		return self.get_streamer_channels_by_id(streamer["id"]) if streamer is not None else []
+
+	def get_streamer_channels_by_id(self, streamer_id):
+		"""Gets the streamer's channels ordered by name."""
 		c = self.connection.cursor()
-		c.execute("SELECT * FROM channel WHERE streamer_id = (SELECT id FROM streamer WHERE name = :streamer_name LIMIT 1)", {"streamer_name": streamer_name})
+		c.execute("SELECT * FROM channel WHERE streamer_id = :streamer_id ORDER BY name", {"streamer_id": streamer_id})
 		rows = c.fetchall()
 		c.close()
 		return rows
 
 	def get_channel_id(self, streamer_name, channel_name):
 		c = self.connection.cursor()
-		c.execute("SELECT id FROM channel WHERE streamer_id = (SELECT id FROM streamer WHERE name = :streamer_name LIMIT 1) AND name = :channel_name", {"channel_name": channel_name, "streamer_name": streamer_name})
+		c.execute("SELECT channel.id FROM streamer JOIN channel ON channel.streamer_id = streamer.id WHERE streamer.name = :streamer_name AND channel.name = :channel_name", {"channel_name": channel_name, "streamer_name": streamer_name})
 		row = c.fetchone()
 		c.close()
 		return row["id"] if row else None
 
-	def add_quality_to_cache(self, streamer_name, channel_name, stream_qualities):
-		streamer_id = self.get_streamer(streamer_name)["id"]
-		channel_id = self.get_channel_id(streamer_name, channel_name)
+	def add_quality_to_cache(self, streamer_name, channel_name, stream_qualities, metadata=None):
+		self.add_quality_to_cache_by_id(self.get_channel_id(streamer_name, channel_name), stream_qualities, metadata)
+
+	def add_quality_to_cache_by_id(self, channel_id, stream_qualities, metadata=None):
+		"""Caches the channel's qualities in the given order, optionally with a dict of metadata about them."""
 		c = self.connection.cursor()
-		c.execute("BEGIN")
-		for name in stream_qualities:
-			c.execute("INSERT INTO quality_cache (streamer_id, channel_id, name) VALUES (:streamer_id, :channel_id, :name)", {"streamer_id": streamer_id, "channel_id": channel_id, "name": name})
-		self.connection.commit()
+		if self.get_config_value("db-version") >= 13:
+			c.execute("INSERT OR REPLACE INTO quality_cache (channel_id, qualities, metadata, expires) VALUES (:channel_id, :qualities, :metadata, datetime(CURRENT_TIMESTAMP, '+' || :cache_live_time || ' minutes'))", {
+				"channel_id": channel_id,
+				"qualities": json.dumps(list(stream_qualities)),
+				"metadata": json.dumps(metadata) if metadata is not None else None,
+				"cache_live_time": self.get_config_value("quality-cache-persistance"),
+				})
+		else:
+			streamer_id = self.get_channel_by_id(channel_id)["streamer_id"]
+			for name in stream_qualities:
+				c.execute("INSERT INTO quality_cache (streamer_id, channel_id, name) VALUES (:streamer_id, :channel_id, :name)", {"streamer_id": streamer_id, "channel_id": channel_id, "name": name})
+		self.commit()
 		c.close()
 
+	def get_quality_cache_entry(self, streamer_name, channel_name):
+		return self.get_quality_cache_entry_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def get_quality_cache_entry_by_id(self, channel_id, max_stale=0):
+		"""Gets the channel's unexpired cache entry as a dict with the qualities and metadata, or None. With max_stale, an entry
+		that expired at most that many minutes ago is returned too, with "stale" set."""
+		if self.get_config_value("db-version") < 13:
+			streams = self.get_quality_from_cache_by_id(channel_id)
+			return {"qualities": streams, "metadata": {}, "stale": False} if streams else None
+		c = self.connection.cursor()
+		c.execute("""SELECT qualities, metadata, expires, expires <= CURRENT_TIMESTAMP AS stale FROM quality_cache
+			WHERE channel_id = :channel_id AND expires > datetime(CURRENT_TIMESTAMP, '-' || :max_stale || ' minutes')""", {"channel_id": channel_id, "max_stale": max_stale})
+		row = c.fetchone()
+		c.close()
+		if row is None:
+			return None
+		return {"qualities": json.loads(row["qualities"]), "metadata": json.loads(row["metadata"]) if row["metadata"] else {}, "expires": row["expires"], "stale": bool(row["stale"])}
+
 	def get_quality_from_cache(self, streamer_name, channel_name):
-		streamer_id = self.get_streamer(streamer_name)["id"]
-		channel_id = self.get_channel_id(streamer_name, channel_name)
+		return self.get_quality_from_cache_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def get_quality_from_cache_by_id(self, channel_id):
+		if self.get_config_value("db-version") >= 13:
+			entry = self.get_quality_cache_entry_by_id(channel_id)
+			return entry["qualities"] if entry is not None else []
 		cache_live_time = self.get_config_value("quality-cache-persistance")
 		c = self.connection.cursor()
-		c.execute("SELECT name FROM quality_cache WHERE streamer_id = :streamer_id AND channel_id = :channel_id AND timestamp > datetime(CURRENT_TIMESTAMP, '-' || :cache_live_time || ' minutes')", {"streamer_id": streamer_id, "channel_id": channel_id, "cache_live_time": cache_live_time})
+		c.execute("SELECT name FROM quality_cache WHERE channel_id = :channel_id AND timestamp > datetime(CURRENT_TIMESTAMP, '-' || :cache_live_time || ' minutes')", {"channel_id": channel_id, "cache_live_time": cache_live_time})
 		streams = []
 		for row in c:
 			streams.append(row["name"])
@@ -222,50 +328,56 @@ class Config(object):
 		return streams
 
 	def clean_quality_cache(self, streamer_name=None, channel_name=None, ignore_timestamp=False):
+		channel_id = None
 		if channel_name is not None and streamer_name is not None:
 			channel_id = self.get_channel_id(streamer_name, channel_name)
-			streamer_id = self.get_streamer(streamer_name)["id"]
-		else:
-			channel_id = None
-			streamer_id = None
-		cache_live_time = self.get_config_value("quality-cache-persistance")
+			if channel_id is None:
+				return
+		self.clean_quality_cache_by_id(channel_id, ignore_timestamp)
+
+	def clean_quality_cache_by_id(self, channel_id=None, ignore_timestamp=False):
+		"""Removes the expired cache entries, of the channel or all channels. With ignore_timestamp, the entries are removed whether expired or not.
+		From version 24 on, the expired entries are kept for quality-cache-max-stale minutes, to be shown while they're refreshed."""
 		c = self.connection.cursor()
-		c.execute("BEGIN")
-		s = ["DELETE FROM quality_cache"]
-		if not ignore_timestamp:
-			if len(s) == 1:
-				s.append("WHERE")
-			s.append("timestamp < datetime(CURRENT_TIMESTAMP, '-' || :cache_live_time || ' minutes')")
-		if streamer_id is not None and channel_id is not None:
-			if len(s) == 1:
-				s.append("WHERE")
-			else:
-				s.append("AND")
-			s.append("streamer_id = :streamer_id AND channel_id = :channel_id")
-		c.execute(' '.join(s), {"streamer_id": streamer_id, "channel_id": channel_id, "cache_live_time": cache_live_time})
-		self.connection.commit()
+		max_stale = 0
+		if self.get_config_value("db-version") >= 24:
+			max_stale = self.get_config_value("quality-cache-max-stale")
+		if self.get_config_value("db-version") >= 13:
+			expired = "expires <= datetime(CURRENT_TIMESTAMP, '-' || :max_stale || ' minutes')"
+		else:
+			expired = "timestamp < datetime(CURRENT_TIMESTAMP, '-' || :cache_live_time || ' minutes')"
+		values = {"channel_id": channel_id, "cache_live_time": self.get_config_value("quality-cache-persistance"), "max_stale": max_stale}
+		if channel_id is None and ignore_timestamp:
+			c.execute("DELETE FROM quality_cache")
+		elif channel_id is None:
+			c.execute("DELETE FROM quality_cache WHERE " + expired, values)
+		elif ignore_timestamp:
+			c.execute("DELETE FROM quality_cache WHERE channel_id = :channel_id", values)
+		else:
+			c.execute("DELETE FROM quality_cache WHERE channel_id = :channel_id AND " + expired, values)
+		self.commit()
 		c.close()
 
 	def set_favorite_streamer(self, streamer_name):
 		c = self.connection.cursor()
-		c.execute("BEGIN")
 		c.execute("UPDATE streamer SET favorite = 0")
 		c.execute("UPDATE streamer SET favorite = 1 WHERE name = :streamer_name", {"streamer_name": streamer_name})
-		self.connection.commit()
+		self.commit()
 		c.close()
 
 	def set_favorite_channel(self, streamer_name, channel_name):
-		channel_id = self.get_channel_id(streamer_name, channel_name)
+		self.set_favorite_channel_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def set_favorite_channel_by_id(self, channel_id):
+		"""Makes the channel the favorite of its streamer."""
 		c = self.connection.cursor()
-		c.execute("BEGIN")
-		c.execute("UPDATE channel SET favorite = 0 WHERE streamer_id = (SELECT id FROM streamer WHERE name = :streamer_name LIMIT 1)", {"streamer_name": streamer_name})
-		c.execute("UPDATE channel SET favorite = 1 WHERE id = :channel_id AND streamer_id = (SELECT id FROM streamer WHERE name = :streamer_name LIMIT 1)", {"streamer_name": streamer_name, "channel_id": channel_id})
-		self.connection.commit()
+		c.execute("UPDATE channel SET favorite = (id = :channel_id) WHERE streamer_id = (SELECT streamer_id FROM channel WHERE id = :channel_id)", {"channel_id": channel_id})
+		self.commit()
 		c.close()
 
 	def get_channel_by_url(self, streamer_name, url):
 		c = self.connection.cursor()
-		c.execute("SELECT * FROM channel WHERE streamer_id = (SELECT id FROM streamer WHERE name = :streamer_name LIMIT 1) AND url = :url", {"streamer_name": streamer_name, "url":url})
+		c.execute("SELECT channel.* FROM streamer JOIN channel ON channel.streamer_id = streamer.id WHERE streamer.name = :streamer_name AND channel.url = :url", {"streamer_name": streamer_name, "url": url})
 		row = c.fetchone()
 		c.close()
 		return row
@@ -277,20 +389,23 @@ class Config(object):
 		self.add_update_channel(streamer_name, channel_name, url, favorite, old_name, old_url, op="update")
 
 	def delete_channel(self, streamer_name, channel_name):
-		"""Removes the channel from the database."""
-		streamer = self.get_streamer(streamer_name)
-		channel_id = self.get_channel_id(streamer_name, channel_name)
+		self.delete_channel_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def delete_channel_by_id(self, channel_id):
+		"""Removes the channel from the database, along with its cached qualities and transport profile."""
 		c = self.connection.cursor()
-		c.execute("BEGIN")
-		c.execute("DELETE FROM quality_cache WHERE streamer_id = :streamer_id AND channel_id = :channel_id", {"streamer_id": streamer["id"], "channel_id": channel_id})
-		c.execute("DELETE FROM channel WHERE streamer_id = :streamer_id AND name = :channel_name", {"streamer_id": streamer["id"], "channel_name": channel_name})
-		self.connection.commit()
+		if self.get_config_value("db-version") < 18:
+			# Before version 18 the dependent rows aren't deleted along with the channel
+			c.execute("DELETE FROM quality_cache WHERE channel_id = :channel_id", {"channel_id": channel_id})
+			if self.get_config_value("db-version") >= 9:
+				c.execute("DELETE FROM transport_profile WHERE channel_id = :channel_id", {"channel_id": channel_id})
+		c.execute("DELETE FROM channel WHERE id = :channel_id", {"channel_id": channel_id})
+		self.commit()
 		c.close()
 
 	def add_update_channel(self, streamer_name, channel_name, url, favorite, old_name=None, old_url=None, op="add"):
 		streamer = self.get_streamer(streamer_name)
 		c = self.connection.cursor()
-		c.execute("BEGIN")
 		if op == "add":
 			c.execute("INSERT INTO channel (name, url, streamer_id) VALUES (:name, :url, :streamer_id)", {
 				"name": channel_name.strip(),
@@ -305,12 +420,77 @@ class Config(object):
 				"old_name": old_name,
 				"old_url": old_url,
 				})
-		self.connection.commit()
+		self.commit()
 		c.close()
 
 		if favorite:
 			self.set_favorite_channel(streamer_name, channel_name)
 
+	def get_transport_profile(self, streamer_name, channel_name):
+		return self.get_transport_profile_by_id(self.get_channel_id(streamer_name, channel_name))
+
+	def get_transport_profile_by_id(self, channel_id):
+		"""Gets the channel's transport profile, or None if it doesn't have one."""
+		c = self.connection.cursor()
+		c.execute("SELECT * FROM transport_profile WHERE channel_id = :channel_id", {"channel_id": channel_id})
+		row = c.fetchone()
+		c.close()
+		return row
+
+	def set_transport_profile(self, streamer_name, channel_name, profile):
+		self.set_transport_profile_by_id(self.get_channel_id(streamer_name, channel_name), profile)
+
+	def set_transport_profile_by_id(self, channel_id, profile):
+		"""Sets the given values (a dict with keys from TRANSPORT_COLUMNS, and handoff) of the channel's transport profile."""
+		c = self.connection.cursor()
+		c.execute("INSERT OR IGNORE INTO transport_profile (channel_id) VALUES (:channel_id)", {"channel_id": channel_id})
+		# The columns not in the profile keep their values, which allows a single fixed statement
+		current = self.get_transport_profile_by_id(channel_id)
+		values = dict((column, profile[column] if column in profile else current[column]) for column in TRANSPORT_COLUMNS)
+		values["channel_id"] = channel_id
+		c.execute(self.UPDATE_TRANSPORT_PROFILE, values)
+		if "handoff" in profile:
+			# Added in version 22, so it's only set when given
+			c.execute("UPDATE transport_profile SET handoff = :handoff WHERE channel_id = :channel_id", {"channel_id": channel_id, "handoff": profile["handoff"]})
+		self.commit()
+		c.close()
+
+	def add_transport_statistics(self, streamer_name, channel_name, stall_rate, segment_latency, weight=0.3):
+		self.add_transport_statistics_by_id(self.get_channel_id(streamer_name, channel_name), stall_rate, segment_latency, weight)
+
+	def add_transport_statistics_by_id(self, channel_id, stall_rate, segment_latency, weight=0.3):
+		"""Folds a finished session's stalls per minute and average segment latency into the channel's moving averages."""
+		c = self.connection.cursor()
+		c.execute("INSERT OR IGNORE INTO transport_profile (channel_id) VALUES (:channel_id)", {"channel_id": channel_id})
+		c.execute("""UPDATE transport_profile SET
+			stall_rate = CASE WHEN stall_rate IS NULL THEN :stall_rate ELSE stall_rate * (1 - :weight) + :stall_rate * :weight END,
+			segment_latency = CASE WHEN :segment_latency IS NULL THEN segment_latency WHEN segment_latency IS NULL THEN :segment_latency ELSE segment_latency * (1 - :weight) + :segment_latency * :weight END,
+			sessions = sessions + 1
+			WHERE channel_id = :channel_id""", {"channel_id": channel_id, "stall_rate": stall_rate, "segment_latency": segment_latency, "weight": weight})
+		self.commit()
+		c.close()
+
+	def get_executable_capabilities(self, path, mtime):
+		"""Gets the cached capabilities of the executable as a dict with the version and the flags, or None if they were found for another version of its file."""
+		c = self.connection.cursor()
+		c.execute("SELECT version, flags FROM executable_capabilities WHERE path = :path AND mtime = :mtime", {"path": path, "mtime": mtime})
+		row = c.fetchone()
+		c.close()
+		if row is None:
+			return None
+		return {"version": row["version"], "flags": json.loads(row["flags"])}
+
+	def set_executable_capabilities(self, path, mtime, version, flags):
+		c = self.connection.cursor()
+		c.execute("INSERT OR REPLACE INTO executable_capabilities (path, mtime, version, flags) VALUES (:path, :mtime, :version, :flags)", {
+			"path": path,
+			"mtime": mtime,
+			"version": version,
+			"flags": json.dumps(sorted(flags)),
+			})
+		self.commit()
+		c.close()
+
 	def is_migration_needed(self):
 		return self.get_config_value("db-version") < self.expected_version
 
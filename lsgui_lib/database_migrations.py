@@ -1,4 +1,5 @@
 import sys
+import json
 
 class DatabaseMigrations(object):
 	def __init__(self, config):
@@ -60,3 +61,401 @@ class DatabaseMigrations(object):
 
 		self.config.connection.commit()
 		c.close()
+
+	def migration_to_version_5(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('recording-rotate-size', 0)", # Value is in megabytes, 0 disables rotation by size
+			"('recording-rotate-time', 0)", # Value is in minutes, 0 disables rotation by time
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('record-command-format', '{livestreamer} --stdout \"{url}\" \"{quality}\"')",
+			"('player-stdin-command-format', '\"{player}\" -')",
+			"('recording-directory', 'recordings')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_6(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('session-log-enabled', 1)",
+			"('session-log-max-size', 16)", # Value is in megabytes
+			"('session-log-keep-files', 20)",
+			"('session-log-compress', 1)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('session-log-directory', 'logs')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_7(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('collect-stream-metrics', 0)", # The debug output of livestreamer it needs costs CPU, so it's opt-in
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_8(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('auto-quality-headroom', 150)", # Value is in percent of the quality's bitrate
+			"('auto-quality-stall-limit', 3)",
+			"('auto-quality-stall-window', 60)", # Value is in seconds!
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('stream-url-command-format', '{livestreamer} --stream-url \"{url}\" \"{quality}\"')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_9(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# Livestreamer's transport options per channel; NULL means livestreamer's default is used
+		c.execute("CREATE TABLE transport_profile (channel_id INTEGER PRIMARY KEY, hls_segment_threads INTEGER, ringbuffer_size INTEGER, hls_live_edge INTEGER, stream_timeout INTEGER, http_timeout INTEGER, auto_tune BOOLEAN NOT NULL DEFAULT 0, sessions INTEGER NOT NULL DEFAULT 0, stall_rate REAL, segment_latency REAL, FOREIGN KEY (channel_id) REFERENCES channel(id))")
+
+		# Add the transport placeholder to the command formats, unless the user has changed them
+		c.execute("UPDATE config SET strval = :new WHERE name = 'command-format' AND strval = :old", {
+			"old": '{livestreamer} --player="{player}" "{url}" "{quality}"',
+			"new": '{livestreamer} {transport} --player="{player}" "{url}" "{quality}"',
+			})
+		c.execute("UPDATE config SET strval = :new WHERE name = 'record-command-format' AND strval = :old", {
+			"old": '{livestreamer} --stdout "{url}" "{quality}"',
+			"new": '{livestreamer} {transport} --stdout "{url}" "{quality}"',
+			})
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_10(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('max-warm-standbys', 1)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('standby-command-format', '{livestreamer} {transport} --player-external-http --player-external-http-port {port} \"{url}\" \"{quality}\"')",
+			"('player-url-command-format', '\"{player}\" \"{url}\"')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_11(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('proxy-port', 8480)",
+			"('proxy-cache-size', 64)",
+			"('proxy-client-timeout', 10)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('proxy-bind-address', '127.0.0.1')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_12(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('control-api-enabled', 0)",
+			"('control-api-port', 8481)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('control-api-socket', '')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_13(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# Replace the row-per-quality cache with a row per channel, holding the qualities as a JSON list
+		c.execute("BEGIN")
+		c.execute("CREATE TABLE quality_cache_compact (channel_id INTEGER PRIMARY KEY, qualities TEXT NOT NULL, metadata TEXT, expires DATETIME NOT NULL, FOREIGN KEY (channel_id) REFERENCES channel(id))")
+		cached = {}
+		c.execute("SELECT channel_id, name, timestamp FROM quality_cache ORDER BY channel_id, name")
+		for row in c.fetchall():
+			qualities, oldest = cached.get(row["channel_id"], ([], row["timestamp"]))
+			qualities.append(row["name"])
+			cached[row["channel_id"]] = (qualities, min(oldest, row["timestamp"]))
+		cache_live_time = self.config.get_config_value("quality-cache-persistance")
+		for channel_id, (qualities, timestamp) in cached.items():
+			c.execute("INSERT INTO quality_cache_compact (channel_id, qualities, expires) VALUES (:channel_id, :qualities, datetime(:timestamp, '+' || :cache_live_time || ' minutes'))", {"channel_id": channel_id, "qualities": json.dumps(qualities), "timestamp": timestamp, "cache_live_time": cache_live_time})
+		c.execute("DROP TABLE quality_cache")
+		c.execute("ALTER TABLE quality_cache_compact RENAME TO quality_cache")
+		c.execute("CREATE INDEX quality_cache_expires ON quality_cache(expires)")
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_14(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('watchdog-enabled', 0)",
+			"('watchdog-threshold', 500)", # Value is in milliseconds
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('watchdog-log', 'diagnostics.log')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_15(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('probe-backend', 'auto')", # One of 'auto', 'in-process', 'daemon' (added in version 16) or 'subprocess'
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_16(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('probe-daemon-max-requests', 200)", # How many probes a probe daemon makes before it's replaced
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_17(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# The base URL of the API telling which of the streamer's channels are live; NULL means the channels are probed one by one
+		c.execute("ALTER TABLE streamer ADD COLUMN status_api_url TEXT")
+
+		values = [
+			"('status-cache-ttl', 60)", # Value is in seconds
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		values = [
+			"('status-api-client-id', '')",
+			"('status-api-token', '')",
+			]
+		c.execute("INSERT INTO config (name, strval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_18(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		c.execute("BEGIN")
+		# Config values are read by name all the time; without a rowid the primary key index holds the values too
+		c.execute("CREATE TABLE config_by_name (name TEXT PRIMARY KEY, intval INTEGER, strval TEXT) WITHOUT ROWID")
+		c.execute("INSERT INTO config_by_name (name, intval, strval) SELECT name, intval, strval FROM config")
+		c.execute("DROP TABLE config")
+		c.execute("ALTER TABLE config_by_name RENAME TO config")
+
+		# Deleting a channel deletes its cached qualities and transport profile
+		c.execute("CREATE TABLE quality_cache_cascade (channel_id INTEGER PRIMARY KEY, qualities TEXT NOT NULL, metadata TEXT, expires DATETIME NOT NULL, FOREIGN KEY (channel_id) REFERENCES channel(id) ON DELETE CASCADE)")
+		c.execute("INSERT INTO quality_cache_cascade SELECT channel_id, qualities, metadata, expires FROM quality_cache WHERE channel_id IN (SELECT id FROM channel)")
+		c.execute("DROP TABLE quality_cache")
+		c.execute("ALTER TABLE quality_cache_cascade RENAME TO quality_cache")
+		c.execute("CREATE INDEX quality_cache_expires ON quality_cache(expires)")
+
+		c.execute("CREATE TABLE transport_profile_cascade (channel_id INTEGER PRIMARY KEY, hls_segment_threads INTEGER, ringbuffer_size INTEGER, hls_live_edge INTEGER, stream_timeout INTEGER, http_timeout INTEGER, auto_tune BOOLEAN NOT NULL DEFAULT 0, sessions INTEGER NOT NULL DEFAULT 0, stall_rate REAL, segment_latency REAL, FOREIGN KEY (channel_id) REFERENCES channel(id) ON DELETE CASCADE)")
+		c.execute("INSERT INTO transport_profile_cascade SELECT * FROM transport_profile WHERE channel_id IN (SELECT id FROM channel)")
+		c.execute("DROP TABLE transport_profile")
+		c.execute("ALTER TABLE transport_profile_cascade RENAME TO transport_profile")
+
+		# The channel list of a streamer is read from the index alone, in name order; the unique indexes cover the other lookups
+		c.execute("CREATE INDEX channel_listing ON channel(streamer_id, name, id, url, favorite)")
+		c.execute("DROP INDEX channel_streamer_id")
+		c.execute("DROP INDEX channel_unique_name_url")
+		# Without statistics the planner may prefer the smaller unique index
+		c.execute("ANALYZE")
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_19(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# Durations are in seconds; the events of a deleted channel still count in the totals
+		c.execute("CREATE TABLE telemetry (id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, kind TEXT NOT NULL, channel_id INTEGER, duration REAL, success BOOLEAN, exit_code INTEGER, FOREIGN KEY (channel_id) REFERENCES channel(id) ON DELETE SET NULL)")
+		c.execute("CREATE INDEX telemetry_timestamp ON telemetry(timestamp)")
+		c.execute("CREATE INDEX telemetry_channel_id ON telemetry(channel_id)")
+
+		values = [
+			"('telemetry-enabled', 1)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_20(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		values = [
+			"('supervisor-enabled', 0)",
+			"('supervisor-log-lines', 500)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_21(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# One row per executable; a new modification time of the file means it has to be checked again
+		c.execute("CREATE TABLE executable_capabilities (path TEXT PRIMARY KEY, mtime REAL NOT NULL, version TEXT, flags TEXT NOT NULL, checked DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP) WITHOUT ROWID")
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_22(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# One of the modes of transport.HANDOFF_MODES
+		c.execute("ALTER TABLE transport_profile ADD COLUMN handoff TEXT NOT NULL DEFAULT 'auto'")
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_23(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# The delays and the stable time are in seconds
+		values = [
+			"('reconnect-enabled', 1)",
+			"('reconnect-max-attempts', 5)",
+			"('reconnect-initial-delay', 2)",
+			"('reconnect-max-delay', 60)",
+			"('reconnect-stable-time', 120)",
+			"('reconnect-reprobe', 1)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_24(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# How many minutes past its expiry a cached quality list is still shown while it's refreshed; 0 shows only unexpired lists
+		values = [
+			"('quality-cache-max-stale', 1440)",
+			]
+		c.execute("INSERT INTO config (name, intval) VALUES {}".format(','.join(values)))
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
+
+	def migration_to_version_25(self):
+		version = sys._getframe().f_code.co_name.split("_")[-1]
+		c = self.config.connection.cursor()
+
+		# Stream metrics used to be collected by default, with no way to turn them off; they're opt-in now
+		c.execute("UPDATE config SET intval = 0 WHERE name = 'collect-stream-metrics'")
+
+		c.execute("UPDATE config SET intval = :version WHERE name = 'db-version'", {"version": version})
+
+		self.config.connection.commit()
+		c.close()
@@ -1,45 +1,122 @@
 import sys
+import re
+import time
 import shlex
 import os
 import os.path
+import socket
+import threading
+import subprocess
 
 from urllib.parse import urljoin
 from datetime import datetime
 
 from PyQt5.QtWidgets import QApplication, qApp, QWidget, QMainWindow, QMessageBox, QAction, QDesktopWidget, QVBoxLayout, QGridLayout, QLabel, QComboBox, QPushButton, QTextEdit, QDialog, QSystemTrayIcon, QMenu
-from PyQt5.QtGui import QIcon, QTextCursor, QWindowStateChangeEvent, QFont
+from PyQt5.QtGui import QTextCursor, QWindowStateChangeEvent, QFont
 from PyQt5 import QtCore
 from PyQt5.QtCore import Qt
 
-from .worker import LivestreamerWorker
-from .gui_dialogs import AddEditChannelsDialog, AppConfigDialog
+from .worker import MetricEvent, LivestreamerWorker, LivestreamerRecordingWorker, ThroughputProbeWorker, StandbyWorker, StreamUrlWorker, PlayerWorker, SupervisedWorker
+from .recorder import StreamRecorder
+from .session_log import SessionLogWriter, SessionLogSearcher
+from .procstat import SessionResourceSampler
+from .metrics import SessionMetrics, format_rate
+from .quality import AUTO_QUALITY, choose_quality, lower_quality
+from .transport import TransportAutoTuner, get_transport_arguments, get_handoff_arguments, choose_handoff
+from .probe import parse_stream_list, StreamProber
+from .live_status import TwitchStatusProvider, LiveStatusError
+from .icons import get_icon
+from .startup_profile import StartupProfiler
+from .watchdog import StallWatchdog
+from .telemetry import TelemetryWriter, get_telemetry_report
+from .supervisor import SupervisorClient, SupervisorError
+from .reconnect import ReconnectPolicy, classify_exit
+from .capabilities import ExecutableCapabilities, get_executable_mtime, probe_executable
+from .standby import StandbyPool, WarmStandby, get_free_port
+from .aio import EventLoopThread
+from .hls_proxy import HLSProxy
+from .control_api import ControlServer
+from . import procstat
 from .constants import *
 
 class MainWindow(QMainWindow):
 	"""The main GUI application."""
-	def __init__(self, config):
-		"""Initializer for the GUI widgets. Pass in an instance of Config class, so that it may interact with the config."""
+
+	streamsProbed = QtCore.pyqtSignal(object)	# (channel id, channel name, future of StreamProber.probe()), from the probing threads
+	streamsRevalidated = QtCore.pyqtSignal(object)	# The same, for the refreshes of stale cached streams
+	reconnectProbed = QtCore.pyqtSignal(object)	# (session, future of StreamProber.probe()), from the probing threads
+	executableProbed = QtCore.pyqtSignal(object)	# (path, mtime, ExecutableCapabilities or the exception), from the checking threads
+
+	def __init__(self, config, profiler=None):
+		"""Initializer for the GUI widgets. Pass in an instance of Config class, so that it may interact with the config.
+		The phases of the startup are marked in the StartupProfiler, if one is given."""
 		super().__init__()
 
 		self.config = config
+		self.profiler = profiler if profiler is not None else StartupProfiler()
 
 		self.setWindowTitle("Livestreamer GUI v{}".format(APPVERSION))
 
+		self.session_log = None
+		self.setup_session_log()
+		self.profiler.mark("Session log")
+
 		self.setup_systray()
+		self.profiler.mark("System tray")
 		self.setup_menu()
 		self.setup_geometry()
+		self.profiler.mark("Menu and geometry")
 
 		self.livestreamer_thread = None
 		self.thread_exit_grace_time = 10000 # How long a thread can take to exit in milliseconds
+		self.resource_sample_interval = 1000 # How often the session's processes are sampled in milliseconds
+		self.resource_sampler = None
+		self.resource_timer = QtCore.QTimer(self)
+		self.resource_timer.timeout.connect(self.sample_session_resources)
+		self.measured_throughput_lifetime = 1800 # How long a throughput test is used for automatic quality selection in seconds
+		self.session = None
+		self.session_metrics = None
+		self.measured_throughput = {}	# (streamer name, channel name) => (bytes per second, monotonic time) of the channel's latest throughput test
+		self.min_tuning_session_length = 1 # How long a session must run to be used for transport auto-tuning in minutes
+		self.transport_tuner = TransportAutoTuner()
+		self.standby_pool = StandbyPool()
+		self.pending_standby = None
+		self.event_loop_thread = None
+		self.hls_proxy = None
+		self.control_server = None
+		self.watchdog = None
+		self.watchdog_timer = QtCore.QTimer(self)
+		self.watchdog_timer.timeout.connect(self.watchdog_heartbeat)
+		self.watchdog_interval = 100 # How often the event loop reports to the stall watchdog in milliseconds
+		self.log_listeners = []		# Functions called with all text written to the log
+		self.dialogs = {}	# Dialog class name => the dialog, which is reused
+		self.pending_play = None	# (streamer name, channel name, quality) to play once the channel's streams are loaded
+		self.prober = None
+		self.pending_probe = None	# (channel id, time.monotonic() when started) of the probe run by a LivestreamerWorker
+		self.telemetry = None
+		self.supervisor = None		# SupervisorClient of the session supervisor, once connected
+		self.status_providers = {}	# (streamer name, status API URL) => TwitchStatusProvider
+		self.executable_capabilities = {}	# Path => (mtime, ExecutableCapabilities or None if it couldn't be run); the mtime is None while it's being checked
+		self.streamsProbed.connect(self.handle_probed_streams, QtCore.Qt.QueuedConnection)
+		self.streamsRevalidated.connect(self.handle_revalidated_streams, QtCore.Qt.QueuedConnection)
+		self.executableProbed.connect(self.handle_probed_executable, QtCore.Qt.QueuedConnection)
+		self.reconnectProbed.connect(self.handle_reconnect_probe, QtCore.Qt.QueuedConnection)
+		self.pending_reconnect = None	# The dropped session waiting to be started again
+		self.reconnect_timer = QtCore.QTimer(self)
+		self.reconnect_timer.setSingleShot(True)
+		self.reconnect_timer.timeout.connect(self.reconnect_session)
 		self.timestamp_format = self.config.get_config_value("timestamp-format")
 
 		self.setup_control_widgets()
 		self.update_colors()
+		self.profiler.mark("Control widgets")
 
 		# Load all streaming-related data
 		self.selections = {"streamer": None, "channel": None}
 		self.load_streamers()
+		self.profiler.mark("Load streamers")
 		self.load_channels(self.streamer_input.currentText())
+		self.profiler.mark("Load channels and streams")
 		
 		# Do the first configuration, if the application was run for the first time
 		self.do_init_config()
@@ -49,16 +126,38 @@ class MainWindow(QMainWindow):
 
 		self.close_override = False
 		self.show_hide_systray()
+		self.profiler.mark("Show window")
 
 		self.check_and_do_database_migration()
+		self.profiler.mark("Database migration check")
+		self.setup_control_api()
+		self.profiler.mark("Control API")
+		self.setup_watchdog()
+		self.setup_telemetry()
+		self.reattach_sessions()
+		self.check_executables()
 
 	def do_init_config(self):
 		do_config = self.config.get_config_value("is-configured")
-		if do_config == 0:
+		if do_config == 0 and self.profiler.enabled:
+			# Nobody is there to fill in the dialogs of a profiled startup
+			self.insertText("Skipping the first-time configuration in a profiled startup.")
+		elif do_config == 0:
 			self.menu_cmd_configure()
 			self.config.set_config_value("is-configured", 1)
 		self.insertText("Using config database version '{}'".format(self.config.get_config_value("db-version")))
 
+	def setup_session_log(self):
+		if self.config.get_config_value("db-version") < 6 or not self.config.get_config_value("session-log-enabled"):
+			return
+		self.session_log = SessionLogWriter(
+			self.config.get_config_value("session-log-directory"),
+			max_size=self.config.get_config_value("session-log-max-size") * 1024 * 1024,
+			keep_files=self.config.get_config_value("session-log-keep-files"),
+			compress=bool(self.config.get_config_value("session-log-compress")),
+			)
+		self.session_log.start()
+
 	def setup_systray(self):
 		if not self.config.get_config_value("enable-systray-icon"):
 			self.systray = None
@@ -83,7 +182,9 @@ class MainWindow(QMainWindow):
 
 	def check_and_do_database_migration(self):
 		current_version = self.config.get_config_value("db-version")
-		if self.config.is_migration_needed():
+		if self.config.is_migration_needed() and self.profiler.enabled:
+			self.insertText("Skipping the pending config database upgrade in a profiled startup.")
+		elif self.config.is_migration_needed():
 			self.insertText("Detected pending config database upgrade to version '{}'. Awaiting user input...".format(DBVERSION))
 			message = "You are using an older version of the application config database.\n\nWould you like to upgrade the database now? Your existing config database will be backed up."
 
@@ -102,6 +203,9 @@ class MainWindow(QMainWindow):
 				self.config.execute_migration()
 				new_version = self.config.get_config_value("db-version")
 				self.insertText("Config database update from version '{}' to '{}' finished.".format(current_version, new_version))
+				self.load_session_modes()
+				if self.session_log is None:
+					self.setup_session_log()
 			elif reply == QMessageBox.No and upgrade_is_mandatory:
 				QtCore.QTimer.singleShot(500, self.on_close_override)
 				# self.on_close_override() # Calling this in an __init__()-called method doesn't seem to work...
@@ -112,16 +216,36 @@ class MainWindow(QMainWindow):
 		config_action = QAction("&Configure...", self)
 		config_action.triggered.connect(self.menu_cmd_configure)
 
+		session_logs_action = QAction("&Session logs...", self)
+		session_logs_action.triggered.connect(self.menu_cmd_session_logs)
+
+		telemetry_action = QAction("&Telemetry report...", self)
+		telemetry_action.triggered.connect(self.menu_cmd_telemetry_report)
+
 		quit_action = QAction("&Quit", self)
 		quit_action.setShortcut("Ctrl+Q")
 		quit_action.triggered.connect(self.on_close_override)
 
+		queue_next_action = QAction("&Queue selected channel as next", self)
+		queue_next_action.setShortcut("Ctrl+N")
+		queue_next_action.triggered.connect(self.cmd_queue_next_channel)
+
+		switch_next_action = QAction("&Switch to next channel", self)
+		switch_next_action.setShortcut("Ctrl+Right")
+		switch_next_action.triggered.connect(self.cmd_switch_to_next_channel)
+
 		menu = self.menuBar()
 		file_menu = menu.addMenu("&File")
 		file_menu.addAction(config_action)
+		file_menu.addAction(session_logs_action)
+		file_menu.addAction(telemetry_action)
 		file_menu.addSeparator()
 		file_menu.addAction(quit_action)
 
+		session_menu = menu.addMenu("&Session")
+		session_menu.addAction(queue_next_action)
+		session_menu.addAction(switch_next_action)
+
 	def setup_geometry(self):
 		width = self.config.get_config_value("root-width")
 		height = self.config.get_config_value("root-height")
@@ -251,6 +375,13 @@ class MainWindow(QMainWindow):
 		self.run_livestreamer_button.setEnabled(False)
 		self.run_livestreamer_button.clicked.connect(self.run_livestreamer)
 		layout.addWidget(self.run_livestreamer_button, 3, 0)
+		self.mode_input = QComboBox(self.cwidget)
+		self.mode_input.setToolTip("Watch the stream, record it to disk, or do both at the same time")
+		layout.addWidget(self.mode_input, 3, 1)
+		self.load_session_modes()
+		self.throughput_label = QLabel("", self.cwidget)
+		self.throughput_label.setToolTip("Throughput, segment download time and stalls of the running stream")
+		layout.addWidget(self.throughput_label, 3, 2, 1, 4)
 
 		self.log_widget = QTextEdit(self.cwidget)
 		layout.addWidget(self.log_widget, 4, 0, 1, column+1)
@@ -258,10 +389,13 @@ class MainWindow(QMainWindow):
 		self.log_widget.setReadOnly(True)
 		self.log_widget.setTabChangesFocus(True)
 
+		self.resource_label = QLabel(self)
+		self.statusBar().addWidget(self.resource_label)
+
 	def set_window_icon(self):
 		"""Sets the root window's icon, which is also shown in the taskbar."""
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
-		icon = QIcon(os.path.join(IMAGESROOT, streamer["icon"]))
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		icon = get_icon(os.path.join(IMAGESROOT, streamer["icon"]))
 		self.setWindowIcon(icon)
 
 		if self.systray is not None:
@@ -273,11 +407,19 @@ class MainWindow(QMainWindow):
 			event.ignore()
 			return
 
-		if self.livestreamer_thread is not None and self.livestreamer_thread.keep_running:
+		if isinstance(self.livestreamer_thread, SupervisedWorker) and self.livestreamer_thread.keep_running:
+			# The supervisor keeps the session running, and the next start of the GUI reattaches to it
+			self.livestreamer_thread.finished.disconnect(self.handle_livestreamer_thread_finished_signal)
+			self.livestreamer_thread.detach()
+			self.livestreamer_thread.wait(self.thread_exit_grace_time)
+			self.insertText("Left the session running in the session supervisor.")
+		elif self.livestreamer_thread is not None and self.livestreamer_thread.keep_running:
 			reply = QMessageBox.question(self, "Really quit Livestreamer GUI?", "Livestreamer is still running. Quitting will close it and the opened player.\n\nQuit?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 			if reply == QMessageBox.Yes:
 				# Terminate the child process, else it'll keep running even after this application is closed
 				if self.livestreamer_thread is not None:
+					if self.session is not None:
+						self.session["stop-requested"] = True
 					self.livestreamer_thread.term_process()
 					self.livestreamer_thread.wait(self.thread_exit_grace_time)
 					self.update()
@@ -292,6 +434,25 @@ class MainWindow(QMainWindow):
 		# Remember the position of the window
 		self.remember_window_position()
 
+		self.cancel_reconnect()
+		self.standby_pool.stop_all(self.thread_exit_grace_time)
+		self.stop_control_api()
+		self.stop_hls_proxy()
+		self.stop_event_loop_thread()
+		if self.prober is not None:
+			self.prober.shutdown()
+		self.reset_status_providers()
+
+		if self.session_log is not None:
+			self.session_log.close()
+			self.session_log = None
+
+		self.config.flush()
+		self.stop_watchdog()
+		self.stop_telemetry()
+		if self.supervisor is not None:
+			self.supervisor.close()
+			self.supervisor = None
 		event.accept()
 
 	def changeEvent(self, event):
@@ -305,8 +466,9 @@ class MainWindow(QMainWindow):
 	def remember_window_position(self):
 		if self.config.get_config_value("remember-window-position"):
 			point = self.frameGeometry().topLeft()
-			self.config.set_config_value("root-xoffset", point.x())
-			self.config.set_config_value("root-yoffset", point.y())
+			# Written along with the next commit, as the position isn't worth a write of its own
+			self.config.set_config_value("root-xoffset", point.x(), deferred=True)
+			self.config.set_config_value("root-yoffset", point.y(), deferred=True)
 			self.insertText("Window position saved.")
 
 	def show_hide_systray(self):
@@ -334,14 +496,52 @@ class MainWindow(QMainWindow):
 		return False
 
 	def menu_cmd_configure(self):
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
-		dialog = AppConfigDialog(self, self.config, streamer_icon=os.path.join(IMAGESROOT, streamer["icon"]))
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		dialog = self.get_dialog("AppConfigDialog", streamer_icon=os.path.join(IMAGESROOT, streamer["icon"]))
 		dialog.exec()
 		if dialog.result() == QDialog.Accepted:
 			self.show_hide_systray()
 			self.update_colors()
+			self.setup_control_api()
+			self.setup_watchdog()
+			self.check_executables()
+			self.check_probe_backend()
+			self.reset_status_providers()
 		dialog.close()
-		dialog = None
+
+	def get_dialog(self, class_name, **data):
+		"""Returns the dialog, which is built on first use and only rebound to the data after that.
+		The dialogs module itself is imported on first use, as most runs never open a dialog."""
+		dialog = self.dialogs.get(class_name)
+		if dialog is not None:
+			if dialog.db_version == self.config.get_config_value("db-version"):
+				dialog.rebind(**data)
+				return dialog
+			# The widgets depend on the database version, which has changed since
+			dialog.deleteLater()
+		from . import gui_dialogs
+		dialog = getattr(gui_dialogs, class_name)(self, self.config, **data)
+		self.dialogs[class_name] = dialog
+		return dialog
+
+	def menu_cmd_session_logs(self):
+		if self.config.get_config_value("db-version") < 6:
+			self.insertText("Session logs require config database version 6!")
+			return
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		searcher = SessionLogSearcher(self.config.get_config_value("session-log-directory"))
+		from .gui_dialogs import LogBrowserDialog
+		dialog = LogBrowserDialog(self, self.config, searcher, streamer_icon=os.path.join(IMAGESROOT, streamer["icon"]))
+		dialog.show()
+
+	def menu_cmd_telemetry_report(self):
+		if self.config.get_config_value("db-version") < 19:
+			self.insertText("Telemetry requires config database version 19!")
+			return
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		from .gui_dialogs import TelemetryDialog
+		dialog = TelemetryDialog(self, self.config, get_telemetry_report(self.config.connection), streamer_icon=os.path.join(IMAGESROOT, streamer["icon"]))
+		dialog.show()
 
 	def cmd_set_favorite_streamer(self):
 		raise NotImplementedException()
@@ -360,18 +560,17 @@ class MainWindow(QMainWindow):
 
 	def cmd_set_favorite_channel(self):
 		self.fav_channel_button.setEnabled(False)
-		self.config.set_favorite_channel(self.streamer_input.currentText(), self.channel_input.currentText())
+		self.config.set_favorite_channel_by_id(self.channel_input.currentData())
 		self.insertText("Favorited channel '{}'.".format(self.channel_input.currentText()))
 
 	def cmd_edit_channel(self):
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
 		streamer_icon = os.path.join(IMAGESROOT, streamer["icon"])
-		channel_data = self.config.get_streamer_channel(streamer["name"], self.channel_input.currentText())
-		dialog = AddEditChannelsDialog(self, self.config, title="Edit the channel", streamer_icon=streamer_icon, streamer=streamer, channel_data=channel_data)
+		channel_data = self.config.get_channel_by_id(self.channel_input.currentData())
+		dialog = self.get_dialog("AddEditChannelsDialog", title="Edit the channel", streamer_icon=streamer_icon, streamer=streamer, channel_data=channel_data)
 		dialog.exec()
 		result = dialog.result_data
 		dialog.close()
-		dialog = None
 		if result is not None:
 			self.insertText("Updated channel name '{old_name}' => '{new_name}, URL '{old_url}' => '{new_url}'".format(old_name=channel_data["name"], new_name=result["name"], old_url=channel_data["url"], new_url=result["url"]))
 			self.load_channels(streamer["name"])
@@ -380,22 +579,21 @@ class MainWindow(QMainWindow):
 			self.channel_input.setCurrentIndex(self.channel_input.findText(result["name"]))
 			
 	def cmd_add_channel(self):
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
 		streamer_icon = os.path.join(IMAGESROOT, streamer["icon"])
-		dialog = AddEditChannelsDialog(self, self.config, title="Add a channel", streamer_icon=streamer_icon, streamer=streamer)
+		dialog = self.get_dialog("AddEditChannelsDialog", title="Add a channel", streamer_icon=streamer_icon, streamer=streamer, channel_data=None)
 		dialog.exec()
 		result = dialog.result_data
 		dialog.close()
-		dialog = None
 		if result is not None:
 			self.insertText("Added channel '{}' with URL '{}'".format(result["name"], result["url"]))
 			self.load_channels(streamer["name"])
 
 	def cmd_delete_channel(self):
-		channel = self.config.get_streamer_channel(self.streamer_input.currentText(), self.channel_input.currentText())
+		channel = self.config.get_channel_by_id(self.channel_input.currentData())
 		reply = QMessageBox.question(self, "Delete channel", "Are you sure you want to remove the channel?\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 		if reply == QMessageBox.Yes:
-			self.config.delete_channel(self.streamer_input.currentText(), channel["name"])
+			self.config.delete_channel_by_id(channel["id"])
 			self.insertText("Removed channel '{}' with URL '{}'".format(channel["name"], channel["url"]))
 			self.load_channels(self.streamer_input.currentText())
 
@@ -403,7 +601,7 @@ class MainWindow(QMainWindow):
 		self.insertText("Refreshing cache for channel '{}'.".format(self.channel_input.currentText()))
 		self.clear_quality_cache_button.setEnabled(False)
 		self.clear_quality_cache_button.repaint() # Loading streams seems to block repainting of the GUI, so force a repaint here
-		self.config.clean_quality_cache(self.streamer_input.currentText(), self.channel_input.currentText(), True)
+		self.config.clean_quality_cache_by_id(self.channel_input.currentData(), True)
 		self.load_streams(True)
 		self.clear_quality_cache_button.setEnabled(True)
 
@@ -416,7 +614,7 @@ class MainWindow(QMainWindow):
 		if self.selections["streamer"] == self.streamer_input.currentText():
 			return
 		self.selections["streamer"] = self.streamer_input.currentText()
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
 		self.set_window_icon()
 		if streamer["favorite"]:
 			self.fav_streamer_button.setEnabled(False)
@@ -428,7 +626,7 @@ class MainWindow(QMainWindow):
 		if self.selections["channel"] == self.channel_input.currentText() or not self.channel_input.currentText():
 			return
 		self.selections["channel"] = self.channel_input.currentText()
-		channel = self.config.get_streamer_channel(self.streamer_input.currentText(), self.channel_input.currentText())
+		channel = self.config.get_channel_by_id(self.channel_input.currentData())
 		if channel and channel["favorite"]:
 			self.fav_channel_button.setEnabled(False)
 		else:
@@ -440,14 +638,13 @@ class MainWindow(QMainWindow):
 	def load_streamers(self):
 		streamers = self.config.get_streamers()
 		favorite_streamer_index = 0
-		streamer_list = []
+		self.streamer_input.clear()
+		# The items hold the ids of the streamers, which the database is accessed with
 		for index, streamer in enumerate(streamers):
-			streamer_list.append(streamer["name"])
+			self.streamer_input.addItem(streamer["name"], streamer["id"])
 			if streamer["favorite"]:
 				favorite_streamer_index = index
-		self.streamer_input.clear()
-		self.streamer_input.addItems(streamer_list)
-		if len(streamer_list) != 0:
+		if len(streamers) != 0:
 			self.streamer_input.setCurrentIndex(favorite_streamer_index)
 		self.selections["streamer"] = self.streamer_input.currentText()
 		self.fav_streamer_button.setEnabled(False)
@@ -456,14 +653,13 @@ class MainWindow(QMainWindow):
 		channels = self.config.get_streamer_channels(streamer_name)
 		self.channel_input.clear()
 		favorite_channel = None
-		channel_list = []
 		self.fav_channel_button.setEnabled(False)
-		for index, channel in enumerate(channels):
-			channel_list.append(channel["name"])
+		# The channels come sorted by name, and the items hold their ids
+		for channel in channels:
+			self.channel_input.addItem(channel["name"], channel["id"])
 			if channel["favorite"]:
 				favorite_channel = channel["name"]
-		self.channel_input.addItems(sorted(channel_list))
-		if len(channel_list) == 0:
+		if len(channels) == 0:
 			self.channel_input.addItem("(no channels exist for this streamer)")
 			self.fav_channel_button.setEnabled(False)
 			self.edit_channel_button.setEnabled(False)
@@ -484,22 +680,86 @@ class MainWindow(QMainWindow):
 
 		self.selections["channel"] = self.channel_input.currentText()
 
-	def display_loaded_streams(self, streams, skip_caching=False):
+	def display_loaded_streams(self, streams, skip_caching=False, metadata=None):
 		self.quality_input.clear()
 		if len(streams) == 0:
 			self.quality_input.addItem("(channel is currently not streaming)")
 		else:
 			self.run_livestreamer_button.setEnabled(True)
 			self.clear_quality_cache_button.setEnabled(True)
+			# The automatic selection is offered first and is the default
+			if self.config.get_config_value("db-version") >= 8:
+				self.quality_input.addItem(AUTO_QUALITY)
 			self.quality_input.addItems(sorted(streams))
 			self.quality_input.setCurrentIndex(0)
 			self.quality_input.setEnabled(True)
 			if not skip_caching:
-				self.insertText("Cleaning any cached streams for channel '{}'...".format(self.channel_input.currentText()))
-				self.config.clean_quality_cache(self.streamer_input.currentText(), self.channel_input.currentText())
-				self.insertText("Adding probed streams for channel '{}' to cache...".format(self.channel_input.currentText()))
-				self.config.add_quality_to_cache(self.streamer_input.currentText(), self.channel_input.currentText(), streams)
+				with self.config.batch():
+					self.insertText("Cleaning any cached streams for channel '{}'...".format(self.channel_input.currentText()))
+					self.config.clean_quality_cache_by_id(self.channel_input.currentData())
+					self.insertText("Adding probed streams for channel '{}' to cache...".format(self.channel_input.currentText()))
+					self.config.add_quality_to_cache_by_id(self.channel_input.currentData(), streams, metadata)
 				self.insertText("Done.")
+		self.start_pending_play()
+
+	def handle_instance_message(self, message):
+		"""Handles a command passed on by an instance started after this one."""
+		self.showNormal()
+		self.raise_()
+		self.activateWindow()
+		if message.get("command") == "play":
+			self.play_channel(message.get("channel"), message.get("quality"), message.get("streamer"))
+
+	def play_channel(self, channel_name, quality=None, streamer_name=None, mode=None):
+		"""Selects the channel and plays it in the quality as soon as its streams are loaded. Returns an error message if it can't be played."""
+		streamer_names = [streamer_name] if streamer_name else [streamer["name"] for streamer in self.config.get_streamers()]
+		for name in streamer_names:
+			if self.config.get_streamer_channel(name, channel_name) is not None:
+				streamer_name = name
+				break
+		else:
+			error = "No channel named '{}' exists!".format(channel_name)
+			self.insertText(error)
+			return error
+		if self.livestreamer_thread is not None and self.livestreamer_thread.isRunning():
+			error = "Livestreamer should still be running!"
+			self.insertText(error)
+			return error
+		if mode is not None:
+			if self.mode_input.findData(mode) == -1:
+				error = "Unknown session mode '{}'!".format(mode)
+				self.insertText(error)
+				return error
+			self.mode_input.setCurrentIndex(self.mode_input.findData(mode))
+
+		self.pending_play = (streamer_name, channel_name, quality)
+		if self.streamer_input.currentText() != streamer_name:
+			self.streamer_input.setCurrentIndex(self.streamer_input.findText(streamer_name))
+			self.load_channels(streamer_name)
+		if self.channel_input.currentText() == channel_name and self.run_livestreamer_button.isEnabled():
+			# The streams are loaded already
+			self.start_pending_play()
+		else:
+			self.channel_input.setCurrentIndex(self.channel_input.findText(channel_name))
+
+	def start_pending_play(self):
+		if self.pending_play is None:
+			return
+		streamer_name, channel_name, quality = self.pending_play
+		if (self.streamer_input.currentText(), self.channel_input.currentText()) != (streamer_name, channel_name):
+			# The streams of some other channel were loaded while selecting this one
+			return
+		self.pending_play = None
+		if not self.run_livestreamer_button.isEnabled():
+			self.insertText("Channel '{}' is not streaming; nothing to play.".format(channel_name))
+			return
+		if quality is not None:
+			qualities = [self.get_quality_name(self.quality_input.itemText(i)) for i in range(self.quality_input.count())]
+			if quality not in qualities:
+				self.insertText("Quality '{}' is not available for channel '{}'!".format(quality, channel_name))
+				return
+			self.quality_input.setCurrentIndex(qualities.index(quality))
+		self.run_livestreamer()
 
 	def load_streams(self, force_refresh=False):
 		self.quality_input.clear()
@@ -510,9 +770,22 @@ class MainWindow(QMainWindow):
 		if self.channel_input.count() == 0:
 			return
 
-		streams = self.config.get_quality_from_cache(self.streamer_input.currentText(), self.channel_input.currentText())
-		if len(streams) > 0:
-			self.display_loaded_streams(streams, True)
+		self.mark_streams_stale(None)
+		max_stale = 0
+		if self.config.get_config_value("db-version") >= 24 and not force_refresh:
+			max_stale = self.config.get_config_value("quality-cache-max-stale")
+		entry = self.config.get_quality_cache_entry_by_id(self.channel_input.currentData(), max_stale)
+		if entry is not None and entry["stale"]:
+			# Shown right away, and replaced in place once the channel has been probed again
+			self.display_loaded_streams(entry["qualities"], True)
+			self.mark_streams_stale(entry["expires"])
+			if self.config.get_config_value('auto-refresh-quality') == 0:
+				self.insertText("Loaded expired streams for channel '{}' from cache; refresh them manually.".format(self.channel_input.currentText()))
+			else:
+				self.insertText("Loaded expired streams for channel '{}' from cache; refreshing them in the background.".format(self.channel_input.currentText()))
+				self.revalidate_streams()
+		elif entry is not None:
+			self.display_loaded_streams(entry["qualities"], True)
 			self.insertText("Loaded streams for channel '{}' from cache.".format(self.channel_input.currentText()))
 		else:
 			self.insertText("No cached channel streams found for channel '{}'".format(self.channel_input.currentText()))
@@ -524,55 +797,218 @@ class MainWindow(QMainWindow):
 				if stream_url is None:
 					self.insertText("Failed to form a complete streamer URL (missing streamer/channel/stream)!")
 					return
-				self.probe_for_streams(stream_url)
+				self.probe_for_streams(stream_url, force_refresh)
 		
 		self.channel_input.setEnabled(True)
 
-	def probe_for_streams(self, stream_url):
+	def get_prober(self):
+		"""Returns the StreamProber, creating it with the configured backend on first use."""
+		if self.prober is None:
+			backend = "subprocess"
+			daemon_max_requests = 200
+			if self.config.get_config_value("db-version") >= 15:
+				backend = self.config.get_config_value("probe-backend")
+			if self.config.get_config_value("db-version") >= 16:
+				daemon_max_requests = self.config.get_config_value("probe-daemon-max-requests")
+			self.prober = StreamProber(backend, daemon_max_requests=daemon_max_requests)
+			self.insertText("Probing channels with {} (probe backend '{}').".format(self.prober.describe(), backend))
+		return self.prober
+
+	def check_probe_backend(self):
+		"""Drops the prober if the probe backend setting has changed, so that the next probe uses the new backend."""
+		if self.prober is not None and self.config.get_config_value("db-version") >= 15 \
+				and self.prober.backend != self.config.get_config_value("probe-backend"):
+			self.prober.shutdown()
+			self.prober = None
+
+	def get_status_provider(self, streamer):
+		"""Returns the provider of the live status of the streamer's channels, or None if the streamer has no status API."""
+		if self.config.get_config_value("db-version") < 17 or not streamer["status_api_url"]:
+			return None
+		key = (streamer["name"], streamer["status_api_url"])
+		if key not in self.status_providers:
+			values = self.config.get_config_values(["status-api-client-id", "status-api-token", "status-cache-ttl"])
+			try:
+				self.status_providers[key] = TwitchStatusProvider(streamer["status_api_url"], values["status-api-client-id"], values["status-api-token"], values["status-cache-ttl"])
+			except ValueError as e:
+				self.insertText(str(e))
+				self.status_providers[key] = None
+		return self.status_providers[key]
+
+	def reset_status_providers(self):
+		"""Drops the status providers, so that the next probes use the current status API settings."""
+		for provider in self.status_providers.values():
+			if provider is not None:
+				provider.close()
+		self.status_providers = {}
+
+	def start_probe(self, streamer, channel, stream_url, command=None, force_refresh=False):
+		"""Probes the channel in the background. Returns a concurrent.futures.Future of the stream names and their metadata.
+		If the streamer has a status API, the channel is only probed if the API says it's live."""
+		prober = self.get_prober()
+		provider = self.get_status_provider(streamer)
+		if provider is None:
+			return self.time_probe(channel["id"], prober.submit(stream_url, command))
+		login = channel["url"].strip("/").split("/")[0]
+		# All the streamer's channels are looked up together, so switching to them needs no more requests
+		other_logins = [other["url"].strip("/").split("/")[0] for other in self.config.get_streamer_channels(streamer["name"])]
+		if force_refresh:
+			provider.forget([login])
+
+		def probe():
+			try:
+				live = provider.is_live(login, other_logins)
+			except LiveStatusError:
+				live = True		# Let the probe tell
+			if not live:
+				return [], {"backend": "status-api"}
+			return prober.probe(stream_url, command)
+
+		return self.time_probe(channel["id"], prober.executor.submit(probe))
+
+	def time_probe(self, channel_id, future):
+		"""Records the probe's duration and outcome in the telemetry once it's done. Returns the future."""
+		started = time.monotonic()
+		future.add_done_callback(lambda future: self.record_telemetry("probe", channel_id, time.monotonic() - started, future.exception() is None))
+		return future
+
+	def probe_for_streams(self, stream_url, force_refresh=False):
 		self.insertText("Probing streamer's channel for live streams: {}".format(stream_url))
-		livestreamer = self.config.get_config_value("livestreamer-path")
-		if livestreamer is None or livestreamer.strip() == "" or not os.path.isfile(livestreamer):
-			self.insertText("Livestreamer path is not configured or file doesn't exist!")
+		prober = self.get_prober()
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		command = None
+		if prober.needs_command:
+			livestreamer = self.get_executable_path("livestreamer-path", "Livestreamer")
+			if livestreamer is None:
+				return
+			command_format = self.config.get_config_value("probe-command-format")
+			command = shlex.split(command_format.format(livestreamer=livestreamer, url=stream_url))
+			if self.get_status_provider(streamer) is None:
+				self.pending_probe = (self.channel_input.currentData(), time.monotonic())
+				self.livestreamer_thread = LivestreamerWorker(command)
+				self.livestreamer_thread.statusMessage.connect(self.parse_probed_streams, False)
+				self.livestreamer_thread.finished.connect(self.handle_probe_finished)
+				self.livestreamer_thread.start()
+				self.livestreamer_thread.wait(self.thread_exit_grace_time)
+				return
+		# The probe runs in the background, and its result is handled in the GUI thread
+		channel = self.config.get_channel_by_id(self.channel_input.currentData())
+		self.quality_input.addItem("(probing for streams...)")
+		future = self.start_probe(streamer, channel, stream_url, command, force_refresh)
+		future.add_done_callback(lambda future: self.streamsProbed.emit((channel["id"], channel["name"], future)))
+
+	def mark_streams_stale(self, expires):
+		"""Shows the qualities in italics while they're from an expired cache entry; None marks them fresh."""
+		font = self.quality_input.font()
+		font.setItalic(expires is not None)
+		self.quality_input.setFont(font)
+		self.quality_input.setToolTip("" if expires is None else "Cached streams that expired at {} UTC; being refreshed".format(expires))
+
+	def revalidate_streams(self):
+		"""Probes the selected channel in the background, to replace its stale cached streams."""
+		stream_url = self.get_streamer_url()
+		if stream_url is None:
 			return
-		command_format = self.config.get_config_value("probe-command-format")
-		command = command_format.format(livestreamer=livestreamer, url=stream_url)
-		self.livestreamer_thread = LivestreamerWorker(shlex.split(command))
-		self.livestreamer_thread.statusMessage.connect(self.parse_probed_streams, False)
-		self.livestreamer_thread.start()
-		self.livestreamer_thread.wait(self.thread_exit_grace_time)
+		prober = self.get_prober()
+		command = None
+		if prober.needs_command:
+			livestreamer = self.get_executable_path("livestreamer-path", "Livestreamer")
+			if livestreamer is None:
+				return
+			command = shlex.split(self.config.get_config_value("probe-command-format").format(livestreamer=livestreamer, url=stream_url))
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
+		channel = self.config.get_channel_by_id(self.channel_input.currentData())
+		future = self.start_probe(streamer, channel, stream_url, command, True)
+		future.add_done_callback(lambda future: self.streamsRevalidated.emit((channel["id"], channel["name"], future)))
+
+	def handle_revalidated_streams(self, result):
+		channel_id, channel_name, future = result
+		try:
+			streams, metadata = future.result()
+		except Exception as e:
+			self.insertText("Refreshing the streams of channel '{}' failed, so the expired ones are kept: {}".format(channel_name, str(e)))
+			return
+		with self.config.batch():
+			self.config.clean_quality_cache_by_id(channel_id, True)
+			if streams:
+				self.config.add_quality_to_cache_by_id(channel_id, streams, metadata)
+		if self.channel_input.currentData() != channel_id:
+			return
+		self.mark_streams_stale(None)
+		if not streams:
+			self.insertText("Channel '{}' is not streaming anymore.".format(channel_name))
+			self.run_livestreamer_button.setEnabled(False)
+			self.display_loaded_streams(streams, True, metadata)
+			return
+		# The list is updated in place, keeping the selected quality if it's still there
+		selected = self.quality_input.currentText()
+		items = [self.quality_input.itemText(i) for i in range(self.quality_input.count())]
+		if self.config.get_config_value("db-version") >= 8:
+			new_items = [AUTO_QUALITY] + sorted(streams)
+		else:
+			new_items = sorted(streams)
+		if items != new_items:
+			self.quality_input.clear()
+			self.quality_input.addItems(new_items)
+			self.quality_input.setCurrentIndex(max(0, self.quality_input.findText(selected)))
+		self.insertText("Refreshed the streams of channel '{}'.".format(channel_name))
+
+	def handle_probed_streams(self, result):
+		channel_id, channel_name, future = result
+		try:
+			streams, metadata = future.result()
+		except Exception as e:
+			self.insertText("Probing channel '{}' failed: {}".format(channel_name, str(e)))
+			self.show_failed_probe(channel_id)
+			return
+		if self.channel_input.currentData() != channel_id:
+			# Another channel was selected while probing
+			with self.config.batch():
+				self.config.clean_quality_cache_by_id(channel_id)
+				if streams:
+					self.config.add_quality_to_cache_by_id(channel_id, streams, metadata)
+			return
+		self.show_probed_streams(streams, metadata)
 
 	def parse_probed_streams(self, event):
-		streams = []
-
-		message = event.message.lower()
-		if "no streams found on this url" in message:
+		streams = parse_stream_list(event.message)
+		if streams is None:
+			return
+		if self.pending_probe is not None:
+			channel_id, started = self.pending_probe
+			self.pending_probe = None
+			self.record_telemetry("probe", channel_id, time.monotonic() - started, True)
+		self.show_probed_streams(streams)
+
+	def handle_probe_finished(self):
+		if self.pending_probe is not None:
+			# The probe ended without a list of streams
+			channel_id, started = self.pending_probe
+			self.pending_probe = None
+			self.record_telemetry("probe", channel_id, time.monotonic() - started, False)
+			self.show_failed_probe(channel_id)
+
+	def show_failed_probe(self, channel_id):
+		"""Replaces the "probing" placeholder of the channel with an empty list of streams, and gives up playing it."""
+		if self.channel_input.currentData() != channel_id:
+			return
+		if self.pending_play is not None and self.pending_play[:2] == (self.streamer_input.currentText(), self.channel_input.currentText()):
+			self.insertText("Channel '{}' can't be played, as its streams couldn't be probed.".format(self.pending_play[1]))
+			self.pending_play = None
+		self.display_loaded_streams([], True)
+
+	def show_probed_streams(self, streams, metadata=None):
+		if len(streams) == 0 and metadata is not None and metadata.get("backend") == "status-api":
+			self.insertText("The status API says the channel is not live.")
+		elif len(streams) == 0:
 			self.insertText("No streams found. The channel is probably not streaming.")
 		else:
-			pos = message.find("available streams:")
-			if pos == -1:
-				return
-
-			if "(best, worst)" in message:
-				message = message.replace("(best, worst)", "(best and worst)")
-			elif "(worst, best)" in message:
-				message = message.replace("(worst, best)", "(worst and best)")
-			qualities = message[pos+18:].split(",")
-			for item in qualities:
-				streams.append(item.strip())
-				left_parenthesis = item.find("(")
-				if left_parenthesis == -1:
-					continue
-				if item.find("worst", left_parenthesis) >= left_parenthesis:
-					streams.append("worst")
-				if item.find("best", left_parenthesis) >= left_parenthesis:
-					streams.append("best")
-			streams.sort()
 			self.insertText("Found {} stream(s): {}".format(len(streams), ", ".join(streams)))
 
-		self.display_loaded_streams(streams)
+		self.display_loaded_streams(streams, metadata=metadata)
 
 	def get_streamer_url(self):
-		streamer = self.config.get_streamer(self.streamer_input.currentText())
+		streamer = self.config.get_streamer_by_id(self.streamer_input.currentData())
 		if streamer is None:
 			self.insertText("No streamer selected!")
 			return
@@ -582,9 +1018,78 @@ class MainWindow(QMainWindow):
 		if self.channel_input.count() == 0:
 			self.insertText("No channels exist!")
 			return
-		channel = self.config.get_streamer_channel(streamer["name"], self.channel_input.currentText())
+		channel = self.config.get_channel_by_id(self.channel_input.currentData())
+		return self.get_channel_url(streamer, channel)
+
+	def get_channel_url(self, streamer, channel):
 		return urljoin(streamer["url"], channel["url"])
 
+	def load_session_modes(self):
+		self.mode_input.clear()
+		self.mode_input.addItem("Watch", "watch")
+		# Recording needs the config values added in version 5
+		if self.config.get_config_value("db-version") >= 5:
+			self.mode_input.addItem("Record", "record")
+			self.mode_input.addItem("Watch and record", "watch-record")
+		# The local proxy needs the config values added in version 11
+		if self.config.get_config_value("db-version") >= 11:
+			self.mode_input.addItem("Watch via local proxy", "proxy")
+		self.mode_input.setEnabled(self.mode_input.count() > 1)
+
+	def get_recording_basename(self, channel_name):
+		return re.sub(r"[^\w.-]+", "_", channel_name).strip("_") or "stream"
+
+	def collect_metrics(self):
+		return self.config.get_config_value("db-version") >= 7 and bool(self.config.get_config_value("collect-stream-metrics"))
+
+	def get_session_transport_arguments(self, session, livestreamer=None):
+		if self.config.get_config_value("db-version") < 9:
+			return []
+		profile = self.config.get_transport_profile_by_id(session["channel_id"])
+		capabilities = self.executable_capabilities.get(livestreamer, (None, None))[1]
+		arguments = get_transport_arguments(profile, capabilities)
+		if capabilities is not None and len(arguments) < len(get_transport_arguments(profile)):
+			self.insertText("Livestreamer {} doesn't support all of the channel's transport options; leaving those out.".format(capabilities.version or ""))
+		return arguments
+
+	def get_session_handoff_arguments(self, session, livestreamer):
+		"""Returns the livestreamer arguments of the handoff to the player chosen for the watch session."""
+		if self.config.get_config_value("db-version") < 22:
+			return []
+		profile = self.config.get_transport_profile_by_id(session["channel_id"])
+		mode = profile["handoff"] if profile is not None else "auto"
+		capabilities = self.executable_capabilities.get(livestreamer, (None, None))[1]
+		handoff = choose_handoff(mode, capabilities, self.collect_metrics() or session["auto"])
+		if mode not in ("auto", handoff):
+			self.insertText("Livestreamer isn't known to support the '{}' handoff to the player; piping the stream instead.".format(mode))
+		session["handoff"] = handoff
+		return get_handoff_arguments(handoff)
+
+	def get_livestreamer_arguments(self, command_format, session, **values):
+		"""Formats a session's command and splits it into arguments, adding the channel's transport options."""
+		transport = self.get_session_transport_arguments(session, values.get("livestreamer"))
+		arguments = shlex.split(command_format.format(transport=" ".join(transport), **values))
+		if "{transport}" not in command_format:
+			arguments[1:1] = transport
+		if self.collect_metrics():
+			# The segment and progress output is only logged at debug level
+			arguments[1:1] = ["--loglevel", "debug"]
+		return arguments
+
+	def create_recording_worker(self, livestreamer, player, session, tee_to_player):
+		command_format = self.config.get_config_value("record-command-format")
+		arguments = self.get_livestreamer_arguments(command_format, session, livestreamer=livestreamer, url=session["url"], quality=session["quality"])
+		player_command = None
+		if tee_to_player:
+			player_command = shlex.split(self.config.get_config_value("player-stdin-command-format").format(player=player))
+		recorder = StreamRecorder(
+			self.config.get_config_value("recording-directory") or "recordings",
+			self.get_recording_basename(session["channel"]),
+			rotate_size=self.config.get_config_value("recording-rotate-size") * 1024 * 1024,
+			rotate_time=self.config.get_config_value("recording-rotate-time") * 60,
+			)
+		return LivestreamerRecordingWorker(arguments, recorder, player_command, collect_metrics=self.collect_metrics())
+
 	def run_livestreamer(self):
 		if self.livestreamer_thread is not None:
 			if self.livestreamer_thread.isRunning():
@@ -596,35 +1101,697 @@ class MainWindow(QMainWindow):
 				self.update()
 
 		if self.livestreamer_thread is None:
-			livestreamer = self.config.get_config_value("livestreamer-path")
-			if livestreamer is None or livestreamer.strip() == "" or not os.path.isfile(livestreamer):
-				self.insertText("Livestreamer path is not configured or file doesn't exist!")
+			session = self.get_selected_session()
+			if session is None:
 				return
-			player = self.config.get_config_value("player-path")
-			if player is None or player.strip() == "" or not os.path.isfile(player):
-				self.insertText("Player path is not configured or file doesn't exist!")
-				return
-			stream_url = self.get_streamer_url()
-			if stream_url is None:
-				self.insertText("Failed to form a complete streamer URL (missing streamer/channel/stream)!")
+			if self.cancel_reconnect():
+				self.insertText("Cancelled reconnecting the dropped session.")
+			if session["auto"]:
+				self.resolve_auto_quality(session)
+			else:
+				self.start_livestreamer_session(session)
+
+	def get_quality_name(self, text):
+		# Strip the synonyms, e.g. "source (best)"
+		if "(" in text:
+			text = text[:text.find("(")].strip()
+		return text
+
+	def resolve_auto_quality(self, session):
+		"""Picks the quality for an "auto" session from recent metrics of the channel or a test fetch, then starts it."""
+		throughput = self.get_measured_throughput(session)
+		if throughput is not None:
+			self.insertText("Using the channel's recent throughput test for automatic quality selection.")
+			self.start_auto_quality_session(session, throughput)
+			return
+
+		livestreamer = self.config.get_config_value("livestreamer-path")
+		if livestreamer is None or livestreamer.strip() == "" or not os.path.isfile(livestreamer):
+			self.insertText("Livestreamer path is not configured or file doesn't exist!")
+			return
+		self.insertText("Measuring throughput for automatic quality selection...")
+		command_format = self.config.get_config_value("stream-url-command-format")
+		command = command_format.format(livestreamer=livestreamer, url=session["url"], quality="worst")
+		worker = ThroughputProbeWorker(shlex.split(command))
+		self.livestreamer_thread = worker
+		worker.statusMessage.connect(self.handle_livestreamer_thread_message_signal)
+		worker.measured.connect(lambda throughput: self.handle_throughput_measured_signal(session, throughput, worker))
+		worker.start()
+
+	def get_measured_throughput(self, session):
+		"""Returns the throughput of the channel's recent throughput test, or None if there's none.
+		The throughput of playback isn't used, as livestreamer only downloads as fast as the stream plays."""
+		measured = self.measured_throughput.get((session["streamer"], session["channel"]))
+		if measured is None or time.monotonic() - measured[1] > self.measured_throughput_lifetime:
+			return None
+		return measured[0]
+
+	def handle_throughput_measured_signal(self, session, throughput, worker):
+		worker.wait(self.thread_exit_grace_time)
+		if throughput is not None:
+			self.measured_throughput[(session["streamer"], session["channel"])] = (throughput, time.monotonic())
+		if self.livestreamer_thread is not worker:
+			# Something else was started while measuring; the measurement is kept for the next session
+			self.insertText("Throughput test of channel '{}' finished after another session had started; not starting it.".format(session["channel"]))
+			return
+		self.livestreamer_thread = None
+		if throughput is None:
+			self.insertText("Throughput test failed; falling back to the best quality.")
+			session["quality"] = "best"
+			self.start_livestreamer_session(session)
+		else:
+			self.start_auto_quality_session(session, throughput)
+
+	def start_auto_quality_session(self, session, throughput):
+		headroom = self.config.get_config_value("auto-quality-headroom") / 100
+		session["quality"] = choose_quality(session["qualities"], throughput, headroom) or "best"
+		self.insertText("Measured {}; selected quality '{}'.".format(format_rate(throughput), session["quality"]))
+		self.start_livestreamer_session(session)
+
+	def get_executable_path(self, config_name, description):
+		path = self.config.get_config_value(config_name)
+		try:
+			if path is None or path.strip() == "":
+				raise OSError("Not configured")
+			if config_name == "livestreamer-path":
+				self.check_executable(path)
+			else:
+				# Only livestreamer is run to check it; a player may well open a window for --version
+				get_executable_mtime(path)
+		except OSError:
+			self.insertText("{} path is not configured or file doesn't exist!".format(description))
+			return None
+		return path
+
+	def check_executables(self):
+		"""Checks the configured livestreamer executable in the background, unless it's known already."""
+		path = self.config.get_config_value("livestreamer-path")
+		if path is None or path.strip() == "":
+			return
+		try:
+			self.check_executable(path)
+		except OSError:
+			pass
+
+	def check_executable(self, path):
+		"""Returns the ExecutableCapabilities of the livestreamer executable, or None if they're not known (yet). A new
+		executable, or one whose file has changed, is checked in the background. Raises OSError if the file doesn't exist."""
+		mtime = get_executable_mtime(path)
+		known = self.executable_capabilities.get(path)
+		if known is not None and known[0] in (None, mtime):
+			return known[1]
+		if self.config.get_config_value("db-version") >= 21:
+			cached = self.config.get_executable_capabilities(path, mtime)
+			if cached is not None:
+				capabilities = ExecutableCapabilities(path, mtime, cached["version"], cached["flags"])
+				self.executable_capabilities[path] = (mtime, capabilities)
+				return capabilities
+		self.executable_capabilities[path] = (None, None)
+		threading.Thread(target=self.run_executable_check, args=(path, mtime), daemon=True).start()
+		return None
+
+	def run_executable_check(self, path, mtime):
+		try:
+			result = probe_executable(path)
+		except (OSError, subprocess.SubprocessError) as e:
+			result = e
+		self.executableProbed.emit((path, mtime, result))
+
+	def handle_probed_executable(self, result):
+		path, mtime, capabilities = result
+		if isinstance(capabilities, Exception):
+			# Not checked again until the file changes
+			self.executable_capabilities[path] = (mtime, None)
+			self.insertText("Checking '{}' failed, so it may not run: {}".format(path, str(capabilities) or capabilities.__class__.__name__))
+			return
+		self.executable_capabilities[path] = (capabilities.mtime, capabilities)
+		if self.config.get_config_value("db-version") >= 21:
+			self.config.set_executable_capabilities(path, capabilities.mtime, capabilities.version, capabilities.flags)
+		self.insertText("Checked '{}': {}.".format(os.path.basename(path), capabilities.describe()))
+
+	def start_livestreamer_session(self, session):
+		mode = session["mode"]
+		quality = session["quality"]
+		stream_url = session["url"]
+
+		standby = self.standby_pool.find(session["streamer"], session["channel"], quality)
+		if mode == "watch" and standby is not None and standby.ready:
+			self.activate_standby(self.standby_pool.take(standby))
+			return
+
+		livestreamer = self.get_executable_path("livestreamer-path", "Livestreamer")
+		if livestreamer is None:
+			return
+		player = None
+		if mode != "record":
+			player = self.get_executable_path("player-path", "Player")
+			if player is None:
 				return
+		if mode == "proxy":
+			self.resolve_proxy_stream_url(session, livestreamer, player)
+			return
+		if mode == "watch":
 			command_format = self.config.get_config_value("command-format")
-			quality = self.quality_input.currentText()
-			if "(" in quality:
-				quality = quality[:quality.find("(")].strip()
-			command = command_format.format(livestreamer=livestreamer, player=player, url=stream_url, quality=quality)
-			self.livestreamer_thread = LivestreamerWorker(shlex.split(command))
-			self.insertText("Starting Livestreamer thread.")
-			self.livestreamer_thread.finished.connect(self.handle_livestreamer_thread_finished_signal)
-			self.livestreamer_thread.statusMessage.connect(self.handle_livestreamer_thread_message_signal)
+			arguments = self.get_livestreamer_arguments(command_format, session, livestreamer=livestreamer, player=player, url=stream_url, quality=quality)
+			arguments[1:1] = self.get_session_handoff_arguments(session, livestreamer)
+			worker = self.create_supervised_worker(arguments, session)
+			if worker is None:
+				worker = LivestreamerWorker(arguments, collect_metrics=self.collect_metrics())
+		else:
+			worker = self.create_recording_worker(livestreamer, player, session, mode == "watch-record")
+		self.begin_session(session, worker)
+
+	def resolve_proxy_stream_url(self, session, livestreamer, player):
+		"""Resolves the stream's URL with livestreamer, and then plays it through the local HLS proxy."""
+		self.insertText("Resolving the stream URL for the local proxy...")
+		command_format = self.config.get_config_value("stream-url-command-format")
+		command = command_format.format(livestreamer=livestreamer, url=session["url"], quality=session["quality"])
+		self.livestreamer_thread = StreamUrlWorker(shlex.split(command))
+		self.livestreamer_thread.statusMessage.connect(self.handle_livestreamer_thread_message_signal)
+		self.livestreamer_thread.resolved.connect(lambda url: self.start_proxy_session(session, player, url))
+		self.livestreamer_thread.start()
+
+	def start_proxy_session(self, session, player, stream_url):
+		if self.livestreamer_thread is not None:
+			self.livestreamer_thread.wait(self.thread_exit_grace_time)
+			self.livestreamer_thread = None
+		if stream_url is None:
+			return
+		if ".m3u8" not in stream_url:
+			self.insertText("The local proxy only supports HLS streams, and this one isn't; watch it directly instead.")
+			return
+		proxy = self.get_hls_proxy()
+		if proxy is None:
+			return
+
+		key = re.sub(r"[^\w.-]+", "_", "{}-{}-{}".format(session["streamer"], session["channel"], session["quality"]))
+		proxy.add_feed(key, stream_url)
+		if proxy.host in ("", "0.0.0.0"):
+			# Listening on all interfaces, so players elsewhere on the network can share the stream too
+			playlist_url = proxy.get_url(key, "127.0.0.1")
+			shared_url = proxy.get_url(key, socket.gethostname())
+		else:
+			playlist_url = shared_url = proxy.get_url(key)
+		self.insertText("Other players can open the stream at {}".format(shared_url))
+
+		command = self.config.get_config_value("player-url-command-format").format(player=player, url=playlist_url)
+		self.begin_session(session, PlayerWorker(shlex.split(command)))
+
+	def get_hls_proxy(self):
+		"""Starts the local HLS proxy on first use and returns it, or None if it couldn't be started."""
+		if self.hls_proxy is not None:
+			return self.hls_proxy
+		proxy = HLSProxy(
+			self.get_event_loop_thread(),
+			self.config.get_config_value("proxy-bind-address") or "127.0.0.1",
+			self.config.get_config_value("proxy-port"),
+			cache_size=self.config.get_config_value("proxy-cache-size") * 1024 * 1024,
+			client_timeout=self.config.get_config_value("proxy-client-timeout"),
+			)
+		try:
+			proxy.start()
+		except OSError as e:
+			proxy.stop()
+			self.insertText("Failed to start the local proxy; {}".format(str(e)))
+			return None
+		self.hls_proxy = proxy
+		self.insertText("Local proxy listening on {}:{}".format(proxy.host, proxy.port))
+		return proxy
+
+	def stop_hls_proxy(self):
+		if self.hls_proxy is not None:
+			self.hls_proxy.stop()
+			self.hls_proxy = None
+
+	def setup_watchdog(self):
+		"""Starts or stops the GUI stall watchdog, depending on the configuration."""
+		enabled = self.config.get_config_value("db-version") >= 14 and bool(self.config.get_config_value("watchdog-enabled"))
+		if not enabled:
+			self.stop_watchdog()
+			return
+		if self.watchdog is not None:
+			return
+		self.watchdog = StallWatchdog(
+			self.config.get_config_value("watchdog-log") or "diagnostics.log",
+			threshold=max(self.config.get_config_value("watchdog-threshold"), self.watchdog_interval * 2) / 1000,
+			)
+		self.watchdog.start()
+		self.watchdog_timer.start(self.watchdog_interval)
+
+	def stop_watchdog(self):
+		if self.watchdog is not None:
+			self.watchdog_timer.stop()
+			self.watchdog.stop()
+			self.watchdog = None
+
+	def watchdog_heartbeat(self):
+		self.watchdog.heartbeat()
+		for duration in self.watchdog.pop_stalls():
+			self.insertText("The window was unresponsive for {:.1f} s; the cause was written to '{}'.".format(duration, self.watchdog.log_path))
+
+	def setup_telemetry(self):
+		"""Starts the telemetry writer, if it's enabled in the configuration."""
+		if self.config.get_config_value("db-version") < 19 or not self.config.get_config_value("telemetry-enabled") or self.telemetry is not None:
+			return
+		self.telemetry = TelemetryWriter(CONFIGFILE)
+		self.telemetry.start()
+
+	def stop_telemetry(self):
+		if self.telemetry is not None:
+			self.telemetry.stop(self.thread_exit_grace_time / 1000)
+			self.telemetry = None
+
+	def record_telemetry(self, kind, channel_id=None, duration=None, success=None, exit_code=None):
+		"""Records an event in the telemetry, if it's enabled. Can be called from any thread."""
+		telemetry = self.telemetry
+		if telemetry is not None:
+			telemetry.record(kind, channel_id, duration, success, exit_code)
+
+	def get_supervisor(self, spawn=True):
+		"""Returns the client of the session supervisor, starting the supervisor if asked to. Returns None if it couldn't be reached."""
+		if self.supervisor is None:
+			try:
+				self.supervisor = SupervisorClient.connect(SUPERVISOR_KEYFILE, spawn, self.config.get_config_value("supervisor-log-lines"))
+			except (SupervisorError, OSError) as e:
+				self.insertText("Failed to connect to the session supervisor; {}".format(str(e)))
+		return self.supervisor
+
+	def create_supervised_worker(self, arguments, session):
+		"""Returns a worker running the session in the session supervisor, or None if it's not enabled or can't be reached."""
+		if self.config.get_config_value("db-version") < 20 or not self.config.get_config_value("supervisor-enabled"):
+			return None
+		client = self.get_supervisor()
+		if client is None:
+			self.insertText("Running the session without the supervisor.")
+			return None
+		# What the next start of the GUI needs to take the session over; the monotonic times mean nothing to another process
+		info = dict((name, value) for name, value in session.items() if name not in ("requested", "dropped"))
+		return SupervisedWorker(client, arguments, info, collect_metrics=self.collect_metrics())
+
+	def reattach_sessions(self):
+		"""Takes over the session a previous run of the GUI left running in the session supervisor, with its latest output."""
+		if self.config.get_config_value("db-version") < 20 or not self.config.get_config_value("supervisor-enabled"):
+			return
+		client = self.get_supervisor(spawn=False)
+		if client is None:
+			return
+		try:
+			sessions = client.request("list")["sessions"]
+			for session in sorted(sessions, key=lambda session: session["started"]):
+				if not session["running"]:
+					client.request("forget", id=session["id"])
+				elif self.livestreamer_thread is None and session["info"] is not None:
+					self.insertText("Reattaching to the running session of channel '{}'.".format(session["info"]["channel"]))
+					self.begin_session(session["info"], SupervisedWorker(client, None, session["info"], session["id"], collect_metrics=self.collect_metrics()))
+				else:
+					# Only one session is shown at a time
+					self.insertText("Another session of channel '{}' is running in the session supervisor.".format(session["info"]["channel"] if session["info"] else session["id"]))
+		except SupervisorError as e:
+			self.insertText("Failed to reattach to the session supervisor; {}".format(str(e)))
+
+	def get_event_loop_thread(self):
+		"""Returns the thread running the asyncio event loop of the local servers, starting it on first use."""
+		if self.event_loop_thread is None:
+			self.event_loop_thread = EventLoopThread()
+			self.event_loop_thread.start()
+		return self.event_loop_thread
+
+	def stop_event_loop_thread(self):
+		if self.event_loop_thread is not None:
+			self.event_loop_thread.stop()
+			self.event_loop_thread = None
+
+	def setup_control_api(self):
+		"""Starts or stops the control API, depending on the configuration."""
+		enabled = self.config.get_config_value("db-version") >= 12 and bool(self.config.get_config_value("control-api-enabled"))
+		if not enabled:
+			self.stop_control_api()
+			return
+		if self.control_server is not None:
+			return
+		server = ControlServer(
+			self.get_event_loop_thread(),
+			self,
+			port=self.config.get_config_value("control-api-port"),
+			socket_path=self.config.get_config_value("control-api-socket") or None,
+			)
+		try:
+			server.start()
+		except OSError as e:
+			server.stop()
+			self.insertText("Failed to start the control API; {}".format(str(e)))
+			return
+		self.control_server = server
+		self.insertText("Control API listening on {}".format(server.address))
+
+	def stop_control_api(self):
+		if self.control_server is not None:
+			self.control_server.stop()
+			self.control_server = None
+
+	def stop_session(self):
+		"""Stops the running session. Returns a dict telling whether there was one to stop."""
+		if self.cancel_reconnect():
+			self.insertText("Cancelled reconnecting the dropped session.")
+			return {"stopped": True}
+		if self.livestreamer_thread is None or not self.livestreamer_thread.isRunning():
+			return {"stopped": False}
+		self.insertText("Stopping the session.")
+		if self.session is not None:
+			self.session["stop-requested"] = True
+		self.livestreamer_thread.term_process()
+		return {"stopped": True}
+
+	def get_session_state(self):
+		if self.session is None:
+			return None
+		state = dict((name, self.session[name]) for name in ("streamer", "channel", "url", "mode", "quality"))
+		if self.session_metrics is not None:
+			state["metrics"] = self.session_metrics.describe()
+		return state
+
+	def begin_session(self, session, worker):
+		"""Makes the worker the running session and starts it, unless it's already running (a warm standby)."""
+		if self.session_log is not None:
+			self.session_log.start_session("{} / {} ({}, {})".format(session["streamer"], session["channel"], session["quality"], session["mode"]))
+		self.insertText("Starting Livestreamer thread.")
+		self.session = session
+		# The setting may change during the session; only one that collected its metrics from the start is tuned on
+		session["collect-metrics"] = self.collect_metrics()
+		self.livestreamer_thread = worker
+		self.livestreamer_thread.finished.connect(self.handle_livestreamer_thread_finished_signal)
+		self.livestreamer_thread.statusMessage.connect(self.handle_livestreamer_thread_message_signal)
+		self.livestreamer_thread.metricMessage.connect(self.handle_livestreamer_thread_metric_signal)
+		self.session_metrics = SessionMetrics()
+		self.throughput_label.setText(self.session_metrics.describe())
+		if not self.livestreamer_thread.isRunning():
 			self.livestreamer_thread.start()
 
+		if procstat.is_supported():
+			self.resource_sampler = SessionResourceSampler()
+			self.resource_timer.start(self.resource_sample_interval)
+
+	def get_selected_session(self):
+		"""Returns a session dict for the selected streamer, channel, mode and quality, or None if the selection is incomplete."""
+		stream_url = self.get_streamer_url()
+		if stream_url is None:
+			self.insertText("Failed to form a complete streamer URL (missing streamer/channel/stream)!")
+			return None
+		quality = self.get_quality_name(self.quality_input.currentText())
+		return {
+			"streamer": self.streamer_input.currentText(),
+			"channel": self.channel_input.currentText(),
+			"channel_id": self.channel_input.currentData(),
+			"url": stream_url,
+			"requested": time.monotonic(),		# When the user asked for it, for the time to the player start
+			"mode": self.mode_input.currentData(),
+			"quality": quality,
+			"qualities": [self.get_quality_name(self.quality_input.itemText(i)) for i in range(self.quality_input.count())],
+			"auto": quality == AUTO_QUALITY,
+		}
+
+	def cmd_queue_next_channel(self):
+		if self.config.get_config_value("db-version") < 10:
+			self.insertText("Warm standbys require config database version 10!")
+			return
+		if not self.run_livestreamer_button.isEnabled():
+			self.insertText("Load the channel's streams before queueing it.")
+			return
+		session = self.get_selected_session()
+		if session is None:
+			return
+		session["mode"] = "watch"
+		if session["auto"]:
+			# There's no time to measure anything when switching, so use what's known
+			throughput = self.get_measured_throughput(session)
+			headroom = self.config.get_config_value("auto-quality-headroom") / 100
+			session["quality"] = choose_quality(session["qualities"], throughput, headroom) if throughput is not None else "best"
+		if self.standby_pool.find(session["streamer"], session["channel"], session["quality"]) is not None:
+			self.insertText("Channel '{}' is already queued.".format(session["channel"]))
+			return
+		self.standby_pool.max_standbys = self.config.get_config_value("max-warm-standbys")
+		if self.standby_pool.is_full():
+			self.insertText("The limit of {} warm standby(s) is reached.".format(self.standby_pool.max_standbys))
+			return
+		livestreamer = self.get_executable_path("livestreamer-path", "Livestreamer")
+		if livestreamer is None:
+			return
+
+		port = get_free_port()
+		command_format = self.config.get_config_value("standby-command-format")
+		arguments = self.get_livestreamer_arguments(command_format, session, livestreamer=livestreamer, port=port, url=session["url"], quality=session["quality"])
+		worker = StandbyWorker(arguments, collect_metrics=True)
+		standby = WarmStandby(session, port, worker)
+		worker.metricMessage.connect(lambda event: self.handle_standby_metric_signal(standby, event))
+		worker.finished.connect(lambda: self.handle_standby_finished_signal(standby))
+		self.standby_pool.add(standby)
+		worker.start()
+		self.insertText("Warming up channel '{}' ({}) as the next channel.".format(session["channel"], session["quality"]))
+
+	def handle_standby_metric_signal(self, standby, event):
+		if event.name == "player-started" and not standby.ready:
+			standby.ready = True
+			self.insertText("Channel '{}' is warm at {}".format(standby.session["channel"], standby.url))
+
+	def handle_standby_finished_signal(self, standby):
+		if self.standby_pool.remove_worker(standby.worker) is not None:
+			self.insertText("Warm standby for channel '{}' exited.".format(standby.session["channel"]))
+
+	def cmd_switch_to_next_channel(self):
+		standby = self.standby_pool.next()
+		if standby is None:
+			self.insertText("No channel is queued.")
+			return
+		if not standby.ready:
+			self.insertText("Channel '{}' is still warming up.".format(standby.session["channel"]))
+			return
+		self.standby_pool.take(standby)
+		if self.livestreamer_thread is not None and self.livestreamer_thread.isRunning():
+			# Switch once the current session has ended
+			self.pending_standby = standby
+			self.livestreamer_thread.term_process()
+		else:
+			self.activate_standby(standby)
+
+	def activate_standby(self, standby):
+		if not standby.worker.isRunning():
+			# It exited after it was taken from the pool, e.g. while the previous session was ending, and taking it
+			# over would restart its thread; it's out of the pool, so the channel isn't looked up there again
+			self.insertText("The warm standby of channel '{}' has exited; starting the channel normally.".format(standby.session["channel"]))
+			self.start_livestreamer_session(standby.session)
+			return
+		player = self.get_executable_path("player-path", "Player")
+		if player is None:
+			standby.worker.term_process()
+			return
+		standby.worker.metricMessage.disconnect()
+		standby.worker.finished.disconnect()
+		self.insertText("Switching to the warm standby of channel '{}'.".format(standby.session["channel"]))
+		self.begin_session(standby.session, standby.worker)
+		command_format = self.config.get_config_value("player-url-command-format")
+		standby.worker.attach_player(shlex.split(command_format.format(player=player, url=standby.url)))
+
+	def sample_session_resources(self):
+		thread = self.livestreamer_thread
+		process = thread.process if thread is not None else None
+		if process is None or self.resource_sampler is None:
+			return
+		player_process = getattr(thread, "player_process", None)
+		self.resource_sampler.sample(process.pid, [player_process.pid] if player_process is not None else [])
+		self.resource_label.setText(self.resource_sampler.describe())
+		if self.session_metrics is not None and not isinstance(thread, LivestreamerRecordingWorker):
+			# Livestreamer doesn't report its progress when playing, so the throughput is what it reads;
+			# a recording's throughput is reported by the recorder
+			rate = self.resource_sampler.read_rate(process.pid)
+			if rate is not None:
+				self.session_metrics.add(MetricEvent("throughput", rate))
+				self.throughput_label.setText(self.session_metrics.describe())
+
+	def finish_resource_sampling(self):
+		self.resource_timer.stop()
+		if self.resource_sampler is not None:
+			self.insertText(self.resource_sampler.summary())
+			self.resource_sampler = None
+		self.resource_label.clear()
+
 	@QtCore.pyqtSlot(object)
 	def handle_livestreamer_thread_message_signal(self, event):
 		self.insertText(event.message, event.add_newline, event.add_timestamp)
 
+	@QtCore.pyqtSlot(object)
+	def handle_livestreamer_thread_metric_signal(self, event):
+		if self.session_metrics is None:
+			return
+		if event.name == "player-started" and self.session_metrics.player_started is None and "requested" in self.session:
+			self.record_telemetry("player-start", self.session["channel_id"], time.monotonic() - self.session["requested"])
+		if "dropped" in self.session and (event.name == "player-started" or self.session["mode"] == "record"):
+			# Without a player, the first data recorded ends the downtime
+			downtime = time.monotonic() - self.session.pop("dropped")
+			self.insertText("Reconnected to channel '{}' after {:.1f} s.".format(self.session["channel"], downtime))
+			self.record_telemetry("reconnect", self.session["channel_id"], downtime, success=True)
+		self.session_metrics.add(event)
+		self.throughput_label.setText(self.session_metrics.describe())
+		if event.name == "underrun" and self.session is not None and self.session["auto"]:
+			self.check_auto_quality_downgrade()
+
+	def check_auto_quality_downgrade(self):
+		if self.session.get("restart-quality") is not None:
+			return
+		if self.session_metrics.recent_underruns(self.config.get_config_value("auto-quality-stall-window")) < self.config.get_config_value("auto-quality-stall-limit"):
+			return
+		lower = lower_quality(self.session["qualities"], self.session["quality"])
+		if lower is None:
+			return
+		self.insertText("Repeated buffer underruns at quality '{}'; restarting at '{}'.".format(self.session["quality"], lower))
+		self.session["restart-quality"] = lower
+		self.livestreamer_thread.term_process()
+
+	def update_transport_statistics(self, session, metrics):
+		if self.config.get_config_value("db-version") < 9 or not session.get("collect-metrics"):
+			# Without the debug output there are no underruns or latencies to go on
+			return
+		minutes = (time.monotonic() - metrics.started) / 60
+		if minutes < self.min_tuning_session_length:
+			# Too short to say anything about the transport
+			return
+		with self.config.batch():
+			self.config.add_transport_statistics_by_id(session["channel_id"], len(metrics.underruns) / minutes, metrics.average_latency)
+			changes = self.transport_tuner.tune(self.config.get_transport_profile_by_id(session["channel_id"]))
+			if changes:
+				self.config.set_transport_profile_by_id(session["channel_id"], changes)
+				self.insertText("Auto-tuned transport of channel '{}': {}".format(session["channel"], ", ".join("{} = {}".format(name, value) for name, value in sorted(changes.items()))))
+
 	def handle_livestreamer_thread_finished_signal(self):
+		worker = self.livestreamer_thread
 		self.livestreamer_thread = None
+		self.finish_resource_sampling()
+		metrics = self.session_metrics
+		session = self.session
+		self.session = None
+		verdict = None
+		if session is not None and worker is not None:
+			uptime = time.monotonic() - metrics.started if metrics is not None else None
+			stable_time = self.config.get_config_value("reconnect-stable-time") if self.config.get_config_value("db-version") >= 23 else None
+			verdict = classify_exit(worker.exit_code, worker.recent_lines, session.pop("stop-requested", False), uptime, stable_time)
+		if session is not None and metrics is not None:
+			# Only a dropped session failed; one the user stopped often ends with a nonzero exit code
+			success = verdict != "dropped" if verdict is not None else None
+			self.record_telemetry("session", session["channel_id"], time.monotonic() - metrics.started, success, worker.exit_code if worker is not None else None)
+		if self.session_metrics is not None:
+			self.insertText(self.session_metrics.summary())
+			self.session_metrics = None
+		self.throughput_label.clear()
+
+		if session is not None and metrics is not None:
+			self.update_transport_statistics(session, metrics)
+		if self.pending_standby is not None:
+			standby = self.pending_standby
+			self.pending_standby = None
+			self.activate_standby(standby)
+		elif session is not None and session.get("restart-quality") is not None:
+			session["quality"] = session.pop("restart-quality")
+			self.start_livestreamer_session(session)
+		elif verdict is not None and metrics is not None:
+			self.check_reconnect(session, verdict, worker.exit_code, time.monotonic() - metrics.started)
+
+	def get_reconnect_policy(self):
+		"""Returns the ReconnectPolicy of the configuration, or None if dropped sessions aren't reconnected."""
+		if self.config.get_config_value("db-version") < 23 or not self.config.get_config_value("reconnect-enabled"):
+			return None
+		values = self.config.get_config_values(["reconnect-max-attempts", "reconnect-initial-delay", "reconnect-max-delay", "reconnect-stable-time"])
+		return ReconnectPolicy(values["reconnect-max-attempts"], values["reconnect-initial-delay"], values["reconnect-max-delay"], values["reconnect-stable-time"])
+
+	def check_reconnect(self, session, verdict, exit_code, uptime):
+		"""Schedules the session to be started again if it dropped, rather than being stopped or finishing."""
+		policy = self.get_reconnect_policy()
+		# The proxy's session is the player's, which only ends when it's closed
+		if policy is None or session["mode"] == "proxy" or verdict != "dropped":
+			return
+		if uptime >= policy.stable_time:
+			session["reconnect-attempts"] = 0
+		session.setdefault("dropped", time.monotonic())
+		self.insertText("The session of channel '{}' dropped (exit code {}).".format(session["channel"], exit_code))
+		self.schedule_reconnect(session, policy)
+
+	def schedule_reconnect(self, session, policy):
+		attempt = session.get("reconnect-attempts", 0) + 1
+		delay = policy.get_delay(attempt)
+		if delay is None:
+			self.insertText("Gave up reconnecting to channel '{}' after {} attempt(s).".format(session["channel"], attempt - 1))
+			self.record_telemetry("reconnect", session["channel_id"], time.monotonic() - session.pop("dropped"), success=False)
+			return
+		session["reconnect-attempts"] = attempt
+		# The time to the player start only counts for the sessions the user asked for
+		session.pop("requested", None)
+		self.insertText("Reconnecting in {} s (attempt {} of {}).".format(delay, attempt, policy.max_attempts))
+		self.pending_reconnect = session
+		self.reconnect_timer.start(delay * 1000)
+
+	def cancel_reconnect(self):
+		"""Cancels the pending reconnect. Returns True if there was one."""
+		self.reconnect_timer.stop()
+		session, self.pending_reconnect = self.pending_reconnect, None
+		return session is not None
+
+	def reconnect_session(self):
+		session = self.pending_reconnect
+		if session is None:
+			return
+		if self.livestreamer_thread is not None:
+			# Something else was started in the meantime
+			self.pending_reconnect = None
+			return
+		if not self.config.get_config_value("reconnect-reprobe"):
+			self.pending_reconnect = None
+			self.start_livestreamer_session(session)
+			return
+		channel = self.config.get_channel_by_id(session["channel_id"])
+		if channel is None:
+			self.pending_reconnect = None
+			return
+		streamer = self.config.get_streamer_by_id(channel["streamer_id"])
+		command = None
+		if self.get_prober().needs_command:
+			livestreamer = self.get_executable_path("livestreamer-path", "Livestreamer")
+			if livestreamer is None:
+				self.pending_reconnect = None
+				return
+			command = shlex.split(self.config.get_config_value("probe-command-format").format(livestreamer=livestreamer, url=session["url"]))
+		self.insertText("Probing channel '{}' before reconnecting...".format(session["channel"]))
+		future = self.start_probe(streamer, channel, session["url"], command, True)
+		future.add_done_callback(lambda future: self.reconnectProbed.emit((session, future)))
+
+	def handle_reconnect_probe(self, result):
+		session, future = result
+		if self.pending_reconnect is not session:
+			# Cancelled while probing
+			return
+		self.pending_reconnect = None
+		if self.livestreamer_thread is not None:
+			return
+		try:
+			streams, metadata = future.result()
+		except Exception as e:
+			self.insertText("Probing channel '{}' failed: {}".format(session["channel"], str(e)))
+			policy = self.get_reconnect_policy()
+			if policy is not None:
+				self.schedule_reconnect(session, policy)
+			return
+		with self.config.batch():
+			self.config.clean_quality_cache_by_id(session["channel_id"])
+			if streams:
+				self.config.add_quality_to_cache_by_id(session["channel_id"], streams, metadata)
+		if self.channel_input.currentData() == session["channel_id"]:
+			self.display_loaded_streams(streams, skip_caching=True, metadata=metadata)
+		if not streams:
+			self.insertText("Channel '{}' is not streaming anymore; not reconnecting.".format(session["channel"]))
+			self.record_telemetry("reconnect", session["channel_id"], time.monotonic() - session.pop("dropped"), success=False)
+			return
+		session["qualities"] = [self.get_quality_name(stream) for stream in streams]
+		if session["quality"] not in session["qualities"]:
+			self.insertText("Quality '{}' is not available anymore; reconnecting at 'best'.".format(session["quality"]))
+			session["quality"] = "best"
+		self.start_livestreamer_session(session)
 
 	def update_colors(self):
 		foreground_color = self.config.get_config_value("foreground-color")
@@ -639,8 +1806,13 @@ class MainWindow(QMainWindow):
 			timestamp = format(datetime.now().strftime(self.timestamp_format))
 			text = "{} ".format(timestamp)
 		text += msg
+		if add_newline:
+			text += "\n"
 		self.log_widget.moveCursor(QTextCursor.End)
 		self.log_widget.insertPlainText(text)
-		if add_newline:
-			self.log_widget.insertPlainText("\n")
 		self.log_widget.update()
+
+		if self.session_log is not None:
+			self.session_log.write(text)
+		for listener in list(self.log_listeners):
+			listener(text)
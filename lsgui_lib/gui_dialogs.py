@@ -2,10 +2,16 @@ import sys
 import os.path
 import platform
 
-from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QGridLayout, QLabel, QLineEdit, QCheckBox, QPushButton, QMessageBox, QFileDialog, QColorDialog, QSpinBox, QTableWidget
-from PyQt5.QtGui import QIcon, QColor
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QGridLayout, QLabel, QLineEdit, QCheckBox, QPushButton, QMessageBox, QFileDialog, QColorDialog, QSpinBox, QTableWidget, QTextEdit, QComboBox
+from PyQt5.QtGui import QColor, QTextCursor, QFont
 from PyQt5.QtCore import QRegExp, Qt
 
+from .worker import LogSearchWorker
+from .icons import get_icon
+from .transport import HANDOFF_MODES
+from .live_status import TWITCH_STATUS_API_URL
+from .probe import PROBE_BACKENDS
+
 class BaseDialog(QDialog):
 	"""The base class of all our config windows. All common setup should be done in here."""
 	def __init__(self, parent, config, modal=True, streamer_icon=None, title=None, geometry=None, resizable=False):
@@ -16,6 +22,7 @@ class BaseDialog(QDialog):
 		self.streamer_icon = streamer_icon	# Path to the icon for this window
 		self.window_geometry = geometry
 		self.is_resizable = resizable
+		self.db_version = config.get_config_value("db-version")	# The widgets are set up for this version
 
 		self.result_data = None	 # For use if a dialog needs to return something back to the caller
 
@@ -36,11 +43,13 @@ class BaseDialog(QDialog):
 	def setup_geometry(self):
 		if self.window_geometry:
 			if self.is_resizable:
-				self.setGeometry(self.window_geometry[0], self.window_geometry[1])
+				self.resize(self.window_geometry[0], self.window_geometry[1])
 				self.setMinimumSize(self.window_geometry[0], self.window_geometry[1])
 			else:
 				self.setFixedSize(self.window_geometry[0], self.window_geometry[1])
+		self.center_on_screen()
 
+	def center_on_screen(self):
 		center_point = QApplication.desktop().availableGeometry().center()
 		frame_geometry = self.frameGeometry()
 		frame_geometry.moveCenter(center_point)
@@ -49,7 +58,17 @@ class BaseDialog(QDialog):
 	def setup_window_icon(self):
 		# Set the same window icon as the parent
 		if self.streamer_icon is not None:
-			self.setWindowIcon(QIcon(self.streamer_icon))
+			self.setWindowIcon(get_icon(self.streamer_icon))
+
+	def rebind(self, streamer_icon=None, title=None):
+		"""Prepares a dialog that was shown before to be shown again. Subclasses reload their data here, instead of the dialog being built again."""
+		self.result_data = None
+		if streamer_icon is not None and streamer_icon != self.streamer_icon:
+			self.streamer_icon = streamer_icon
+			self.setup_window_icon()
+		if title is not None:
+			self.setWindowTitle(title)
+		self.center_on_screen()
 
 	def setup_layout(self):
 		self.layout = QGridLayout(self)
@@ -57,14 +76,11 @@ class BaseDialog(QDialog):
 
 	def update_colors(self, fg_override=None, bg_override=None):
 		"""This applies the foreground color to all the widgets in the list. This method is not called in this base class."""
-		if fg_override is not None:
-			foreground_color = fg_override
-		else:
-			foreground_color = self.config.get_config_value("foreground-color")
-		if bg_override is not None:
-			background_color = bg_override
-		else:
-			background_color = self.config.get_config_value("background-color")
+		colors = {}
+		if fg_override is None or bg_override is None:
+			colors = self.config.get_config_values(["foreground-color", "background-color"])
+		foreground_color = fg_override if fg_override is not None else colors["foreground-color"]
+		background_color = bg_override if bg_override is not None else colors["background-color"]
 		self.setStyleSheet("QDialog QLabel {{ color: {0} }} QDialog {{ background: {1} }}".format(foreground_color, background_color))
 		self.update()
 
@@ -82,17 +98,45 @@ class AppConfigDialog(BaseDialog):
 	"""The window with application's global configuration settings."""
 
 	cache_max_value = 999999
+	status_api_streamer = "twitch.tv"	# The streamer whose status API is set up here
 
 	def __init__(self, parent, config, modal=True, streamer_icon=None, title=None):
 		super().__init__(parent, config, modal=modal, streamer_icon=streamer_icon, title="Application configuration", geometry=(500, 260))
-		if self.config.get_config_value("db-version") >= 2:
+		if self.db_version >= 23:
+			self.window_geometry = (500, 650)
+			self.setup_geometry()
+		elif self.db_version >= 20:
+			self.window_geometry = (500, 620)
+			self.setup_geometry()
+		elif self.db_version >= 17:
+			self.window_geometry = (500, 590)
+			self.setup_geometry()
+		elif self.db_version >= 15:
+			self.window_geometry = (500, 470)
+			self.setup_geometry()
+		elif self.db_version >= 14:
+			self.window_geometry = (500, 440)
+			self.setup_geometry()
+		elif self.db_version >= 12:
+			self.window_geometry = (500, 410)
+			self.setup_geometry()
+		elif self.db_version >= 7:
+			self.window_geometry = (500, 380)
+			self.setup_geometry()
+		elif self.db_version >= 5:
+			self.window_geometry = (500, 350)
+			self.setup_geometry()
+		elif self.db_version >= 2:
 			self.window_geometry = (500, 320)
 			self.setup_geometry()
 
 		self.original_values = {}
 
 		self.load_config_values()
-		self.update_colors()
+
+	def rebind(self, streamer_icon=None, title=None):
+		super().rebind(streamer_icon, title)
+		self.load_config_values()
 
 	def setup_dialog_layout(self):
 		row = 0
@@ -150,7 +194,7 @@ class AppConfigDialog(BaseDialog):
 		self.input_cache_lifetime.setSuffix(" minute(s)")
 		self.layout.addWidget(self.input_cache_lifetime, row, 1)
 
-		if self.config.get_config_value("db-version") >= 2:
+		if self.db_version >= 2:
 			row += 1
 			label_enable_systray_icon = QLabel("Enable system tray icon", self)
 			self.layout.addWidget(label_enable_systray_icon, row, 0)
@@ -172,7 +216,7 @@ class AppConfigDialog(BaseDialog):
 			self.check_close_to_systray.setTristate(False)
 			self.layout.addWidget(self.check_close_to_systray, row, 1)
 
-		if self.config.get_config_value("db-version") >= 3:
+		if self.db_version >= 3:
 			row += 1
 			label_remember_position = QLabel("Remember window position", self)
 			self.layout.addWidget(label_remember_position, row, 0)
@@ -180,6 +224,104 @@ class AppConfigDialog(BaseDialog):
 			self.check_remember_position.setTristate(False)
 			self.layout.addWidget(self.check_remember_position, row, 1)
 
+		if self.db_version >= 5:
+			row += 1
+			label_recording_directory = QLabel("Recording directory", self)
+			self.layout.addWidget(label_recording_directory, row, 0)
+			self.input_recording_directory = QLineEdit(self)
+			self.input_recording_directory.setReadOnly(True)
+			self.layout.addWidget(self.input_recording_directory, row, 1)
+			button_recording_directory = QPushButton("Browse...", self)
+			button_recording_directory.clicked.connect(self.on_recording_directory_click)
+			self.layout.addWidget(button_recording_directory, row, 2)
+
+		if self.db_version >= 7:
+			row += 1
+			label_collect_metrics = QLabel("Collect stream metrics", self)
+			self.layout.addWidget(label_collect_metrics, row, 0)
+			self.check_collect_metrics = QCheckBox(self)
+			self.check_collect_metrics.setTristate(False)
+			self.check_collect_metrics.setToolTip("Track the throughput and stalls of the running stream, which automatic quality downgrades\nand transport auto-tuning rely on; livestreamer then logs verbosely, which costs CPU")
+			self.layout.addWidget(self.check_collect_metrics, row, 1)
+
+		if self.db_version >= 12:
+			row += 1
+			label_control_api = QLabel("Enable control API for scripts", self)
+			self.layout.addWidget(label_control_api, row, 0)
+			self.check_control_api = QCheckBox(self)
+			self.check_control_api.setTristate(False)
+			self.layout.addWidget(self.check_control_api, row, 1)
+
+		if self.db_version >= 14:
+			row += 1
+			label_watchdog = QLabel("Log GUI stalls for diagnostics", self)
+			self.layout.addWidget(label_watchdog, row, 0)
+			self.check_watchdog = QCheckBox(self)
+			self.check_watchdog.setTristate(False)
+			self.check_watchdog.setToolTip("Record where the window froze, with the Python stack, in the diagnostics log")
+			self.layout.addWidget(self.check_watchdog, row, 1)
+
+		if self.db_version >= 15:
+			row += 1
+			label_probe_backend = QLabel("Probe channels with", self)
+			self.layout.addWidget(label_probe_backend, row, 0)
+			self.input_probe_backend = QComboBox(self)
+			for backend in PROBE_BACKENDS:
+				if backend != "daemon" or self.db_version >= 16:
+					self.input_probe_backend.addItem(backend)
+			self.input_probe_backend.setToolTip("auto: the livestreamer library if the GUI's Python has it, else the livestreamer executable\n"
+				"in-process: the livestreamer library, loaded once in the GUI\ndaemon: the livestreamer library, in a separate process\n"
+				"subprocess: the configured livestreamer executable, run for each probe")
+			self.layout.addWidget(self.input_probe_backend, row, 1)
+
+		if self.db_version >= 17:
+			row += 1
+			label_status_api_url = QLabel("Twitch status API URL", self)
+			self.layout.addWidget(label_status_api_url, row, 0)
+			self.input_status_api_url = QLineEdit(self)
+			self.input_status_api_url.setPlaceholderText(TWITCH_STATUS_API_URL)
+			self.input_status_api_url.setToolTip("Look up which channels are live in batches, and only probe those; leave empty to probe every channel")
+			self.layout.addWidget(self.input_status_api_url, row, 1)
+
+			row += 1
+			label_status_api_client_id = QLabel("Status API client ID", self)
+			self.layout.addWidget(label_status_api_client_id, row, 0)
+			self.input_status_api_client_id = QLineEdit(self)
+			self.layout.addWidget(self.input_status_api_client_id, row, 1)
+
+			row += 1
+			label_status_api_token = QLabel("Status API token", self)
+			self.layout.addWidget(label_status_api_token, row, 0)
+			self.input_status_api_token = QLineEdit(self)
+			self.input_status_api_token.setEchoMode(QLineEdit.Password)
+			self.layout.addWidget(self.input_status_api_token, row, 1)
+
+			row += 1
+			label_status_cache_ttl = QLabel("Live status cache\nlifetime (in seconds)", self)
+			self.layout.addWidget(label_status_cache_ttl, row, 0)
+			self.input_status_cache_ttl = QSpinBox(self)
+			self.input_status_cache_ttl.setRange(0, self.cache_max_value)
+			self.input_status_cache_ttl.setSuffix(" second(s)")
+			self.layout.addWidget(self.input_status_cache_ttl, row, 1)
+
+		if self.db_version >= 20:
+			row += 1
+			label_supervisor = QLabel("Keep watch sessions running when the GUI closes", self)
+			self.layout.addWidget(label_supervisor, row, 0)
+			self.check_supervisor = QCheckBox(self)
+			self.check_supervisor.setTristate(False)
+			self.check_supervisor.setToolTip("Run livestreamer in a session supervisor, which the GUI reattaches to when started again")
+			self.layout.addWidget(self.check_supervisor, row, 1)
+
+		if self.db_version >= 23:
+			row += 1
+			label_reconnect = QLabel("Reconnect dropped sessions", self)
+			self.layout.addWidget(label_reconnect, row, 0)
+			self.check_reconnect = QCheckBox(self)
+			self.check_reconnect.setTristate(False)
+			self.check_reconnect.setToolTip("Start a session again, with growing delays, when livestreamer exits abnormally rather than because the player was closed")
+			self.layout.addWidget(self.check_reconnect, row, 1)
+
 		row += 1
 		button_close = QPushButton("Save && close", self)
 		button_close.clicked.connect(self.save_changes_and_close)
@@ -196,21 +338,46 @@ class AppConfigDialog(BaseDialog):
 				self.save_changes()
 
 	def load_config_values(self, update_widgets=True):
+		values = self.config.get_config_values([
+			"livestreamer-path", "player-path", "foreground-color", "background-color", "auto-refresh-quality", "quality-cache-persistance",
+			"enable-systray-icon", "minimize-to-systray", "close-to-systray", "remember-window-position", "recording-directory", "control-api-enabled",
+			"collect-stream-metrics", "watchdog-enabled", "probe-backend", "supervisor-enabled", "reconnect-enabled", "status-api-client-id", "status-api-token", "status-cache-ttl",
+			])
 		self.original_values = {
-			"input_livestreamer": self.config.get_config_value("livestreamer-path"),
-			"input_player": self.config.get_config_value("player-path"),
-			"input_fgcolor": self.config.get_config_value("foreground-color"),
-			"input_bgcolor": self.config.get_config_value("background-color"),
-			"check_auto_refresh": bool(self.config.get_config_value("auto-refresh-quality")),
-			"input_cache_lifetime": int(self.config.get_config_value("quality-cache-persistance")),
+			"input_livestreamer": values["livestreamer-path"],
+			"input_player": values["player-path"],
+			"input_fgcolor": values["foreground-color"],
+			"input_bgcolor": values["background-color"],
+			"check_auto_refresh": bool(values["auto-refresh-quality"]),
+			"input_cache_lifetime": int(values["quality-cache-persistance"]),
 		}
 
-		if self.config.get_config_value("db-version") >= 2:
-			self.original_values["check_enable_systray_icon"] = bool(self.config.get_config_value("enable-systray-icon"))
-			self.original_values["check_minimize_to_systray"] = bool(self.config.get_config_value("minimize-to-systray"))
-			self.original_values["check_close_to_systray"] = bool(self.config.get_config_value("close-to-systray"))
-		if self.config.get_config_value("db-version") >= 3:
-			self.original_values["check_remember_position"] = bool(self.config.get_config_value("remember-window-position"))
+		if self.db_version >= 2:
+			self.original_values["check_enable_systray_icon"] = bool(values["enable-systray-icon"])
+			self.original_values["check_minimize_to_systray"] = bool(values["minimize-to-systray"])
+			self.original_values["check_close_to_systray"] = bool(values["close-to-systray"])
+		if self.db_version >= 3:
+			self.original_values["check_remember_position"] = bool(values["remember-window-position"])
+		if self.db_version >= 5:
+			self.original_values["input_recording_directory"] = values["recording-directory"]
+		if self.db_version >= 7:
+			self.original_values["check_collect_metrics"] = bool(values["collect-stream-metrics"])
+		if self.db_version >= 12:
+			self.original_values["check_control_api"] = bool(values["control-api-enabled"])
+		if self.db_version >= 14:
+			self.original_values["check_watchdog"] = bool(values["watchdog-enabled"])
+		if self.db_version >= 15:
+			self.original_values["input_probe_backend"] = values["probe-backend"]
+		if self.db_version >= 17:
+			streamer = self.config.get_streamer(self.status_api_streamer)
+			self.original_values["input_status_api_url"] = (streamer["status_api_url"] or "") if streamer is not None else ""
+			self.original_values["input_status_api_client_id"] = values["status-api-client-id"]
+			self.original_values["input_status_api_token"] = values["status-api-token"]
+			self.original_values["input_status_cache_ttl"] = int(values["status-cache-ttl"])
+		if self.db_version >= 20:
+			self.original_values["check_supervisor"] = bool(values["supervisor-enabled"])
+		if self.db_version >= 23:
+			self.original_values["check_reconnect"] = bool(values["reconnect-enabled"])
 
 		if not update_widgets:
 			return
@@ -221,13 +388,33 @@ class AppConfigDialog(BaseDialog):
 		self.input_bgcolor.setText(self.original_values["input_bgcolor"])
 		self.check_auto_refresh.setChecked(self.original_values["check_auto_refresh"])
 		self.input_cache_lifetime.setValue(self.original_values["input_cache_lifetime"])
+		self.update_colors(values["foreground-color"], values["background-color"])
 
-		if self.config.get_config_value("db-version") >= 2:
+		if self.db_version >= 2:
 			self.check_enable_systray_icon.setChecked(self.original_values["check_enable_systray_icon"])
 			self.check_minimize_to_systray.setChecked(self.original_values["check_minimize_to_systray"])
 			self.check_close_to_systray.setChecked(self.original_values["check_close_to_systray"])
-		if self.config.get_config_value("db-version") >= 3:
+		if self.db_version >= 3:
 			self.check_remember_position.setChecked(self.original_values["check_remember_position"])
+		if self.db_version >= 5:
+			self.input_recording_directory.setText(self.original_values["input_recording_directory"])
+		if self.db_version >= 7:
+			self.check_collect_metrics.setChecked(self.original_values["check_collect_metrics"])
+		if self.db_version >= 12:
+			self.check_control_api.setChecked(self.original_values["check_control_api"])
+		if self.db_version >= 14:
+			self.check_watchdog.setChecked(self.original_values["check_watchdog"])
+		if self.db_version >= 15:
+			self.input_probe_backend.setCurrentText(self.original_values["input_probe_backend"])
+		if self.db_version >= 17:
+			self.input_status_api_url.setText(self.original_values["input_status_api_url"])
+			self.input_status_api_client_id.setText(self.original_values["input_status_api_client_id"])
+			self.input_status_api_token.setText(self.original_values["input_status_api_token"])
+			self.input_status_cache_ttl.setValue(self.original_values["input_status_cache_ttl"])
+		if self.db_version >= 20:
+			self.check_supervisor.setChecked(self.original_values["check_supervisor"])
+		if self.db_version >= 23:
+			self.check_reconnect.setChecked(self.original_values["check_reconnect"])
 
 	def changes_made(self):
 		base = self.original_values["input_livestreamer"] != self.input_livestreamer.text() \
@@ -238,31 +425,79 @@ class AppConfigDialog(BaseDialog):
 			or self.original_values["input_cache_lifetime"] != self.input_cache_lifetime.value()
 
 		extended = base
-		if self.config.get_config_value("db-version") >= 2:
+		if self.db_version >= 2:
 			extended = extended \
 				or self.original_values["check_enable_systray_icon"] != self.check_enable_systray_icon.isChecked() \
 				or self.original_values["check_minimize_to_systray"] != self.check_minimize_to_systray.isChecked() \
 				or self.original_values["check_close_to_systray"] != self.check_close_to_systray.isChecked()
-		if self.config.get_config_value("db-version") >= 3:
+		if self.db_version >= 3:
 			extended = extended \
 				or self.original_values["check_remember_position"] != self.check_remember_position.isChecked()
+		if self.db_version >= 5:
+			extended = extended \
+				or self.original_values["input_recording_directory"] != self.input_recording_directory.text()
+		if self.db_version >= 7:
+			extended = extended \
+				or self.original_values["check_collect_metrics"] != self.check_collect_metrics.isChecked()
+		if self.db_version >= 12:
+			extended = extended \
+				or self.original_values["check_control_api"] != self.check_control_api.isChecked()
+		if self.db_version >= 14:
+			extended = extended \
+				or self.original_values["check_watchdog"] != self.check_watchdog.isChecked()
+		if self.db_version >= 15:
+			extended = extended \
+				or self.original_values["input_probe_backend"] != self.input_probe_backend.currentText()
+		if self.db_version >= 17:
+			extended = extended \
+				or self.original_values["input_status_api_url"] != self.input_status_api_url.text().strip() \
+				or self.original_values["input_status_api_client_id"] != self.input_status_api_client_id.text().strip() \
+				or self.original_values["input_status_api_token"] != self.input_status_api_token.text().strip() \
+				or self.original_values["input_status_cache_ttl"] != self.input_status_cache_ttl.value()
+		if self.db_version >= 20:
+			extended = extended \
+				or self.original_values["check_supervisor"] != self.check_supervisor.isChecked()
+		if self.db_version >= 23:
+			extended = extended \
+				or self.original_values["check_reconnect"] != self.check_reconnect.isChecked()
 
 		return extended
 
 	def save_changes(self):
-		self.config.set_config_value("livestreamer-path", self.input_livestreamer.text())
-		self.config.set_config_value("player-path", self.input_player.text())
-		self.config.set_config_value("foreground-color", self.input_fgcolor.text())
-		self.config.set_config_value("background-color", self.input_bgcolor.text())
-		self.config.set_config_value("auto-refresh-quality", int(self.check_auto_refresh.isChecked()))
-		self.config.set_config_value("quality-cache-persistance", int(self.input_cache_lifetime.value()))
+		# One transaction for all of the values
+		with self.config.batch():
+			self.config.set_config_value("livestreamer-path", self.input_livestreamer.text())
+			self.config.set_config_value("player-path", self.input_player.text())
+			self.config.set_config_value("foreground-color", self.input_fgcolor.text())
+			self.config.set_config_value("background-color", self.input_bgcolor.text())
+			self.config.set_config_value("auto-refresh-quality", int(self.check_auto_refresh.isChecked()))
+			self.config.set_config_value("quality-cache-persistance", int(self.input_cache_lifetime.value()))
 		
-		if self.config.get_config_value("db-version") >= 2:
-			self.config.set_config_value("enable-systray-icon", int(self.check_enable_systray_icon.isChecked()))
-			self.config.set_config_value("minimize-to-systray", int(self.check_minimize_to_systray.isChecked()))
-			self.config.set_config_value("close-to-systray", int(self.check_close_to_systray.isChecked()))
-		if self.config.get_config_value("db-version") >= 3:
-			self.config.set_config_value("remember-window-position", int(self.check_remember_position.isChecked()))
+			if self.db_version >= 2:
+				self.config.set_config_value("enable-systray-icon", int(self.check_enable_systray_icon.isChecked()))
+				self.config.set_config_value("minimize-to-systray", int(self.check_minimize_to_systray.isChecked()))
+				self.config.set_config_value("close-to-systray", int(self.check_close_to_systray.isChecked()))
+			if self.db_version >= 3:
+				self.config.set_config_value("remember-window-position", int(self.check_remember_position.isChecked()))
+			if self.db_version >= 5:
+				self.config.set_config_value("recording-directory", self.input_recording_directory.text())
+			if self.db_version >= 7:
+				self.config.set_config_value("collect-stream-metrics", int(self.check_collect_metrics.isChecked()))
+			if self.db_version >= 12:
+				self.config.set_config_value("control-api-enabled", int(self.check_control_api.isChecked()))
+			if self.db_version >= 14:
+				self.config.set_config_value("watchdog-enabled", int(self.check_watchdog.isChecked()))
+			if self.db_version >= 15:
+				self.config.set_config_value("probe-backend", self.input_probe_backend.currentText())
+			if self.db_version >= 17:
+				self.config.set_streamer_status_api_url(self.status_api_streamer, self.input_status_api_url.text().strip())
+				self.config.set_config_value("status-api-client-id", self.input_status_api_client_id.text().strip())
+				self.config.set_config_value("status-api-token", self.input_status_api_token.text().strip())
+				self.config.set_config_value("status-cache-ttl", int(self.input_status_cache_ttl.value()))
+			if self.db_version >= 20:
+				self.config.set_config_value("supervisor-enabled", int(self.check_supervisor.isChecked()))
+			if self.db_version >= 23:
+				self.config.set_config_value("reconnect-enabled", int(self.check_reconnect.isChecked()))
 
 		self.load_config_values(update_widgets=False)
 
@@ -300,6 +535,14 @@ class AppConfigDialog(BaseDialog):
 			
 			self.input_player.setText(path)
 
+	def on_recording_directory_click(self):
+		existing_path = self.input_recording_directory.text()
+		if not os.path.isdir(existing_path):
+			existing_path = os.path.dirname(sys.argv[0])
+		path = QFileDialog.getExistingDirectory(self, "Select recording directory", existing_path)
+		if path:
+			self.input_recording_directory.setText(path)
+
 	def on_fgcolor_click(self):
 		initial = self.input_fgcolor.text()
 		color = QColorDialog.getColor(QColor(initial), self, "Choose foreground color")
@@ -327,8 +570,17 @@ class AddEditChannelsDialog(BaseDialog):
 			raise Exception("No streamer defined!")
 		self.streamer = streamer
 		self.channel_data = channel_data
-
-		super().__init__(parent, config, modal=modal, streamer_icon=streamer_icon, title=title, geometry=(400, 150))
+		self.transport_inputs = {}
+		self.original_transport = None
+
+		self.input_handoff = None
+		if config.get_config_value("db-version") >= 22:
+			geometry = (400, 360)
+		elif config.get_config_value("db-version") >= 9:
+			geometry = (400, 330)
+		else:
+			geometry = (400, 150)
+		super().__init__(parent, config, modal=modal, streamer_icon=streamer_icon, title=title, geometry=geometry)
 
 	def setup_dialog_layout(self):
 		row = 0
@@ -355,6 +607,44 @@ class AddEditChannelsDialog(BaseDialog):
 		self.check_fav.setToolTip("Mark this channel as your most favorite channel")
 		self.layout.addWidget(self.check_fav, row, 1)
 
+		if self.db_version >= 9:
+			transport_fields = [
+				("hls_segment_threads", "HLS segment threads", 10, "", "How many HLS segments are downloaded in parallel"),
+				("ringbuffer_size", "Ringbuffer size", 1024, " MB", "How much of the stream livestreamer buffers"),
+				("hls_live_edge", "HLS live edge", 20, " segment(s)", "How many segments from the live edge playback starts at"),
+				("stream_timeout", "Stream timeout", 600, " s", "How long to wait for stream data before giving up"),
+				("http_timeout", "HTTP timeout", 600, " s", "How long to wait for HTTP requests"),
+			]
+			for column, label_text, maximum, suffix, tooltip in transport_fields:
+				row += 1
+				label = QLabel(label_text, self)
+				self.layout.addWidget(label, row, 0)
+				spin = QSpinBox(self)
+				spin.setRange(0, maximum)
+				spin.setSuffix(suffix)
+				spin.setSpecialValueText("Livestreamer default")
+				spin.setToolTip(tooltip)
+				self.layout.addWidget(spin, row, 1)
+				self.transport_inputs[column] = spin
+
+			row += 1
+			label_auto_tune = QLabel("Auto-tune transport", self)
+			self.layout.addWidget(label_auto_tune, row, 0)
+			self.check_auto_tune = QCheckBox(self)
+			self.check_auto_tune.setTristate(False)
+			self.check_auto_tune.setToolTip("Adjust segment threads and ringbuffer size from the stalls and latency of past sessions")
+			self.layout.addWidget(self.check_auto_tune, row, 1)
+
+		if self.db_version >= 22:
+			row += 1
+			label_handoff = QLabel("Player handoff", self)
+			self.layout.addWidget(label_handoff, row, 0)
+			self.input_handoff = QComboBox(self)
+			for mode, description, arguments in HANDOFF_MODES:
+				self.input_handoff.addItem(description, mode)
+			self.input_handoff.setToolTip("How livestreamer hands the stream to the player when watching. Automatic lets the player\nfetch HLS streams itself when livestreamer supports it and its output isn't needed for metrics.")
+			self.layout.addWidget(self.input_handoff, row, 1)
+
 		row += 1
 		self.button_save = QPushButton("Save && close", self)
 		self.button_save.clicked.connect(self.save_changes)
@@ -363,11 +653,46 @@ class AddEditChannelsDialog(BaseDialog):
 		# Apply the foreground and background color to the widgets
 		self.update_colors()
 
-		# Load the data, if provided, into the entry widgets
+		self.load_channel_data()
+
+	def rebind(self, streamer_icon=None, title=None, streamer=None, channel_data=None):
+		super().rebind(streamer_icon, title)
+		if streamer is None:
+			raise Exception("No streamer defined!")
+		self.streamer = streamer
+		self.channel_data = channel_data
+		self.update_colors()
+		self.load_channel_data()
+		self.input_name.setFocus()
+
+	def load_channel_data(self):
+		# Load the data, if provided, into the entry widgets, or empty them for a new channel
 		if self.channel_data is not None:
 			self.input_name.setText(self.channel_data["name"])
 			self.input_url.setText(self.channel_data["url"])
 			self.check_fav.setChecked(bool(self.channel_data["favorite"]))
+		else:
+			self.input_name.clear()
+			self.input_url.clear()
+			self.check_fav.setChecked(False)
+
+		if self.transport_inputs:
+			profile = None
+			if self.channel_data is not None:
+				profile = self.config.get_transport_profile_by_id(self.channel_data["id"])
+			for column, spin in self.transport_inputs.items():
+				spin.setValue(profile[column] or 0 if profile is not None else 0)
+			self.check_auto_tune.setChecked(bool(profile["auto_tune"]) if profile is not None else False)
+			if self.input_handoff is not None:
+				self.input_handoff.setCurrentIndex(max(0, self.input_handoff.findData(profile["handoff"] if profile is not None else "auto")))
+			self.original_transport = self.get_transport_values()
+
+	def get_transport_values(self):
+		values = dict((column, spin.value() or None) for column, spin in self.transport_inputs.items())
+		values["auto_tune"] = int(self.check_auto_tune.isChecked())
+		if self.input_handoff is not None:
+			values["handoff"] = self.input_handoff.currentData()
+		return values
 
 	def save_changes(self):
 		channel_name = self.input_name.text().strip()
@@ -381,40 +706,48 @@ class AddEditChannelsDialog(BaseDialog):
 			QMessageBox.warning(self, "Input error", "Please provide the channel's URL.", QMessageBox.Ok, QMessageBox.Ok)
 			return
 
-		set_result = True
-		if self.channel_data is None:
-			# We're adding a new record
-			channel = self.config.get_streamer_channel(self.streamer["name"], channel_name)
-			if channel is not None:
-				self.input_name.setFocus(True)
-				QMessageBox.warning(self, "Input error", "Channel name already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
-				return
-			channel = self.config.get_channel_by_url(self.streamer["name"], channel_url)
-			if channel is not None:
-				self.input_url.setFocus(True)
-				QMessageBox.warning(self, "Input error", "Channel URL already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
-				return
-			self.config.add_new_channel(self.streamer["name"], channel_name, channel_url, self.check_fav.isChecked())
-		else:
-			# We're editing an existing record
-			if channel_name != self.channel_data["name"]:
-				# User changed the name of the channel
+		# The channel and its transport profile are saved in one transaction
+		with self.config.batch():
+			set_result = True
+			if self.channel_data is None:
+				# We're adding a new record
 				channel = self.config.get_streamer_channel(self.streamer["name"], channel_name)
 				if channel is not None:
 					self.input_name.setFocus(True)
 					QMessageBox.warning(self, "Input error", "Channel name already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
 					return
-			if channel_url != self.channel_data["url"]:
-				# User changed the channel's URL
 				channel = self.config.get_channel_by_url(self.streamer["name"], channel_url)
 				if channel is not None:
 					self.input_url.setFocus(True)
 					QMessageBox.warning(self, "Input error", "Channel URL already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
 					return
-			if channel_name != self.channel_data["name"] or channel_url != self.channel_data["url"] or bool(self.channel_data["favorite"]) != self.check_fav.isChecked():
-				self.config.update_existing_channel(self.streamer["name"], channel_name, channel_url, self.check_fav.isChecked(), self.channel_data["name"], self.channel_data["url"])
+				self.config.add_new_channel(self.streamer["name"], channel_name, channel_url, self.check_fav.isChecked())
 			else:
-				set_result = False
+				# We're editing an existing record
+				if channel_name != self.channel_data["name"]:
+					# User changed the name of the channel
+					channel = self.config.get_streamer_channel(self.streamer["name"], channel_name)
+					if channel is not None:
+						self.input_name.setFocus(True)
+						QMessageBox.warning(self, "Input error", "Channel name already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
+						return
+				if channel_url != self.channel_data["url"]:
+					# User changed the channel's URL
+					channel = self.config.get_channel_by_url(self.streamer["name"], channel_url)
+					if channel is not None:
+						self.input_url.setFocus(True)
+						QMessageBox.warning(self, "Input error", "Channel URL already exists!\nName: {}\nURL: {}".format(channel["name"], channel["url"]), QMessageBox.Ok, QMessageBox.Ok)
+						return
+				if channel_name != self.channel_data["name"] or channel_url != self.channel_data["url"] or bool(self.channel_data["favorite"]) != self.check_fav.isChecked():
+					self.config.update_existing_channel(self.streamer["name"], channel_name, channel_url, self.check_fav.isChecked(), self.channel_data["name"], self.channel_data["url"])
+				else:
+					set_result = False
+
+			if self.transport_inputs:
+				transport = self.get_transport_values()
+				if transport != self.original_transport:
+					self.config.set_transport_profile(self.streamer["name"], channel_name, transport)
+					set_result = True
 
 		if set_result:
 			self.result_data = {
@@ -423,3 +756,98 @@ class AddEditChannelsDialog(BaseDialog):
 				"favorite": self.check_fav.isChecked(),
 			}
 		self.done(QDialog.Accepted)
+
+
+class LogBrowserDialog(BaseDialog):
+	"""The window for searching the history of livestreamer sessions."""
+
+	max_results = 1000
+
+	def __init__(self, parent, config, searcher, modal=False, streamer_icon=None):
+		self.searcher = searcher
+		self.search_thread = None
+		super().__init__(parent, config, modal=modal, streamer_icon=streamer_icon, title="Session logs", geometry=(700, 450), resizable=True)
+		self.update_colors()
+
+	def setup_dialog_layout(self):
+		row = 0
+		label_search = QLabel("Search", self)
+		self.layout.addWidget(label_search, row, 0)
+		self.input_search = QLineEdit(self)
+		self.input_search.setToolTip("Text to look for in all the recorded session logs")
+		self.input_search.returnPressed.connect(self.on_search_click)
+		self.layout.addWidget(self.input_search, row, 1)
+		self.check_match_case = QCheckBox("Match case", self)
+		self.layout.addWidget(self.check_match_case, row, 2)
+		self.button_search = QPushButton("Search", self)
+		self.button_search.clicked.connect(self.on_search_click)
+		self.layout.addWidget(self.button_search, row, 3)
+
+		row += 1
+		self.results_widget = QTextEdit(self)
+		self.results_widget.setAcceptRichText(False)
+		self.results_widget.setReadOnly(True)
+		self.layout.addWidget(self.results_widget, row, 0, 1, 4)
+
+		row += 1
+		self.label_status = QLabel("", self)
+		self.layout.addWidget(self.label_status, row, 0, 1, 4)
+
+	def on_search_click(self):
+		text = self.input_search.text()
+		if text == "":
+			self.input_search.setFocus(True)
+			return
+		self.stop_search()
+		self.results_widget.clear()
+		self.result_count = 0
+		self.label_status.setText("Searching...")
+		self.button_search.setEnabled(False)
+		self.search_thread = LogSearchWorker(self.searcher, text, self.max_results, not self.check_match_case.isChecked())
+		self.search_thread.results.connect(self.on_search_results)
+		self.search_thread.finished.connect(self.on_search_finished)
+		self.search_thread.start()
+
+	def on_search_results(self, batch):
+		lines = []
+		for timestamp, title, line in batch:
+			lines.append("[{} {}] {}".format(timestamp, title, line))
+		self.result_count += len(batch)
+		self.results_widget.moveCursor(QTextCursor.End)
+		self.results_widget.insertPlainText("\n".join(lines) + "\n")
+
+	def on_search_finished(self):
+		self.button_search.setEnabled(True)
+		if self.result_count >= self.max_results:
+			self.label_status.setText("Showing the first {} matches.".format(self.max_results))
+		else:
+			self.label_status.setText("{} match(es) found.".format(self.result_count))
+
+	def stop_search(self):
+		if self.search_thread is not None:
+			self.search_thread.keep_running = False
+			self.search_thread.wait()
+			self.search_thread = None
+
+	def closeEvent(self, event=None):
+		self.stop_search()
+
+
+class TelemetryDialog(BaseDialog):
+	"""The window showing the telemetry report."""
+
+	def __init__(self, parent, config, report, modal=False, streamer_icon=None):
+		self.report = report
+		super().__init__(parent, config, modal=modal, streamer_icon=streamer_icon, title="Telemetry report", geometry=(720, 450), resizable=True)
+		self.update_colors()
+
+	def setup_dialog_layout(self):
+		self.report_widget = QTextEdit(self)
+		self.report_widget.setAcceptRichText(False)
+		self.report_widget.setReadOnly(True)
+		self.report_widget.setLineWrapMode(QTextEdit.NoWrap)
+		font = QFont("Monospace")
+		font.setStyleHint(QFont.TypeWriter)
+		self.report_widget.setFont(font)
+		self.report_widget.setPlainText(self.report)
+		self.layout.addWidget(self.report_widget, 0, 0)
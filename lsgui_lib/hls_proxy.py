@@ -0,0 +1,275 @@
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+from .aio import HTTPError, read_request, send_response, write_head, drain
+
+SEGMENT_PATH = re.compile(r"^/([\w.-]+)/segment/(\d+)\.ts$")
+PLAYLIST_PATH = re.compile(r"^/([\w.-]+)/playlist\.m3u8$")
+URI_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+
+def fetch_url(url, timeout):
+	with urlopen(url, timeout=timeout) as response:
+		return response.read()
+
+def consume_exception(future):
+	# A prefetch no client waits for would otherwise log "Task exception was never retrieved";
+	# the clients that do wait get the exception from the future themselves
+	if not future.cancelled():
+		future.exception()
+
+
+class SegmentCache(object):
+	"""Keeps the most recently used segments in memory, up to a total size in bytes."""
+
+	def __init__(self, max_bytes):
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.segments = OrderedDict()
+
+	def __contains__(self, key):
+		return key in self.segments
+
+	def get(self, key):
+		data = self.segments.get(key)
+		if data is not None:
+			self.segments.move_to_end(key)
+		return data
+
+	def put(self, key, data):
+		if key in self.segments:
+			return
+		self.segments[key] = data
+		self.size += len(data)
+		while self.size > self.max_bytes and len(self.segments) > 1:
+			old_key, old_data = self.segments.popitem(last=False)
+			self.size -= len(old_data)
+
+
+class HLSFeed(object):
+	"""A single upstream channel and quality. Its playlist and segments are fetched once, however many players ask for them."""
+
+	kept_segments = 15	# How many segments behind the live edge are still served
+
+	def __init__(self, key, url, proxy):
+		self.key = key
+		self.url = url
+		self.media_url = None
+		self.proxy = proxy
+
+		self.playlist = None
+		self.playlist_fetched = 0
+		self.target_duration = 2
+		self.refreshing = None
+		self.segments = {}	# Media sequence number => upstream URL
+		self.pending = {}	# Media sequence number => future of the segment being fetched
+		self.last_request = time.monotonic()
+
+	async def get_playlist(self):
+		self.last_request = time.monotonic()
+		if self.playlist is None or time.monotonic() - self.playlist_fetched >= self.target_duration / 2:
+			if self.refreshing is None:
+				self.refreshing = asyncio.ensure_future(self.refresh())
+			# Shielded, so a client disconnecting doesn't cancel the refresh the other clients wait for
+			await asyncio.shield(self.refreshing)
+		return self.playlist
+
+	async def refresh(self):
+		try:
+			url = self.media_url or self.url
+			text = (await self.proxy.fetch(url)).decode("utf-8", "replace")
+			if "#EXT-X-STREAM-INF" in text:
+				# A master playlist; follow its first variant
+				variants = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+				if not variants:
+					raise HTTPError(502, "Empty master playlist")
+				self.media_url = url = urljoin(url, variants[0])
+				text = (await self.proxy.fetch(url)).decode("utf-8", "replace")
+			self.playlist = self.rewrite_playlist(text, url)
+			self.playlist_fetched = time.monotonic()
+		finally:
+			self.refreshing = None
+
+	def rewrite_playlist(self, text, base_url):
+		"""Points the segments at the proxy and starts fetching the new ones right away."""
+		lines = []
+		sequence = 0
+		for line in text.splitlines():
+			line = line.strip()
+			if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+				sequence = int(line.split(":", 1)[1])
+			elif line.startswith("#EXT-X-TARGETDURATION:"):
+				self.target_duration = max(float(line.split(":", 1)[1]), 1)
+			if line.startswith("#"):
+				# Anything else referenced by the playlist (keys, init sections) is fetched by the player directly
+				line = URI_ATTRIBUTE.sub(lambda match: 'URI="{}"'.format(urljoin(base_url, match.group(1))), line)
+			elif line:
+				if sequence not in self.segments:
+					self.segments[sequence] = urljoin(base_url, line)
+					self.prefetch(sequence)
+				line = "segment/{}.ts".format(sequence)
+				sequence += 1
+			lines.append(line)
+		for old in [number for number in self.segments if number < sequence - self.kept_segments]:
+			del self.segments[old]
+		return "\n".join(lines) + "\n"
+
+	def prefetch(self, sequence):
+		if (self.key, sequence) in self.proxy.cache or sequence in self.pending:
+			return self.pending.get(sequence)
+		future = asyncio.ensure_future(self.fetch_segment(sequence))
+		future.add_done_callback(consume_exception)
+		self.pending[sequence] = future
+		return future
+
+	async def fetch_segment(self, sequence):
+		try:
+			data = await self.proxy.fetch(self.segments[sequence])
+			self.proxy.cache.put((self.key, sequence), data)
+			return data
+		finally:
+			self.pending.pop(sequence, None)
+
+	async def get_segment(self, sequence):
+		self.last_request = time.monotonic()
+		data = self.proxy.cache.get((self.key, sequence))
+		if data is not None:
+			return data
+		if sequence not in self.segments:
+			raise HTTPError(404)
+		return await asyncio.shield(self.prefetch(sequence))
+
+
+class HLSProxy(object):
+	"""A local HTTP server that fans a single upstream HLS fetch out to any number of players.
+
+	Every connection is served by its own task and writes with a drain timeout, so a slow
+	client is dropped instead of stalling the upstream fetch or the other clients."""
+
+	chunk_size = 64 * 1024
+	write_buffer_limit = 256 * 1024
+	idle_check_interval = 10
+
+	def __init__(self, loop_thread, host="127.0.0.1", port=0, cache_size=64 * 1024 * 1024, client_timeout=10, fetch_timeout=10, idle_timeout=60):
+		self.loop_thread = loop_thread
+		self.host = host
+		self.port = port
+		self.cache = SegmentCache(cache_size)
+		self.client_timeout = client_timeout
+		self.fetch_timeout = fetch_timeout
+		self.idle_timeout = idle_timeout	# Feeds nobody asked anything from in this many seconds are dropped
+		self.feeds = {}
+		self.executor = ThreadPoolExecutor(max_workers=8)
+		self.server = None
+		self.connections = set()
+		self.idle_task = None
+
+	def start(self):
+		self.loop_thread.submit(self.start_server()).result()
+
+	async def start_server(self):
+		self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+		self.port = self.server.sockets[0].getsockname()[1]
+		self.idle_task = asyncio.ensure_future(self.drop_idle_feeds())
+
+	def stop(self):
+		if self.server is not None:
+			self.loop_thread.submit(self.stop_server()).result()
+		self.executor.shutdown(wait=False)
+
+	async def stop_server(self):
+		self.idle_task.cancel()
+		self.server.close()
+		# Players elsewhere on the network may still be connected
+		for writer in self.connections:
+			writer.close()
+		await self.server.wait_closed()
+		self.server = None
+
+	def add_feed(self, key, url):
+		"""Registers an upstream playlist URL under the key. Callable from any thread."""
+		self.loop_thread.call(self.set_feed, key, url)
+
+	def set_feed(self, key, url):
+		feed = self.feeds.get(key)
+		if feed is None or feed.url != url:
+			self.feeds[key] = HLSFeed(key, url, self)
+		else:
+			feed.last_request = time.monotonic()
+
+	def get_url(self, key, host=None):
+		return "http://{}:{}/{}/playlist.m3u8".format(host or self.host, self.port, key)
+
+	async def drop_idle_feeds(self):
+		while True:
+			await asyncio.sleep(self.idle_check_interval)
+			limit = time.monotonic() - self.idle_timeout
+			for key in [key for key, feed in self.feeds.items() if feed.last_request < limit]:
+				del self.feeds[key]
+
+	async def fetch(self, url):
+		loop = asyncio.get_event_loop()
+		try:
+			return await loop.run_in_executor(self.executor, fetch_url, url, self.fetch_timeout)
+		except OSError as e:
+			raise HTTPError(502, str(e))
+
+	async def handle_client(self, reader, writer):
+		writer.transport.set_write_buffer_limits(high=self.write_buffer_limit)
+		self.connections.add(writer)
+		try:
+			while True:
+				try:
+					request = await asyncio.wait_for(read_request(reader), self.idle_timeout)
+					if request is None:
+						break
+					await self.handle_request(request, writer)
+				except HTTPError as e:
+					await send_response(writer, e.status, str(e), keep_alive=False, drain_timeout=self.client_timeout)
+					break
+				if not request.keep_alive:
+					break
+		except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+			# The client is gone or too slow to keep up; only this connection is affected
+			pass
+		finally:
+			self.connections.discard(writer)
+			writer.close()
+
+	async def handle_request(self, request, writer):
+		if request.method not in ("GET", "HEAD"):
+			raise HTTPError(405)
+		match = PLAYLIST_PATH.match(request.path)
+		if match is not None:
+			feed = self.get_feed(match.group(1))
+			playlist = (await feed.get_playlist()).encode("utf-8")
+			# A HEAD gets the length the GET would have, without the body
+			write_head(writer, 200, "application/vnd.apple.mpegurl", len(playlist), {"Cache-Control": "no-cache"}, request.keep_alive)
+			if request.method == "GET":
+				writer.write(playlist)
+			await drain(writer, self.client_timeout)
+			return
+		match = SEGMENT_PATH.match(request.path)
+		if match is not None:
+			feed = self.get_feed(match.group(1))
+			data = await feed.get_segment(int(match.group(2)))
+			write_head(writer, 200, "video/mp2t", len(data), keep_alive=request.keep_alive)
+			if request.method == "GET":
+				view = memoryview(data)
+				for position in range(0, len(view), self.chunk_size):
+					writer.write(view[position:position+self.chunk_size])
+					await drain(writer, self.client_timeout)
+			else:
+				await drain(writer, self.client_timeout)
+			return
+		raise HTTPError(404)
+
+	def get_feed(self, key):
+		feed = self.feeds.get(key)
+		if feed is None:
+			raise HTTPError(404, "Unknown feed")
+		return feed
@@ -0,0 +1,11 @@
+from PyQt5.QtGui import QIcon
+
+icon_cache = {}	# Path => QIcon
+
+def get_icon(path):
+	"""Returns the icon of the image file, which is read from disk only the first time."""
+	icon = icon_cache.get(path)
+	if icon is None:
+		icon = QIcon(path)
+		icon_cache[path] = icon
+	return icon
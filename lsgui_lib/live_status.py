@@ -0,0 +1,109 @@
+import json
+import time
+import threading
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+TWITCH_STATUS_API_URL = "https://api.twitch.tv/helix"
+
+class LiveStatusError(Exception):
+	pass
+
+
+class TwitchStatusProvider(object):
+	"""Finds out which channels are live with the streams endpoint of the Twitch API, up to 100 channels per request.
+
+	The base URL is the streamer's status API URL, e.g. https://api.twitch.tv/helix, so that a local
+	server can stand in for Twitch. The requests go over one keep-alive connection, and the answers are
+	cached for the TTL, so that looking up the channels one at a time still costs one request per chunk."""
+
+	chunk_size = 100
+
+	def __init__(self, base_url, client_id=None, token=None, ttl=60, timeout=10):
+		url = urlsplit(base_url)
+		if url.scheme not in ("http", "https") or not url.hostname:
+			raise ValueError("Invalid status API URL: {}".format(base_url))
+		self.base_url = base_url
+		self.scheme = url.scheme
+		self.host = url.hostname
+		self.port = url.port
+		self.path = url.path.rstrip("/")
+		self.headers = {}
+		if client_id:
+			self.headers["Client-Id"] = client_id
+		if token:
+			self.headers["Authorization"] = "Bearer {}".format(token)
+		self.ttl = ttl						# In seconds
+		self.timeout = timeout
+		self.connection = None
+		self.lock = threading.Lock()		# The connection and the cache are shared by the probing threads
+		self.cache = {}						# Channel login => (live or not, expiry time)
+
+	def get_connection(self):
+		if self.connection is None:
+			connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+			self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+		return self.connection
+
+	def close(self):
+		with self.lock:
+			if self.connection is not None:
+				self.connection.close()
+				self.connection = None
+
+	def request(self, path):
+		# A kept-alive connection may have been closed by the server in the meantime, so a failed request is retried once on a new one
+		for attempt in range(2):
+			connection = self.get_connection()
+			try:
+				connection.request("GET", path, headers=self.headers)
+				response = connection.getresponse()
+				body = response.read()
+			except (http.client.HTTPException, OSError) as e:
+				connection.close()
+				self.connection = None
+				if attempt == 1:
+					raise LiveStatusError("Status API request failed: {}".format(str(e) or e.__class__.__name__))
+				continue
+			if response.status != 200:
+				raise LiveStatusError("Status API answered {} {}".format(response.status, response.reason))
+			try:
+				return json.loads(body.decode("utf-8"))
+			except ValueError:
+				raise LiveStatusError("Status API sent invalid JSON")
+
+	def fetch_live_channels(self, logins):
+		"""Returns the channels of the chunk that are live."""
+		path = "{}/streams?{}".format(self.path, urlencode([("first", len(logins))] + [("user_login", login) for login in logins]))
+		result = self.request(path)
+		return {stream["user_login"].lower() for stream in result.get("data", []) if stream.get("type", "live") == "live"}
+
+	def get_live_status(self, logins):
+		"""Returns a dict of the channels' logins to whether they're live. Channels not in the cache are looked up in chunks. Blocks."""
+		logins = {login.lower() for login in logins}
+		with self.lock:
+			now = time.monotonic()
+			status = {login: cached[0] for login, cached in self.cache.items() if login in logins and cached[1] > now}
+			missing = sorted(logins - status.keys())
+			for i in range(0, len(missing), self.chunk_size):
+				chunk = missing[i:i + self.chunk_size]
+				live = self.fetch_live_channels(chunk)
+				expires = time.monotonic() + self.ttl
+				for login in chunk:
+					status[login] = login in live
+					self.cache[login] = (login in live, expires)
+		return status
+
+	def forget(self, logins):
+		"""Drops the channels from the cache, so that they're looked up again."""
+		with self.lock:
+			for login in logins:
+				self.cache.pop(login.lower(), None)
+
+	def is_live(self, login, other_logins=()):
+		"""Whether the channel is live. The other channels are looked up in the same requests, to have them cached for later."""
+		with self.lock:
+			cached = self.cache.get(login.lower())
+		if cached is not None and cached[1] > time.monotonic():
+			return cached[0]
+		return self.get_live_status([login] + list(other_logins))[login.lower()]
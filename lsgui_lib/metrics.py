@@ -0,0 +1,65 @@
+import time
+from collections import deque
+
+def format_rate(bytes_per_second):
+	if bytes_per_second is None:
+		return "-- KiB/s"
+	if bytes_per_second >= 1048576:
+		return "{:.2f} MiB/s".format(bytes_per_second / 1048576)
+	return "{:.0f} KiB/s".format(bytes_per_second / 1024)
+
+
+class SessionMetrics(object):
+	"""Aggregates the metric events of a single livestreamer session."""
+
+	window_size = 60	# How many of the latest samples are averaged
+
+	def __init__(self):
+		self.started = time.monotonic()
+		self.throughput = deque(maxlen=self.window_size)		# bytes/s
+		self.segment_latency = deque(maxlen=self.window_size)	# seconds
+		self.segments = 0
+		self.underruns = []	# Timestamps (time.monotonic()) of the buffer underruns
+		self.player_started = None
+
+	def add(self, event):
+		if event.name == "throughput":
+			self.throughput.append(event.value)
+		elif event.name == "segment-latency":
+			self.segment_latency.append(event.value)
+			self.segments += 1
+		elif event.name == "underrun":
+			self.underruns.append(time.monotonic())
+		elif event.name == "player-started":
+			self.player_started = time.monotonic()
+
+	@property
+	def current_throughput(self):
+		return self.throughput[-1] if self.throughput else None
+
+	@property
+	def average_throughput(self):
+		return sum(self.throughput) / len(self.throughput) if self.throughput else None
+
+	@property
+	def average_latency(self):
+		return sum(self.segment_latency) / len(self.segment_latency) if self.segment_latency else None
+
+	def recent_underruns(self, seconds):
+		limit = time.monotonic() - seconds
+		return len([timestamp for timestamp in self.underruns if timestamp >= limit])
+
+	def describe(self):
+		text = [format_rate(self.current_throughput)]
+		if self.segment_latency:
+			text.append("segment {:.0f} ms".format(self.segment_latency[-1] * 1000))
+		if self.underruns:
+			text.append("{} stall(s)".format(len(self.underruns)))
+		return ", ".join(text)
+
+	def summary(self):
+		text = ["Stream metrics: average {}".format(format_rate(self.average_throughput))]
+		if self.segments:
+			text.append("{} segment(s) at {:.0f} ms on average".format(self.segments, self.average_latency * 1000))
+		text.append("{} stall(s)".format(len(self.underruns)))
+		return ", ".join(text)
@@ -0,0 +1,19 @@
+import re
+
+LINE_END = re.compile(rb"\r\n?|\n")
+
+def read_lines(stream, size=4096):
+	"""Yields the lines of a process's output, ended by newlines or, like livestreamer's progress, by carriage returns.
+
+	The lines are yielded with a newline at the end, and blank lines are left out."""
+	pending = b""
+	while True:
+		data = stream.read1(size)
+		if not data:
+			break
+		*lines, pending = LINE_END.split(pending + data)
+		for line in lines:
+			if line:
+				yield line + b"\n"
+	if pending:
+		yield pending
@@ -0,0 +1,138 @@
+import platform
+import threading
+import subprocess
+import importlib.util
+import concurrent.futures
+
+PROBE_BACKENDS = ("auto", "in-process", "daemon", "subprocess")
+
+def parse_stream_list(output):
+	"""Parses the stream names from livestreamer's output. Returns an empty list if the channel isn't streaming, or None if there's no list in the output."""
+	message = output.lower()
+	if "no streams found on this url" in message:
+		return []
+	pos = message.find("available streams:")
+	if pos == -1:
+		return None
+	message = message[pos+18:].split("\n", 1)[0]
+
+	if "(best, worst)" in message:
+		message = message.replace("(best, worst)", "(best and worst)")
+	elif "(worst, best)" in message:
+		message = message.replace("(worst, best)", "(worst and best)")
+	streams = []
+	for item in message.split(","):
+		streams.append(item.strip())
+		left_parenthesis = item.find("(")
+		if left_parenthesis == -1:
+			continue
+		if item.find("worst", left_parenthesis) >= left_parenthesis:
+			streams.append("worst")
+		if item.find("best", left_parenthesis) >= left_parenthesis:
+			streams.append("best")
+	streams.sort()
+	return streams
+
+def probe_streams(command, timeout=30):
+	"""Runs the probe command (a list) and returns the stream names. Blocks, so it's meant to be run outside the GUI thread."""
+	startup_info = None
+	if platform.system() == "Windows":
+		startup_info = subprocess.STARTUPINFO()
+		startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
+	result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, startupinfo=startup_info)
+	output = result.stdout.decode("utf-8", "replace")
+	streams = parse_stream_list(output)
+	if streams is None:
+		lines = output.strip().splitlines()
+		raise ValueError(lines[-1] if lines else "livestreamer exited with code {}".format(result.returncode))
+	return streams
+
+def get_stream_names(streams):
+	"""Turns a dict of livestreamer's streams into stream names like those parsed from its output."""
+	names = []
+	for name, stream in streams.items():
+		if name in ("best", "worst"):
+			continue
+		synonyms = [synonym for synonym in ("best", "worst") if streams.get(synonym) is stream]
+		names.append("{} ({})".format(name, " and ".join(synonyms)) if synonyms else name)
+		names.extend(synonyms)
+	names.sort()
+	return names
+
+def is_livestreamer_importable():
+	return importlib.util.find_spec("livestreamer") is not None
+
+
+class StreamProber(object):
+	"""Probes channels for their streams on a thread pool.
+
+	The in-process backend imports the livestreamer library once, and every probe reuses its session,
+	with the loaded plugins and the HTTP connection pool. The daemon backend does the same in a probe
+	daemon process, which keeps the GUI's memory and crashes apart from the plugins'. The subprocess
+	backend runs the probe command instead; "auto" uses the library if it can be imported and falls
+	back to the command otherwise, as do the other backends."""
+
+	def __init__(self, backend="auto", max_workers=4, daemon_max_requests=200):
+		if backend not in PROBE_BACKENDS:
+			raise ValueError("Unknown probe backend '{}'".format(backend))
+		self.backend = backend
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+		self.session = None
+		self.session_lock = threading.Lock()
+		self.daemon = None
+		library = backend != "subprocess" and is_livestreamer_importable()
+		if library and backend == "daemon":
+			from .probe_daemon import ProbeDaemonClient
+			self.daemon = ProbeDaemonClient(daemon_max_requests)
+		self.in_process = library and self.daemon is None
+
+	@property
+	def needs_command(self):
+		"""Whether probes are made by running the probe command."""
+		return not self.in_process and self.daemon is None
+
+	def describe(self):
+		"""Tells how the channels are probed, which with the "auto" backend depends on whether the library could be imported."""
+		if self.daemon is not None:
+			return "the livestreamer library in a probe daemon"
+		if self.in_process:
+			return "the livestreamer library of the GUI's Python"
+		return "the configured livestreamer executable"
+
+	def get_session(self):
+		with self.session_lock:
+			if self.session is None:
+				from livestreamer import Livestreamer
+				self.session = Livestreamer()
+		return self.session
+
+	def probe(self, url, command=None):
+		"""Probes the URL, or runs the command (a list) if the library isn't used. Returns the stream names and a dict of metadata about them.
+		Blocks, so it's meant to be run outside the GUI thread."""
+		if self.daemon is not None:
+			streams, metadata = self.daemon.probe(url)
+			metadata["backend"] = "daemon"
+			return streams, metadata
+		if not self.in_process:
+			if command is None:
+				raise ValueError("The livestreamer library is not available")
+			return probe_streams(command), {"backend": "subprocess"}
+
+		from livestreamer import NoPluginError, PluginError
+		try:
+			streams = self.get_session().streams(url)
+		except NoPluginError:
+			raise ValueError("No plugin can handle URL: {}".format(url))
+		except PluginError as e:
+			raise ValueError(str(e))
+		types = {name: stream.shortname() for name, stream in streams.items()}
+		return get_stream_names(streams), {"backend": "in-process", "types": types}
+
+	def submit(self, url, command=None):
+		"""Probes in the thread pool. Returns a concurrent.futures.Future of probe()'s result."""
+		return self.executor.submit(self.probe, url, command)
+
+	def shutdown(self):
+		self.executor.shutdown(wait=False)
+		if self.daemon is not None:
+			self.daemon.stop()
@@ -0,0 +1,183 @@
+import io
+import os
+import sys
+import json
+import platform
+import threading
+import subprocess
+import concurrent.futures
+
+from .probe import StreamProber, is_livestreamer_importable
+
+def serve(input_stream, output_stream, max_workers=4):
+	"""Runs the probe daemon, started with: python -m lsgui_lib.probe_daemon
+
+	The livestreamer library and its plugins are loaded once, and probe requests are read from the input,
+	one JSON object per line: {"id": 1, "url": "..."}. The answers are written in the same way, in the order
+	the probes finish: {"id": 1, "streams": [...], "metadata": {...}} or {"id": 1, "error": "..."}. Returns once
+	the input is closed and the probes in progress have been answered."""
+	prober = StreamProber("in-process", max_workers)
+	output_lock = threading.Lock()
+
+	def write(message):
+		with output_lock:
+			output_stream.write(json.dumps(message) + "\n")
+			output_stream.flush()
+
+	def answer(request_id, future):
+		try:
+			streams, metadata = future.result()
+		except Exception as e:
+			write({"id": request_id, "error": str(e) or e.__class__.__name__})
+		else:
+			write({"id": request_id, "streams": streams, "metadata": metadata})
+
+	# Load the plugins before telling the client that requests can be sent
+	prober.get_session()
+	write({"ready": True})
+	futures = []
+	for line in input_stream:
+		if not line.strip():
+			continue
+		try:
+			request = json.loads(line)
+			request_id, url = request["id"], request["url"]
+		except (ValueError, KeyError, TypeError):
+			write({"id": None, "error": "Invalid request"})
+			continue
+		future = prober.submit(url)
+		future.add_done_callback(lambda future, request_id=request_id: answer(request_id, future))
+		futures.append(future)
+		futures = [future for future in futures if not future.done()]
+	concurrent.futures.wait(futures)
+	prober.shutdown()
+
+
+class ProbeDaemonError(Exception):
+	pass
+
+
+class ProbeDaemonClient(object):
+	"""Sends probes to a probe daemon, starting one when needed.
+
+	A daemon that crashed is replaced on the next probe; the probes it had in progress fail. After
+	max_requests probes a fresh daemon takes over, and the old one exits once it has answered, which
+	bounds the memory the plugins can pile up."""
+
+	def __init__(self, max_requests=200, start_timeout=30, python=None):
+		self.max_requests = max_requests
+		self.start_timeout = start_timeout
+		self.python = python
+		self.lock = threading.Lock()
+		self.daemon = None
+		self.next_id = 1
+
+	def start_daemon(self):
+		startup_info = None
+		if platform.system() == "Windows":
+			startup_info = subprocess.STARTUPINFO()
+			startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
+		package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+		if self.python is None and getattr(sys, "frozen", False):
+			# A py2exe build has no interpreter to run the module with; its executable dispatches --probe-daemon to main()
+			arguments = [sys.executable, "--probe-daemon"]
+			package_dir = None
+		else:
+			arguments = [self.python or sys.executable, "-m", "lsgui_lib.probe_daemon"]
+		process = subprocess.Popen(arguments, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+			cwd=package_dir, startupinfo=startup_info)
+		daemon = {"process": process, "pending": {}, "requests": 0, "ready": concurrent.futures.Future()}
+		threading.Thread(target=self.read_responses, args=(daemon,), daemon=True).start()
+		try:
+			daemon["ready"].result(self.start_timeout)
+		except concurrent.futures.TimeoutError:
+			process.kill()
+			raise ProbeDaemonError("The probe daemon didn't start in time")
+		return daemon
+
+	def read_responses(self, daemon):
+		for line in daemon["process"].stdout:
+			try:
+				message = json.loads(line.decode("utf-8"))
+			except ValueError:
+				continue
+			if message.get("ready"):
+				daemon["ready"].set_result(True)
+				continue
+			with self.lock:
+				future = daemon["pending"].pop(message.get("id"), None)
+			if future is None:
+				continue
+			if "error" in message:
+				future.set_exception(ValueError(message["error"]))
+			else:
+				future.set_result((message["streams"], message["metadata"]))
+		daemon["process"].wait()
+		if not daemon["ready"].done():
+			daemon["ready"].set_exception(ProbeDaemonError("The probe daemon exited with code {}".format(daemon["process"].returncode)))
+		with self.lock:
+			pending, daemon["pending"] = daemon["pending"], {}
+			if self.daemon is daemon:
+				self.daemon = None
+		for future in pending.values():
+			future.set_exception(ProbeDaemonError("The probe daemon exited with code {}".format(daemon["process"].returncode)))
+
+	def retire(self, daemon):
+		"""Lets the daemon exit once it has answered its probes."""
+		try:
+			daemon["process"].stdin.close()
+		except OSError:
+			pass
+
+	def submit(self, url):
+		"""Sends a probe to the daemon. Returns a concurrent.futures.Future of the stream names and their metadata."""
+		with self.lock:
+			daemon = self.daemon
+		if daemon is None or daemon["process"].poll() is not None:
+			daemon = self.start_daemon()
+		future = concurrent.futures.Future()
+		with self.lock:
+			if self.daemon is not None and self.daemon is not daemon:
+				# Another thread started a daemon at the same time
+				self.retire(daemon)
+				daemon = self.daemon
+			self.daemon = daemon
+			request_id = self.next_id
+			self.next_id += 1
+			if daemon["process"].poll() is not None:
+				# It exited before the probe could be sent, and its pending probes have been failed already
+				future.set_exception(ProbeDaemonError("The probe daemon exited with code {}".format(daemon["process"].returncode)))
+				return future
+			daemon["pending"][request_id] = future
+			daemon["requests"] += 1
+			try:
+				daemon["process"].stdin.write((json.dumps({"id": request_id, "url": url}) + "\n").encode("utf-8"))
+				daemon["process"].stdin.flush()
+			except OSError:
+				daemon["pending"].pop(request_id, None)
+				future.set_exception(ProbeDaemonError("The probe daemon is not running"))
+			if daemon["requests"] >= self.max_requests:
+				self.daemon = None
+				self.retire(daemon)
+		return future
+
+	def probe(self, url, timeout=60):
+		"""Blocks until the daemon has answered."""
+		return self.submit(url).result(timeout)
+
+	def stop(self):
+		with self.lock:
+			daemon, self.daemon = self.daemon, None
+		if daemon is not None:
+			self.retire(daemon)
+
+
+def main():
+	if not is_livestreamer_importable():
+		print("The livestreamer library is not installed", file=sys.stderr)
+		return 1
+	serve(io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8"), io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,160 @@
+import os
+import os.path
+import time
+import platform
+from collections import deque
+
+PROC_ROOT = "/proc"
+
+def is_supported():
+	return platform.system() == "Linux" and os.path.isdir(os.path.join(PROC_ROOT, "self"))
+
+def read_file(pid, name):
+	with open(os.path.join(PROC_ROOT, str(pid), name), "rb") as f:
+		return f.read()
+
+def read_stat(pid):
+	"""Returns (name, parent pid, cpu time in clock ticks) from /proc/<pid>/stat."""
+	data = read_file(pid, "stat")
+	# The name is in parentheses and may contain spaces, so split around the last parenthesis
+	left, right = data.find(b"("), data.rfind(b")")
+	fields = data[right+2:].split()
+	return data[left+1:right].decode("utf-8", "replace"), int(fields[1]), int(fields[11]) + int(fields[12])
+
+def read_rss(pid):
+	"""Returns the resident set size in bytes from /proc/<pid>/status."""
+	for line in read_file(pid, "status").splitlines():
+		if line.startswith(b"VmRSS:"):
+			return int(line.split()[1]) * 1024
+	return 0
+
+def read_io(pid):
+	"""Returns the number of bytes read (including from sockets and pipes) from /proc/<pid>/io."""
+	try:
+		for line in read_file(pid, "io").splitlines():
+			if line.startswith(b"rchar:"):
+				return int(line.split()[1])
+	except PermissionError:
+		pass
+	return 0
+
+def get_children(pid):
+	"""Returns the pids of all the descendants of the process."""
+	children = []
+	try:
+		data = read_file(pid, os.path.join("task", str(pid), "children"))
+		direct = [int(child) for child in data.split()]
+	except FileNotFoundError:
+		# Not all kernels have the children file; fall back to scanning every process
+		direct = []
+		for entry in os.listdir(PROC_ROOT):
+			if entry.isdigit():
+				try:
+					if read_stat(entry)[1] == pid:
+						direct.append(int(entry))
+				except (OSError, IndexError, ValueError):
+					continue
+	for child in direct:
+		children.append(child)
+		children.extend(get_children(child))
+	return children
+
+
+class ProcessStats(object):
+	"""The samples of a single process, kept in a fixed-size ring buffer."""
+
+	def __init__(self, pid, name, ring_size):
+		self.pid = pid
+		self.name = name
+		self.samples = deque(maxlen=ring_size)	# (timestamp, cpu %, rss bytes, bytes read)
+		self.last_ticks = None
+		self.last_time = None
+		self.peak_cpu = 0.0
+		self.peak_rss = 0
+		self.first_ticks = None		# The first sample, which the average over all of the samples is counted from
+		self.first_time = None
+		self.clock_ticks = None
+
+	def add_sample(self, timestamp, ticks, rss, read_bytes, clock_ticks):
+		cpu = 0.0
+		if self.first_ticks is None:
+			self.first_ticks = ticks
+			self.first_time = timestamp
+			self.clock_ticks = clock_ticks
+		if self.last_ticks is not None and timestamp > self.last_time:
+			cpu = (ticks - self.last_ticks) / clock_ticks / (timestamp - self.last_time) * 100
+		self.last_ticks = ticks
+		self.last_time = timestamp
+		self.samples.append((timestamp, cpu, rss, read_bytes))
+		self.peak_cpu = max(self.peak_cpu, cpu)
+		self.peak_rss = max(self.peak_rss, rss)
+
+	@property
+	def average_cpu(self):
+		"""The CPU usage between the first and the latest sample, however many of them the ring buffer still holds."""
+		if self.last_time is None or self.last_time <= self.first_time:
+			return 0.0
+		return (self.last_ticks - self.first_ticks) / self.clock_ticks / (self.last_time - self.first_time) * 100
+
+	@property
+	def current(self):
+		return self.samples[-1] if self.samples else (0, 0.0, 0, 0)
+
+	@property
+	def read_rate(self):
+		"""The bytes read per second between the two latest samples, or None before there are two."""
+		if len(self.samples) < 2:
+			return None
+		(previous_time, _, _, previous_bytes), (timestamp, _, _, read_bytes) = self.samples[-2], self.samples[-1]
+		if timestamp <= previous_time:
+			return None
+		return max(read_bytes - previous_bytes, 0) / (timestamp - previous_time)
+
+	def describe(self):
+		timestamp, cpu, rss, read_bytes = self.current
+		return "{}: CPU {:.0f}% (peak {:.0f}%), RSS {:.1f} MiB (peak {:.1f} MiB), read {:.1f} MiB".format(self.name, cpu, self.peak_cpu, rss / 1048576, self.peak_rss / 1048576, read_bytes / 1048576)
+
+
+class SessionResourceSampler(object):
+	"""Samples CPU, memory and I/O of livestreamer and its child processes (e.g. the player) from /proc."""
+
+	def __init__(self, ring_size=600):
+		self.ring_size = ring_size
+		self.clock_ticks = os.sysconf("SC_CLK_TCK")
+		self.processes = {}	# pid => ProcessStats
+		self.started = time.monotonic()
+
+	def sample(self, root_pid, extra_pids=()):
+		"""Takes one sample of the root process, its descendants and any unrelated extra processes."""
+		if root_pid is None:
+			return
+		pids = [root_pid] + get_children(root_pid) + [pid for pid in extra_pids if pid is not None]
+		timestamp = time.monotonic()
+		for pid in pids:
+			try:
+				name, parent, ticks = read_stat(pid)
+				rss = read_rss(pid)
+				read_bytes = read_io(pid)
+			except (OSError, IndexError, ValueError):
+				# The process exited between listing and reading it
+				continue
+			stats = self.processes.get(pid)
+			if stats is None:
+				stats = self.processes[pid] = ProcessStats(pid, "livestreamer" if pid == root_pid else name, self.ring_size)
+			stats.add_sample(timestamp, ticks, rss, read_bytes, self.clock_ticks)
+
+	def read_rate(self, pid):
+		"""The bytes read per second by the process between its two latest samples, or None if it's unknown."""
+		stats = self.processes.get(pid)
+		return stats.read_rate if stats is not None else None
+
+	def describe(self):
+		return " | ".join(stats.describe() for stats in self.processes.values() if stats.samples)
+
+	def summary(self):
+		lines = ["Resource usage over {:.0f} s:".format(time.monotonic() - self.started)]
+		for stats in self.processes.values():
+			if not stats.samples:
+				continue
+			lines.append("  {} (pid {}): average CPU {:.1f}%, peak CPU {:.1f}%, peak RSS {:.1f} MiB, read {:.1f} MiB".format(stats.name, stats.pid, stats.average_cpu, stats.peak_cpu, stats.peak_rss / 1048576, stats.current[3] / 1048576))
+		return "\n".join(lines)
@@ -0,0 +1,95 @@
+import re
+import time
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+AUTO_QUALITY = "auto"
+SYNONYMS = ("best", "worst", AUTO_QUALITY)
+
+# Rough bitrates (in bits per second) of the named qualities Twitch uses
+NAMED_BITRATES = {
+	"source": 6000000,
+	"high": 3000000,
+	"medium": 1500000,
+	"low": 800000,
+	"mobile": 400000,
+	"audio": 160000,
+	"audio_only": 160000,
+}
+AUDIO_ONLY = ("audio", "audio_only")
+
+# Rough bitrates of the resolution-named qualities (e.g. 720p, 720p60) at 30 frames per second
+HEIGHT_BITRATES = [
+	(1080, 5000000),
+	(720, 2500000),
+	(480, 1200000),
+	(360, 700000),
+	(240, 400000),
+	(0, 250000),
+]
+
+RESOLUTION = re.compile(r"^(\d+)p(\d+)?")
+
+def estimate_bitrate(name):
+	"""Returns the estimated bitrate of a quality in bits per second, or None if the name isn't recognized."""
+	if name in NAMED_BITRATES:
+		return NAMED_BITRATES[name]
+	match = RESOLUTION.match(name)
+	if match is None:
+		return None
+	height = int(match.group(1))
+	framerate = int(match.group(2) or 30)
+	for minimum_height, bitrate in HEIGHT_BITRATES:
+		if height >= minimum_height:
+			return int(bitrate * max(framerate, 30) / 30)
+
+def rank_qualities(names):
+	"""Returns the recognized quality names ordered from the lowest to the highest bitrate.
+	Audio-only streams are left out, unless there's nothing else."""
+	ranked = [name for name in names if name not in SYNONYMS and estimate_bitrate(name) is not None]
+	video = [name for name in ranked if name not in AUDIO_ONLY]
+	if video:
+		ranked = video
+	return sorted(ranked, key=lambda name: (estimate_bitrate(name), name))
+
+def choose_quality(names, throughput, headroom=1.5):
+	"""Returns the highest quality whose bitrate times headroom fits into the throughput (in bytes per second)."""
+	ranked = rank_qualities(names)
+	if not ranked:
+		return "best" if "best" in names else None
+	chosen = ranked[0]
+	for name in ranked:
+		if estimate_bitrate(name) * headroom <= throughput * 8:
+			chosen = name
+	return chosen
+
+def lower_quality(names, current):
+	"""Returns the quality one step below the current one, or None if it's already the lowest."""
+	ranked = rank_qualities(names)
+	if current not in ranked:
+		return None
+	position = ranked.index(current)
+	return ranked[position-1] if position > 0 else None
+
+def measure_throughput(url, max_bytes=2 * 1024 * 1024, timeout=5, chunk_size=65536):
+	"""Downloads up to max_bytes from the URL and returns the achieved throughput in bytes per second.
+	HLS playlists are followed to their newest segment, so the measurement covers a real segment."""
+	for _ in range(3):
+		with urlopen(url, timeout=timeout) as response:
+			head = response.read(7)
+			if head != b"#EXTM3U":
+				started = time.monotonic()
+				received = len(head)
+				while received < max_bytes:
+					chunk = response.read(min(chunk_size, max_bytes - received))
+					if not chunk:
+						break
+					received += len(chunk)
+				return received / max(time.monotonic() - started, 0.001)
+			playlist = (head + response.read()).decode("utf-8", "replace")
+		entries = [line.strip() for line in playlist.splitlines() if line.strip() and not line.startswith("#")]
+		if not entries:
+			raise ValueError("Empty playlist at {}".format(url))
+		# A master playlist lists variants (take the first), a media playlist lists segments (take the newest)
+		url = urljoin(url, entries[0] if "#EXT-X-STREAM-INF" in playlist else entries[-1])
+	raise ValueError("Too many nested playlists")
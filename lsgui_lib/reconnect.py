@@ -0,0 +1,41 @@
+import re
+
+# Livestreamer's output when the user ended the session: the player was closed, or livestreamer was interrupted
+USER_STOP = re.compile(rb"Player closed|Interrupted! Exiting")
+# Its output when the stream broke off; a broadcast that has really ended is caught by the probe before reconnecting
+DROPPED = re.compile(rb"Error when reading from stream|Could not open stream|Read timeout|Failed to reload playlist|Unable to open URL|Connection (?:reset|aborted|refused)", re.IGNORECASE)
+# Its output when the stream ended, which is also how a broadcast going offline ends a session
+STREAM_ENDED = re.compile(rb"Stream ended")
+
+def classify_exit(exit_code, lines, stop_requested=False, uptime=None, stable_time=None):
+	"""Tells how a session ended from livestreamer's exit code and its last lines of output: "stopped" if the user stopped
+	it or closed the player, "dropped" if it ended abnormally, or "finished". Without an exit code, only the output tells of
+	a drop. A stream that ended with exit code 0 only dropped if the session ran for less than stable_time seconds."""
+	if stop_requested or any(USER_STOP.search(line) is not None for line in lines):
+		return "stopped"
+	if any(DROPPED.search(line) is not None for line in lines):
+		return "dropped"
+	if exit_code is None:
+		return "finished"
+	if exit_code != 0:
+		return "dropped"
+	if uptime is not None and stable_time is not None and uptime < stable_time and any(STREAM_ENDED.search(line) is not None for line in lines):
+		return "dropped"
+	return "finished"
+
+
+class ReconnectPolicy(object):
+	"""When to start a dropped session again: after exponentially growing delays, up to a budget of attempts.
+	A session that stays up for stable_time seconds earns the whole budget back."""
+
+	def __init__(self, max_attempts=5, initial_delay=2, max_delay=60, stable_time=120):
+		self.max_attempts = max_attempts
+		self.initial_delay = initial_delay		# In seconds
+		self.max_delay = max_delay
+		self.stable_time = stable_time
+
+	def get_delay(self, attempt):
+		"""Returns the delay in seconds before the attempt, counted from 1, or None if the budget is spent."""
+		if attempt > self.max_attempts:
+			return None
+		return min(self.initial_delay * 2 ** (attempt - 1), self.max_delay)
@@ -0,0 +1,127 @@
+import os
+import os.path
+import time
+from datetime import datetime
+
+class StreamRecorder(object):
+	"""Copies the stream from livestreamer's stdout into (optionally rotated) files, and can tee it to a player."""
+
+	buffer_size = 4 * 1024 * 1024	# The copy buffer is allocated once and reused for every chunk
+	report_interval = 10			# How often the write throughput is reported, in seconds
+	metric_interval = 1				# How often the write throughput is sent as a metric, in seconds
+
+	def __init__(self, directory, basename, rotate_size=0, rotate_time=0, report=None, metric=None):
+		self.directory = directory
+		self.basename = basename
+		self.rotate_size = rotate_size	# In bytes, 0 disables size-based rotation
+		self.rotate_time = rotate_time	# In seconds, 0 disables time-based rotation
+		self.report = report			# Callable taking a single message string
+		self.metric = metric			# Callable taking a metric name and value
+
+		self.buffer = bytearray(self.buffer_size)
+		self.view = memoryview(self.buffer)
+
+		self.keep_running = True
+		self.output = None
+		self.output_path = None
+		self.output_bytes = 0
+		self.output_opened = 0
+		self.part = 0
+		self.total_bytes = 0
+
+	def stop(self):
+		self.keep_running = False
+
+	def send_report(self, message):
+		if self.report is not None:
+			self.report(message)
+
+	def open_next_file(self):
+		self.close_file()
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		self.part += 1
+		filename = "{}_{}.{:03d}.ts".format(self.basename, datetime.now().strftime("%Y%m%d_%H%M%S"), self.part)
+		self.output_path = os.path.join(self.directory, filename)
+		# Unbuffered, so the data goes from our buffer straight to the kernel
+		self.output = open(self.output_path, "wb", buffering=0)
+		self.output_bytes = 0
+		self.output_opened = time.monotonic()
+		self.send_report("Recording to '{}'".format(self.output_path))
+
+	def close_file(self):
+		if self.output is not None:
+			self.output.close()
+			self.output = None
+
+	def needs_rotation(self):
+		if self.output is None:
+			return True
+		if self.rotate_size and self.output_bytes >= self.rotate_size:
+			return True
+		if self.rotate_time and time.monotonic() - self.output_opened >= self.rotate_time:
+			return True
+		return False
+
+	def write_all(self, target, length):
+		written = 0
+		while written < length:
+			written += target.write(self.view[written:length])
+
+	def copy(self, source, tee=None):
+		"""Copies from the source pipe until it's exhausted or stop() is called. Returns the number of bytes copied.
+		If tee is given (e.g. the player's stdin), every chunk is written there as well."""
+		source_fd = source.fileno()
+		raw_source = getattr(source, "raw", source)
+		# Without a tee the data doesn't need to pass through user space at all
+		use_splice = tee is None and hasattr(os, "splice")
+
+		started = time.monotonic()
+		last_report = last_metric = started
+		last_report_bytes = last_metric_bytes = 0
+		try:
+			while self.keep_running:
+				if self.needs_rotation():
+					self.open_next_file()
+
+				if use_splice:
+					try:
+						length = os.splice(source_fd, self.output.fileno(), self.buffer_size)
+					except OSError:
+						# The source isn't a pipe or the filesystem doesn't support splicing; fall back to copying
+						use_splice = False
+						continue
+				else:
+					length = raw_source.readinto(self.view)
+					if length is None:
+						continue
+					if length:
+						self.write_all(self.output, length)
+						if tee is not None:
+							try:
+								self.write_all(tee, length)
+							except (BrokenPipeError, OSError):
+								self.send_report("Player closed; continuing to record without it.")
+								tee = None
+
+				if not length:
+					break
+				self.output_bytes += length
+				self.total_bytes += length
+
+				now = time.monotonic()
+				if self.metric is not None and now - last_metric >= self.metric_interval:
+					self.metric("throughput", (self.total_bytes - last_metric_bytes) / (now - last_metric))
+					last_metric = now
+					last_metric_bytes = self.total_bytes
+				if now - last_report >= self.report_interval:
+					rate = (self.total_bytes - last_report_bytes) / (now - last_report)
+					self.send_report("Recording: {:.2f} MiB/s, {:.1f} MiB written in total".format(rate / 1048576, self.total_bytes / 1048576))
+					last_report = now
+					last_report_bytes = self.total_bytes
+		finally:
+			self.close_file()
+
+		elapsed = max(time.monotonic() - started, 0.001)
+		self.send_report("Recording finished: {:.1f} MiB in {} file(s), {:.2f} MiB/s on average".format(self.total_bytes / 1048576, self.part, self.total_bytes / elapsed / 1048576))
+		return self.total_bytes
@@ -0,0 +1,200 @@
+import os
+import os.path
+import re
+import gzip
+import mmap
+import queue
+import shutil
+import bisect
+import threading
+from datetime import datetime
+
+INDEX_FILE = "sessions.idx"
+
+class SessionLogWriter(threading.Thread):
+	"""Appends everything shown in the log widget to rotating files in the background.
+
+	The start of every session is recorded in an index file as a (file, offset) pair, so the
+	browser can jump from a match to the session it belongs to without reading whole files."""
+
+	def __init__(self, directory, max_size=16 * 1024 * 1024, keep_files=20, compress=True):
+		super().__init__(daemon=True)
+		self.directory = directory
+		self.max_size = max_size		# Rotate the current file when it grows beyond this many bytes
+		self.keep_files = keep_files	# How many rotated files are kept, 0 keeps all
+		self.compress = compress		# Gzip the files when they're rotated out
+
+		self.queue = queue.Queue()
+		self.output = None
+		self.output_name = None
+		self.session = None				# (timestamp, title) of the current session, which goes on in the next file on rotation
+
+	def write(self, text):
+		self.queue.put(("text", text))
+
+	def start_session(self, title):
+		self.queue.put(("session", title, datetime.now()))
+
+	def close(self, timeout=5):
+		self.queue.put(None)
+		self.join(timeout)
+
+	def open_output(self):
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		self.output_name = "session_{}.log".format(datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+		self.output = open(os.path.join(self.directory, self.output_name), "ab")
+
+	def rotate(self):
+		self.output.close()
+		self.output = None
+		if self.compress:
+			path = os.path.join(self.directory, self.output_name)
+			with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+				shutil.copyfileobj(source, target)
+			os.remove(path)
+		self.remove_old_files()
+
+	def remove_old_files(self):
+		if not self.keep_files:
+			return
+		files = sorted(name for name in os.listdir(self.directory) if name.startswith("session_") and name != self.output_name)
+		removed = files[:-self.keep_files]
+		for name in removed:
+			os.remove(os.path.join(self.directory, name))
+		if removed:
+			self.remove_index_entries({name[:-3] if name.endswith(".gz") else name for name in removed})
+
+	def remove_index_entries(self, names):
+		"""Drops the index entries of the removed files, which are named without the .gz suffix in the index."""
+		path = os.path.join(self.directory, INDEX_FILE)
+		if not os.path.exists(path):
+			return
+		with open(path, encoding="utf-8") as index:
+			lines = [line for line in index if line.split("\t", 1)[0] not in names]
+		with open(path + ".tmp", "w", encoding="utf-8") as index:
+			index.writelines(lines)
+		os.replace(path + ".tmp", path)
+
+	def write_index_entry(self, offset, timestamp, title):
+		with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as index:
+			index.write("{}\t{}\t{}\t{}\n".format(self.output_name, offset, timestamp.strftime("%Y-%m-%d %H:%M:%S"), title.replace("\t", " ").replace("\n", " ")))
+
+	def handle(self, item):
+		if self.output is None:
+			self.open_output()
+		elif self.output.tell() >= self.max_size:
+			self.rotate()
+			self.open_output()
+			if item[0] == "text" and self.session is not None:
+				# The session goes on in the new file, where its lines are found through an entry of their own
+				self.write_index_entry(0, *self.session)
+		if item[0] == "session":
+			title, timestamp = item[1], item[2]
+			self.session = (timestamp, title)
+			self.write_index_entry(self.output.tell(), timestamp, title)
+			self.output.write("=== Session started {}: {} ===\n".format(timestamp.strftime("%Y-%m-%d %H:%M:%S"), title).encode("utf-8"))
+		else:
+			self.output.write(item[1].encode("utf-8"))
+
+	def run(self):
+		try:
+			running = True
+			while running:
+				items = [self.queue.get()]
+				# Drain whatever else has piled up, so a burst of lines results in a single flush
+				try:
+					while len(items) < 1000:
+						items.append(self.queue.get_nowait())
+				except queue.Empty:
+					pass
+
+				for item in items:
+					if item is None:
+						running = False
+						break
+					self.handle(item)
+				if self.output is not None:
+					self.output.flush()
+		finally:
+			if self.output is not None:
+				self.output.close()
+
+
+class SessionLogSearcher(object):
+	"""Searches the session log files without loading them into memory; plain files are memory-mapped."""
+
+	def __init__(self, directory):
+		self.directory = directory
+
+	def load_index(self):
+		"""Returns a dict of file name => sorted list of (offset, timestamp, title)."""
+		index = {}
+		path = os.path.join(self.directory, INDEX_FILE)
+		if not os.path.exists(path):
+			return index
+		with open(path, encoding="utf-8") as f:
+			for line in f:
+				parts = line.rstrip("\n").split("\t", 3)
+				if len(parts) != 4:
+					continue
+				index.setdefault(parts[0], []).append((int(parts[1]), parts[2], parts[3]))
+		for sessions in index.values():
+			sessions.sort()
+		return index
+
+	def get_log_files(self):
+		"""Returns (name, path) of the existing log files, oldest first. Names are without the .gz suffix, as in the index."""
+		if not os.path.isdir(self.directory):
+			return []
+		files = []
+		for name in sorted(os.listdir(self.directory)):
+			if not name.startswith("session_"):
+				continue
+			base = name[:-3] if name.endswith(".gz") else name
+			files.append((base, os.path.join(self.directory, name)))
+		return files
+
+	def iter_plain_matches(self, path, pattern):
+		if os.path.getsize(path) == 0:
+			return
+		with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+			position = 0
+			while True:
+				match = pattern.search(mm, position)
+				if match is None:
+					break
+				start = mm.rfind(b"\n", 0, match.start()) + 1
+				end = mm.find(b"\n", match.end())
+				if end == -1:
+					end = len(mm)
+				yield start, mm[start:end]
+				position = end + 1
+
+	def iter_compressed_matches(self, path, pattern):
+		with gzip.open(path, "rb") as f:
+			offset = 0
+			for line in f:
+				if pattern.search(line):
+					yield offset, line.rstrip(b"\n")
+				offset += len(line)
+
+	def search(self, text, max_results=1000, ignore_case=True):
+		"""Yields (session timestamp, session title, line) for every line containing the text, oldest first."""
+		pattern = re.compile(re.escape(text.encode("utf-8")), re.IGNORECASE if ignore_case else 0)
+		index = self.load_index()
+		results = 0
+		for name, path in self.get_log_files():
+			sessions = index.get(name, [])
+			offsets = [session[0] for session in sessions]
+			matches = self.iter_compressed_matches(path, pattern) if path.endswith(".gz") else self.iter_plain_matches(path, pattern)
+			for offset, line in matches:
+				position = bisect.bisect_right(offsets, offset) - 1
+				if position >= 0:
+					timestamp, title = sessions[position][1], sessions[position][2]
+				else:
+					timestamp, title = "", "(no session)"
+				yield timestamp, title, line.decode("utf-8", "replace")
+				results += 1
+				if max_results and results >= max_results:
+					return
@@ -0,0 +1,73 @@
+import json
+import getpass
+
+from PyQt5 import QtCore
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+def get_server_name():
+	# One instance per user; the config database lives in the user's working directory
+	return "livestreamer_gui-{}".format(getpass.getuser())
+
+def send_to_running_instance(message, timeout=500):
+	"""Sends the message dict to an already running instance. Returns False if no instance is running."""
+	socket = QLocalSocket()
+	socket.connectToServer(get_server_name())
+	if not socket.waitForConnected(timeout):
+		return False
+	socket.write(json.dumps(message).encode("utf-8") + b"\n")
+	socket.waitForBytesWritten(timeout)
+	socket.disconnectFromServer()
+	return True
+
+
+class InstanceServer(QtCore.QObject):
+	"""Listens for the messages of instances started after this one."""
+
+	messageReceived = QtCore.pyqtSignal(object)
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.server = QLocalServer(self)
+		self.server.newConnection.connect(self.handle_new_connection)
+		self.buffers = {}
+
+	def listen(self, timeout=500):
+		"""Starts listening. Returns False if it failed, e.g. because another instance has started listening in the meantime."""
+		name = get_server_name()
+		if self.server.listen(name):
+			return True
+		# Another instance may have started since nothing answered; only a socket no one answers on is removed,
+		# as it was left behind by an instance that crashed
+		socket = QLocalSocket()
+		socket.connectToServer(name)
+		if socket.waitForConnected(timeout):
+			socket.disconnectFromServer()
+			return False
+		QLocalServer.removeServer(name)
+		return self.server.listen(name)
+
+	def close(self):
+		self.server.close()
+
+	def handle_new_connection(self):
+		while self.server.hasPendingConnections():
+			socket = self.server.nextPendingConnection()
+			self.buffers[socket] = b""
+			socket.readyRead.connect(lambda socket=socket: self.read_messages(socket))
+			socket.disconnected.connect(lambda socket=socket: self.close_connection(socket))
+
+	def read_messages(self, socket):
+		data = self.buffers.get(socket, b"") + bytes(socket.readAll())
+		*lines, self.buffers[socket] = data.split(b"\n")
+		for line in lines:
+			try:
+				message = json.loads(line.decode("utf-8"))
+			except ValueError:
+				continue
+			if isinstance(message, dict):
+				self.messageReceived.emit(message)
+
+	def close_connection(self, socket):
+		self.read_messages(socket)
+		self.buffers.pop(socket, None)
+		socket.deleteLater()
@@ -0,0 +1,77 @@
+import socket
+
+def get_free_port(host="127.0.0.1"):
+	"""Asks the OS for a currently unused TCP port."""
+	s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	try:
+		s.bind((host, 0))
+		return s.getsockname()[1]
+	finally:
+		s.close()
+
+
+class WarmStandby(object):
+	"""A livestreamer process started ahead of time for a channel, serving the stream over HTTP once a player connects."""
+
+	def __init__(self, session, port, worker):
+		self.session = session	# The same kind of dict MainWindow uses for running sessions
+		self.port = port
+		self.worker = worker
+		self.ready = False
+
+	@property
+	def key(self):
+		return (self.session["streamer"], self.session["channel"], self.session["quality"])
+
+	@property
+	def url(self):
+		return "http://127.0.0.1:{}/".format(self.port)
+
+
+class StandbyPool(object):
+	"""The "next channel" queue. The number of warm standbys is capped, since each of them uses bandwidth."""
+
+	def __init__(self, max_standbys=1):
+		self.max_standbys = max_standbys
+		self.queue = []
+
+	def __len__(self):
+		return len(self.queue)
+
+	def is_full(self):
+		return len(self.queue) >= self.max_standbys
+
+	def add(self, standby):
+		self.queue.append(standby)
+
+	def find(self, streamer, channel, quality):
+		for standby in self.queue:
+			if standby.key == (streamer, channel, quality):
+				return standby
+		return None
+
+	def next(self):
+		return self.queue[0] if self.queue else None
+
+	def take(self, standby=None):
+		"""Removes the given standby, or the next one in the queue, from the pool and returns it."""
+		if standby is None:
+			if not self.queue:
+				return None
+			standby = self.queue[0]
+		self.queue.remove(standby)
+		return standby
+
+	def remove_worker(self, worker):
+		for standby in self.queue:
+			if standby.worker is worker:
+				self.queue.remove(standby)
+				return standby
+		return None
+
+	def stop_all(self, grace_time):
+		for standby in self.queue:
+			standby.worker.term_process()
+		for standby in self.queue:
+			standby.worker.wait(grace_time)
+		self.queue = []
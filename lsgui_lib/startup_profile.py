@@ -0,0 +1,79 @@
+import io
+import sys
+import time
+
+class StartupProfiler(object):
+	"""Times the phases of a cold start. Phases are ended with mark(); a disabled profiler does nothing, so the marks can stay in the code."""
+
+	def __init__(self, enabled=False, profile_calls=False, trace_memory=False, started=None):
+		self.enabled = enabled
+		self.phases = []	# (name, milliseconds, modules imported, peak traced memory in bytes or None)
+		self.profile = None
+		self.trace_memory = enabled and trace_memory
+		if not enabled:
+			return
+		# The profiling modules are only imported when used, to keep them out of normal startups
+		if self.trace_memory:
+			import tracemalloc
+			tracemalloc.start()
+		if profile_calls:
+			import cProfile
+			self.profile = cProfile.Profile()
+			self.profile.enable()
+		# The first phase starts when the script started the clock, if it did, so that nothing before the profiler is missed
+		self.started = self.last_mark = started if started is not None else time.perf_counter()
+		self.last_module_count = len(sys.modules)
+
+	def mark(self, name):
+		"""Ends the phase with the name, which began at the previous mark."""
+		if not self.enabled:
+			return
+		now = time.perf_counter()
+		peak = None
+		if self.trace_memory:
+			import tracemalloc
+			peak = tracemalloc.get_traced_memory()[1]
+			if hasattr(tracemalloc, "reset_peak"):
+				tracemalloc.reset_peak()	# Python 3.9+; otherwise the peak is the peak so far
+		module_count = len(sys.modules)
+		self.phases.append((name, (now - self.last_mark) * 1000, module_count - self.last_module_count, peak))
+		self.last_module_count = module_count
+		# The time taken by the bookkeeping above is left out of the next phase
+		self.last_mark = time.perf_counter()
+
+	@property
+	def total_time(self):
+		"""The total of the phases in milliseconds."""
+		return sum(phase[1] for phase in self.phases)
+
+	def stop(self):
+		if self.profile is not None:
+			self.profile.disable()
+		if self.trace_memory:
+			import tracemalloc
+			tracemalloc.stop()
+
+	def get_report(self, budget=None, top_calls=30):
+		lines = ["Startup profile, {}".format(time.strftime("%Y-%m-%d %H:%M:%S")), ""]
+		lines.append("{:<45} {:>10} {:>8} {:>12}".format("Phase", "ms", "imports", "peak memory"))
+		for name, milliseconds, imports, peak in self.phases:
+			lines.append("{:<45} {:>10.1f} {:>8} {:>12}".format(name, milliseconds, imports, "{:.1f} KiB".format(peak / 1024) if peak is not None else "-"))
+		lines.append("{:<45} {:>10.1f} {:>8}".format("Total", self.total_time, sum(phase[2] for phase in self.phases)))
+		if budget is not None:
+			lines.append("")
+			lines.append("Budget {} ms: {}".format(budget, "exceeded" if self.is_over_budget(budget) else "met"))
+		if self.profile is not None:
+			import pstats
+			stream = io.StringIO()
+			stats = pstats.Stats(self.profile, stream=stream)
+			stats.sort_stats("cumulative").print_stats(top_calls)
+			lines.append("")
+			lines.append(stream.getvalue())
+		return "\n".join(lines) + "\n"
+
+	def write_report(self, path, budget=None):
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(self.get_report(budget))
+
+	def is_over_budget(self, budget):
+		return self.total_time > budget
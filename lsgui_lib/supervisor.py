@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import time
+import getpass
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client, deliver_challenge, answer_challenge
+
+from .output import read_lines
+
+class SupervisorError(Exception):
+	pass
+
+
+def get_supervisor_address():
+	"""The address of the current user's supervisor: a named pipe on Windows, a Unix socket elsewhere."""
+	try:
+		user = re.sub(r"\W+", "_", getpass.getuser())
+	except Exception:
+		user = "user"
+	if platform.system() == "Windows":
+		return r"\\.\pipe\livestreamer-gui-supervisor-{}".format(user)
+	return os.path.join(tempfile.gettempdir(), "livestreamer-gui-supervisor-{}.sock".format(user))
+
+def get_authkey(key_path, create=False):
+	"""Reads the key the supervisor's clients authenticate with, creating it readable only by the user if asked to."""
+	if create and not os.path.exists(key_path):
+		fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+		with os.fdopen(fd, "wb") as f:
+			f.write(os.urandom(32))
+	with open(key_path, "rb") as f:
+		return f.read()
+
+
+class SupervisedSession(object):
+	"""A livestreamer process of the supervisor, with the latest lines of its output."""
+
+	def __init__(self, session_id, arguments, info, max_lines):
+		self.id = session_id
+		self.arguments = arguments
+		self.info = info			# What the GUI needs to know of the session when it reattaches
+		self.lines = deque(maxlen=max_lines)	# (sequence number, line)
+		self.next_line = 0
+		self.lock = threading.Lock()
+		self.started = time.time()
+		self.exit_code = None
+		startup_info = None
+		if platform.system() == "Windows":
+			startup_info = subprocess.STARTUPINFO()
+			startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
+		self.process = subprocess.Popen(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, startupinfo=startup_info)
+		threading.Thread(target=self.read_output, daemon=True).start()
+
+	@property
+	def running(self):
+		return self.exit_code is None
+
+	def read_output(self):
+		for line in read_lines(self.process.stdout):
+			with self.lock:
+				self.lines.append((self.next_line, line))
+				self.next_line += 1
+		self.exit_code = self.process.wait()
+
+	def get_lines(self, since=0):
+		"""Returns the buffered lines from the sequence number on."""
+		with self.lock:
+			return [(number, line) for number, line in self.lines if number >= since]
+
+	def describe(self):
+		return {"id": self.id, "info": self.info, "started": self.started, "running": self.running, "exit_code": self.exit_code}
+
+
+class Supervisor(object):
+	"""Owns the livestreamer processes of sessions, so that they keep running when the GUI is closed.
+
+	The GUI talks to it over a local socket, authenticated with a key only the user can read. The
+	supervisor exits once it has had no running sessions and no clients for the idle timeout."""
+
+	def __init__(self, address, authkey, max_lines=500, idle_timeout=60):
+		self.address = address
+		self.authkey = authkey
+		self.max_lines = max_lines
+		self.idle_timeout = idle_timeout
+		self.sessions = {}			# Id => SupervisedSession
+		self.next_id = 1
+		self.clients = 0
+		self.lock = threading.Lock()
+		self.idle_since = time.monotonic()
+		self.listener = None
+
+	def serve(self):
+		if platform.system() != "Windows" and os.path.exists(self.address):
+			# Left behind by a supervisor that didn't exit cleanly; a live one would have answered the client
+			os.remove(self.address)
+		# Without an authkey the listener doesn't authenticate; that's done in the client's thread, so that
+		# neither a client with the wrong key nor a slow one can stop the others from connecting
+		self.listener = Listener(self.address)
+		threading.Thread(target=self.exit_when_idle, daemon=True).start()
+		while True:
+			try:
+				connection = self.listener.accept()
+			except (OSError, EOFError):
+				continue
+			threading.Thread(target=self.handle_client, args=(connection,), daemon=True).start()
+
+	def exit_when_idle(self):
+		while True:
+			time.sleep(1)
+			with self.lock:
+				busy = self.clients > 0 or any(session.running for session in self.sessions.values())
+				if busy:
+					self.idle_since = time.monotonic()
+				elif time.monotonic() - self.idle_since > self.idle_timeout:
+					self.listener.close()
+					os._exit(0)
+
+	def handle_client(self, connection):
+		try:
+			deliver_challenge(connection, self.authkey)
+			answer_challenge(connection, self.authkey)
+		except (AuthenticationError, OSError, EOFError):
+			connection.close()
+			return
+		with self.lock:
+			self.clients += 1
+		try:
+			while True:
+				try:
+					request = connection.recv()
+				except (EOFError, OSError):
+					break
+				try:
+					response = self.handle_request(request)
+				except Exception as e:
+					response = {"error": str(e) or e.__class__.__name__}
+				connection.send(response)
+		finally:
+			connection.close()
+			with self.lock:
+				self.clients -= 1
+
+	def get_session(self, session_id):
+		session = self.sessions.get(session_id)
+		if session is None:
+			raise SupervisorError("No such session")
+		return session
+
+	def handle_request(self, request):
+		command = request.get("command")
+		if command == "start":
+			with self.lock:
+				session_id = self.next_id
+				self.next_id += 1
+			session = SupervisedSession(session_id, request["arguments"], request.get("info"), self.max_lines)
+			with self.lock:
+				self.sessions[session_id] = session
+			return {"id": session_id}
+		if command == "list":
+			with self.lock:
+				return {"sessions": [session.describe() for session in self.sessions.values()]}
+		if command == "lines":
+			session = self.get_session(request["id"])
+			exit_code = session.exit_code	# Read first, so that no line written before the exit is missed
+			return {"lines": session.get_lines(request.get("since", 0)), "running": exit_code is None, "exit_code": exit_code}
+		if command == "stop":
+			session = self.get_session(request["id"])
+			if session.running:
+				session.process.terminate()
+			return {}
+		if command == "forget":
+			with self.lock:
+				session = self.sessions.get(request["id"])
+				if session is not None and not session.running:
+					del self.sessions[request["id"]]
+			return {}
+		if command == "ping":
+			return {"pid": os.getpid()}
+		raise SupervisorError("Unknown command '{}'".format(command))
+
+
+class SupervisorClient(object):
+	"""A connection to the supervisor, which can be shared by threads."""
+
+	def __init__(self, connection):
+		self.connection = connection
+		self.lock = threading.Lock()
+
+	@classmethod
+	def connect(cls, key_path, spawn=False, max_lines=500, timeout=10):
+		"""Connects to the running supervisor, or starts one first if asked to. Returns None if there's none to connect to."""
+		address = get_supervisor_address()
+		try:
+			return cls(Client(address, authkey=get_authkey(key_path, spawn)))
+		except AuthenticationError:
+			raise SupervisorError("The session supervisor was started with another key than '{}'".format(os.path.abspath(key_path)))
+		except (OSError, EOFError):
+			if not spawn:
+				return None
+		start_supervisor(key_path, max_lines)
+		deadline = time.monotonic() + timeout
+		while True:
+			time.sleep(0.1)
+			try:
+				return cls(Client(address, authkey=get_authkey(key_path)))
+			except AuthenticationError:
+				raise SupervisorError("The session supervisor was started with another key than '{}'".format(os.path.abspath(key_path)))
+			except (OSError, EOFError):
+				if time.monotonic() > deadline:
+					raise SupervisorError("The session supervisor didn't start")
+
+	def request(self, command, **arguments):
+		arguments["command"] = command
+		with self.lock:
+			try:
+				self.connection.send(arguments)
+				response = self.connection.recv()
+			except (OSError, EOFError) as e:
+				raise SupervisorError("Lost the connection to the session supervisor: {}".format(str(e) or e.__class__.__name__))
+		if "error" in response:
+			raise SupervisorError(response["error"])
+		return response
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
+
+
+def start_supervisor(key_path, max_lines=500):
+	"""Starts the supervisor detached from this process, so that it outlives it."""
+	package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	if getattr(sys, "frozen", False):
+		# A py2exe build has no interpreter to run the module with; its executable dispatches --supervisor to main()
+		arguments = [sys.executable, "--supervisor"]
+		package_dir = None
+	else:
+		arguments = [sys.executable, "-m", "lsgui_lib.supervisor"]
+	arguments += ["--key", os.path.abspath(key_path), "--lines", str(max_lines)]
+	if platform.system() == "Windows":
+		flags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+		subprocess.Popen(arguments, cwd=package_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=flags)
+	else:
+		subprocess.Popen(arguments, cwd=package_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Runs the livestreamer sessions of Livestreamer GUI independently of it.")
+	parser.add_argument("--key", required=True, help="The file with the key clients authenticate with")
+	parser.add_argument("--lines", type=int, default=500, help="How many lines of output are kept per session")
+	parser.add_argument("--idle-timeout", type=int, default=60, help="How long to wait for sessions or clients before exiting, in seconds")
+	args = parser.parse_args(argv)
+	Supervisor(get_supervisor_address(), get_authkey(args.key), args.lines, args.idle_timeout).serve()
+
+if __name__ == "__main__":
+	main()
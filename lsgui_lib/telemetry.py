@@ -0,0 +1,118 @@
+import math
+import time
+import queue
+import sqlite3
+import threading
+
+TELEMETRY_KINDS = (
+	("probe", "Probe duration"),
+	("player-start", "Time to player start"),
+	("session", "Session length"),
+	("reconnect", "Reconnect downtime"),
+	)
+
+class TelemetryWriter(threading.Thread):
+	"""Writes telemetry events to the telemetry table from a thread of its own.
+
+	record() only puts the event in a queue, so the GUI thread never waits for the database. The events
+	are written in batches with a connection of the thread's own, at most flush_interval seconds late."""
+
+	def __init__(self, database_path, batch_size=100, flush_interval=5):
+		super().__init__(daemon=True)
+		self.database_path = database_path
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.queue = queue.Queue()
+
+	def record(self, kind, channel_id=None, duration=None, success=None, exit_code=None):
+		"""Records an event; the duration is in seconds. Can be called from any thread."""
+		self.queue.put((time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()), kind, channel_id, duration, success, exit_code))
+
+	def stop(self, timeout=None):
+		"""Writes the events recorded so far and ends the thread."""
+		self.queue.put(None)
+		self.join(timeout)
+
+	def run(self):
+		# The timeout covers the moments the GUI's connection is writing
+		connection = sqlite3.connect(self.database_path, timeout=30)
+		connection.execute("PRAGMA foreign_keys = ON")
+		running = True
+		while running:
+			batch = []
+			deadline = time.monotonic() + self.flush_interval
+			while len(batch) < self.batch_size:
+				try:
+					event = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+				except queue.Empty:
+					break
+				if event is None:
+					running = False
+					break
+				batch.append(event)
+			if batch:
+				self.write_batch(connection, batch)
+		connection.close()
+
+	def write_batch(self, connection, batch):
+		try:
+			with connection:
+				connection.executemany("INSERT INTO telemetry (timestamp, kind, channel_id, duration, success, exit_code) VALUES (?, ?, ?, ?, ?, ?)", batch)
+		except sqlite3.IntegrityError:
+			# The channel of an event was deleted in the meantime
+			with connection:
+				connection.executemany("INSERT INTO telemetry (timestamp, kind, channel_id, duration, success, exit_code) VALUES (?, ?, (SELECT id FROM channel WHERE id = ?), ?, ?, ?)", batch)
+		except sqlite3.Error:
+			pass	# Telemetry is not worth disturbing the application for
+
+
+def percentile(values, fraction):
+	"""The nearest-rank percentile of the sorted values."""
+	if not values:
+		return None
+	return values[max(1, math.ceil(fraction * len(values))) - 1]
+
+def format_duration(seconds):
+	if seconds is None:
+		return "-"
+	if seconds < 120:
+		return "{:.2f} s".format(seconds)
+	if seconds < 7200:
+		return "{:.1f} min".format(seconds / 60)
+	return "{:.1f} h".format(seconds / 3600)
+
+def get_telemetry_report(connection, days=30):
+	"""Builds a text report of the telemetry of the last days: the count, failure rate and p50/p95/p99 of the durations of each kind of event, overall and per channel."""
+	c = connection.cursor()
+	c.execute("""SELECT telemetry.kind, streamer.name, channel.name, telemetry.duration, telemetry.success, telemetry.exit_code
+		FROM telemetry LEFT JOIN channel ON channel.id = telemetry.channel_id LEFT JOIN streamer ON streamer.id = channel.streamer_id
+		WHERE telemetry.timestamp > datetime('now', '-' || ? || ' days')""", (days,))
+	groups = {}		# (kind, channel or None for overall) => ([durations], count, failures)
+	for kind, streamer_name, channel_name, duration, success, exit_code in c:
+		# The success, where it's known, says more than the exit code: a session the user stopped may end with a nonzero one
+		failed = success == 0 if success is not None else exit_code is not None and exit_code != 0
+		channel = "{} / {}".format(streamer_name, channel_name) if channel_name is not None else "(deleted channel)"
+		for key in ((kind, None), (kind, channel)):
+			durations, count, failures = groups.get(key, ([], 0, 0))
+			if duration is not None:
+				durations.append(duration)
+			groups[key] = (durations, count + 1, failures + failed)
+	c.close()
+
+	lines = ["Telemetry of the last {} days".format(days)]
+	row_format = "{:<40} {:>7} {:>8} {:>10} {:>10} {:>10}"
+	for kind, title in TELEMETRY_KINDS:
+		keys = sorted((key for key in groups if key[0] == kind), key=lambda key: (key[1] is not None, key[1] or ""))
+		lines.append("")
+		lines.append(title)
+		if not keys:
+			lines.append("  No events.")
+			continue
+		lines.append(row_format.format("", "count", "failed", "p50", "p95", "p99"))
+		for key in keys:
+			durations, count, failures = groups[key]
+			durations.sort()
+			lines.append(row_format.format(
+				key[1] or "All channels", count, "{:.0%}".format(failures / count),
+				*(format_duration(percentile(durations, fraction)) for fraction in (0.5, 0.95, 0.99))))
+	return "\n".join(lines) + "\n"
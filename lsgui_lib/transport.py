@@ -0,0 +1,97 @@
+# The tunable columns of the transport_profile table and the livestreamer options they map to.
+# A value of None (or 0) means the option is not passed and livestreamer's default is used.
+TRANSPORT_OPTIONS = [
+	("hls_segment_threads", "--hls-segment-threads", "{}"),
+	("ringbuffer_size", "--ringbuffer-size", "{}M"),	# Value is in megabytes
+	("hls_live_edge", "--hls-live-edge", "{}"),
+	("stream_timeout", "--stream-timeout", "{}"),		# Value is in seconds
+	("http_timeout", "--http-timeout", "{}"),			# Value is in seconds
+]
+TRANSPORT_COLUMNS = [column for column, option, value_format in TRANSPORT_OPTIONS] + ["auto_tune"]
+
+# How livestreamer hands the stream over to the player in watch mode, stored in the handoff column of
+# the transport profile: (mode, description, livestreamer arguments). "auto" is resolved by choose_handoff().
+HANDOFF_MODES = [
+	("auto", "Automatic", None),
+	("stdout", "Pipe through livestreamer", []),
+	("passthrough", "Player fetches HLS itself", ["--player-passthrough", "hls"]),
+	("fifo", "Named pipe", ["--player-fifo"]),
+	("http", "Local HTTP server", ["--player-http"]),
+]
+
+def get_handoff_arguments(mode):
+	for handoff, description, arguments in HANDOFF_MODES:
+		if handoff == mode:
+			return list(arguments or [])
+	raise ValueError("Unknown handoff mode: {}".format(mode))
+
+def choose_handoff(mode, capabilities=None, needs_output=False):
+	"""Returns the handoff mode to use for the channel's mode, given the ExecutableCapabilities of livestreamer (None if not known).
+
+	A mode livestreamer doesn't support falls back to the pipe. The automatic choice is passthrough, which keeps the
+	stream's bytes out of livestreamer entirely, unless livestreamer's download output is needed (metrics collection and
+	automatic quality) or it's not known to be supported; the other modes copy the stream as much as the pipe does."""
+	mode = mode or "auto"
+	if mode == "auto":
+		mode = "passthrough" if not needs_output else "stdout"
+	arguments = get_handoff_arguments(mode)
+	if arguments and (capabilities is None or not capabilities.supports(arguments[0])):
+		return "stdout"
+	return mode
+
+def get_transport_arguments(profile, capabilities=None):
+	"""Returns the livestreamer arguments for a transport_profile row (or dict). With the ExecutableCapabilities
+	of livestreamer, the options it doesn't support are left out."""
+	arguments = []
+	if profile is None:
+		return arguments
+	for column, option, value_format in TRANSPORT_OPTIONS:
+		if capabilities is not None and not capabilities.supports(option):
+			continue
+		if profile[column]:
+			arguments.extend([option, value_format.format(profile[column])])
+	return arguments
+
+
+class TransportAutoTuner(object):
+	"""Adjusts segment threads and ringbuffer size from the stall and latency statistics of a channel's past sessions."""
+
+	min_sessions = 2			# How many sessions are needed before tuning
+	stall_rate_high = 0.5		# Stalls per minute, above which more buffering and parallelism is added
+	stall_rate_low = 0.05		# Stalls per minute, below which the settings are considered comfortable
+	latency_high = 2.0			# Average segment fetch time in seconds, above which more threads are used
+	latency_low = 0.5
+	max_threads = 10
+	default_threads = 1			# Livestreamer's defaults
+	default_ringbuffer = 16
+	min_ringbuffer = 8
+	max_ringbuffer = 128
+
+	def tune(self, profile):
+		"""Returns a dict of the changed columns, which is empty if nothing needs to change."""
+		if profile is None or not profile["auto_tune"] or profile["sessions"] < self.min_sessions:
+			return {}
+
+		threads = profile["hls_segment_threads"] or self.default_threads
+		ringbuffer = profile["ringbuffer_size"] or self.default_ringbuffer
+		stall_rate = profile["stall_rate"] or 0.0
+		latency = profile["segment_latency"]
+
+		new_threads, new_ringbuffer = threads, ringbuffer
+		if stall_rate > self.stall_rate_high:
+			new_ringbuffer = min(ringbuffer * 2, self.max_ringbuffer)
+			if latency is not None and latency > self.latency_high:
+				new_threads = min(threads + 1, self.max_threads)
+		elif stall_rate < self.stall_rate_low:
+			# Give back what isn't needed
+			if latency is not None and latency < self.latency_low and threads > self.default_threads:
+				new_threads = threads - 1
+			if ringbuffer > self.default_ringbuffer:
+				new_ringbuffer = max(ringbuffer // 2, self.min_ringbuffer, self.default_ringbuffer)
+
+		changes = {}
+		if new_threads != threads:
+			changes["hls_segment_threads"] = new_threads
+		if new_ringbuffer != ringbuffer:
+			changes["ringbuffer_size"] = new_ringbuffer
+		return changes
@@ -0,0 +1,71 @@
+import sys
+import time
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+
+class StallWatchdog(threading.Thread):
+	"""Detects stalls of the GUI thread's event loop from a thread of its own.
+
+	The GUI thread calls heartbeat() from a timer. When no heartbeat has come for longer than the
+	threshold, the GUI thread's Python stack is captured, and once the loop runs again the stall is
+	written to the diagnostics log with its duration and the stack."""
+
+	def __init__(self, log_path, threshold=0.5, check_interval=0.05):
+		super().__init__(daemon=True)
+		self.log_path = log_path
+		self.threshold = threshold			# In seconds
+		self.check_interval = check_interval
+		self.gui_thread_id = threading.current_thread().ident	# Must be created in the GUI thread
+		self.last_heartbeat = time.monotonic()
+		self.stalls = deque()		# Durations of the finished stalls, for the GUI thread to report
+		self.keep_running = True
+
+	def heartbeat(self):
+		self.last_heartbeat = time.monotonic()
+
+	def pop_stalls(self):
+		"""Returns the durations in seconds of the stalls recorded since the last call. Call from the GUI thread."""
+		stalls = []
+		while self.stalls:
+			stalls.append(self.stalls.popleft())
+		return stalls
+
+	def stop(self):
+		self.keep_running = False
+
+	def capture_stack(self):
+		frame = sys._current_frames().get(self.gui_thread_id)
+		if frame is None:
+			return []
+		try:
+			return traceback.format_stack(frame)
+		finally:
+			frame = None
+
+	def run(self):
+		stall_started = None
+		stack = None
+		while self.keep_running:
+			time.sleep(self.check_interval)
+			last_heartbeat = self.last_heartbeat
+			if stall_started is None:
+				if time.monotonic() - last_heartbeat > self.threshold:
+					# The stack is captured while the loop is still stuck, showing the handler that blocks it
+					stall_started = last_heartbeat
+					stack = self.capture_stack()
+			elif last_heartbeat > stall_started:
+				duration = last_heartbeat - stall_started
+				self.write_stall(duration, stack)
+				self.stalls.append(duration)
+				stall_started = stack = None
+
+	def write_stall(self, duration, stack):
+		try:
+			with open(self.log_path, "a", encoding="utf-8") as f:
+				f.write("[{}] GUI event loop stalled for {:.0f} ms; the GUI thread was at:\n".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), duration * 1000))
+				f.write("".join(stack) if stack else "  (stack not available)\n")
+				f.write("\n")
+		except OSError:
+			pass
@@ -1,27 +1,92 @@
+import re
 import sys
+import time
 import traceback
 import subprocess
 import platform
+import threading
+from collections import deque, OrderedDict
 
 from PyQt5 import QtCore
 
+from .quality import measure_throughput
+from .output import read_lines
+
 class MessageEvent(object):
 	def __init__(self, message, add_newline=False, add_timestamp=False):
 		self.message = message
 		self.add_newline = add_newline
 		self.add_timestamp = add_timestamp
 
+class MetricEvent(object):
+	__slots__ = ("name", "value")
+
+	def __init__(self, name, value=None):
+		self.name = name
+		self.value = value
+
+class LineClassifier(object):
+	"""Turns livestreamer's progress and segment output into metric events.
+
+	The progress is only written when livestreamer writes the stream to a file; the throughput of
+	watching is sampled from the process's I/O instead (see SessionResourceSampler.read_rate)."""
+
+	SEGMENT_QUEUED = re.compile(rb"Adding segment (\d+) to queue")
+	SEGMENT_COMPLETE = re.compile(rb"Download of segment (\d+) complete")
+	PROGRESS = re.compile(rb"Written [\d.]+ [KMGT]?B \(.*?@ ([\d.]+) ([KMGT]?)B/s\)")
+	UNDERRUN = re.compile(rb"Failed to reload playlist|Failed to open segment|Skipping segment|Read timeout|underrun", re.IGNORECASE)
+	PLAYER_STARTED = re.compile(rb"Starting player:|Starting server, access with")
+	DEBUG = re.compile(rb"\]\[debug\]")
+
+	UNITS = {b"": 1, b"K": 1024, b"M": 1024 ** 2, b"G": 1024 ** 3, b"T": 1024 ** 4}
+
+	max_queued_segments = 100	# Segments that are never completed (e.g. skipped ones) are forgotten beyond this
+
+	def __init__(self):
+		self.queued_segments = OrderedDict()	# Segment number => time.monotonic() when it was queued
+
+	def classify(self, line):
+		"""Returns a tuple (metric event or None, whether the line should still be shown as text)."""
+		match = self.SEGMENT_QUEUED.search(line)
+		if match is not None:
+			self.queued_segments[match.group(1)] = time.monotonic()
+			if len(self.queued_segments) > self.max_queued_segments:
+				self.queued_segments.popitem(last=False)
+			return None, False
+		match = self.SEGMENT_COMPLETE.search(line)
+		if match is not None:
+			queued = self.queued_segments.pop(match.group(1), None)
+			if queued is None:
+				return None, False
+			return MetricEvent("segment-latency", time.monotonic() - queued), False
+		match = self.PROGRESS.search(line)
+		if match is not None:
+			return MetricEvent("throughput", float(match.group(1)) * self.UNITS[match.group(2)]), False
+		if self.UNDERRUN.search(line) is not None:
+			return MetricEvent("underrun"), True
+		if self.PLAYER_STARTED.search(line) is not None:
+			return MetricEvent("player-started"), True
+		return None, self.DEBUG.search(line) is None
+
 class LivestreamerWorker(QtCore.QThread):
 	"""This thread will keep the GUI responsive and make the subprocess handling correct."""
 
 	keep_running = True
 	process = None
+	exit_code = None	# The exit code of the process, once it has ended
+	program_name = "Livestreamer"
+	output_prefix = "(livestreamer) "
 	statusMessage = QtCore.pyqtSignal(object)
+	metricMessage = QtCore.pyqtSignal(object)
 
-	def __init__(self, command, verbose=True):
+	def __init__(self, command, verbose=True, collect_metrics=False):
 		super().__init__()
 		self.command = command	# The list with commands
 		self.verbose = verbose
+		# With metrics collection, the command must make livestreamer log at debug level; the
+		# classified lines are sent as metric events and the rest of the debug output is dropped
+		self.classifier = LineClassifier() if collect_metrics else None
+		self.recent_lines = deque(maxlen=50)	# The last lines of output, for telling how the session ended
 
 	def term_process(self):
 		if self.process is not None:
@@ -31,39 +96,293 @@ class LivestreamerWorker(QtCore.QThread):
 		msg = MessageEvent(message, add_newline, add_timestamp)
 		self.statusMessage.emit(msg)
 
+	def send_metric(self, name, value=None):
+		self.metricMessage.emit(MetricEvent(name, value))
+
+	def handle_line(self, line):
+		"""Classifies a line of livestreamer output. Returns True if it was shown as text."""
+		self.recent_lines.append(line)
+		if self.classifier is not None:
+			event, show = self.classifier.classify(line)
+			if event is not None:
+				self.metricMessage.emit(event)
+			if not show:
+				return False
+		elif LineClassifier.PLAYER_STARTED.search(line) is not None:
+			# The start of the player is reported even without metrics collection
+			self.metricMessage.emit(MetricEvent("player-started"))
+		self.send_message(self.output_prefix, False)
+		self.send_message(line.decode("utf-8", "replace"), False, False)
+		return True
+
+	def get_startup_info(self):
+		# Specify the startup info to hide the console of the subprocess on Windows
+		if platform.system() == "Windows":
+			startup_info = subprocess.STARTUPINFO()
+			startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
+		else:
+			startup_info = None
+		return startup_info
+
 	def run(self):
 		try:
 			if self.verbose:
 				self.send_message("Running command: {}".format(' '.join(self.command)))
 
-			# Specify the startup info to hide the console of the subprocess on Windows
-			if platform.system() == "Windows":
-				startup_info = subprocess.STARTUPINFO()
-				startup_info.dwFlags = subprocess.STARTF_USESTDHANDLES | subprocess.STARTF_USESHOWWINDOW
-			else:
-				startup_info = None
-
 			try:
-				self.process = subprocess.Popen(self.command, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, startupinfo=startup_info)
+				self.process = subprocess.Popen(self.command, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, startupinfo=self.get_startup_info())
 			except Exception as e:
 				self.keep_running = False
-				self.send_message("Failed to run Livestreamer; {}".format(str(e)))
+				self.send_message("Failed to run {}; {}".format(self.program_name, str(e)))
 
+			lines = read_lines(self.process.stdout) if self.process is not None else iter(())
 			while self.keep_running:
-				line = self.process.stdout.readline()
-				if line == b'' and self.process.poll() is None:
+				line = next(lines, b'')
+				if line == b'':
 					break
-				elif self.process.poll() is not None:
-					self.keep_running = False
-					continue
-				self.send_message("(livestreamer) ", False)
-				self.send_message(line.decode("utf-8"), False, False)
-				QtCore.QThread.msleep(100)
+				if self.handle_line(line):
+					QtCore.QThread.msleep(100)
+			if self.process is not None:
+				# The output can be closed a moment before the process exits, so its exit code is waited for
+				self.exit_code = self.process.wait()
 		except Exception:
 			t, val, tb = sys.exc_info()
 			self.send_message(''.join(traceback.format_exception(t, val, tb)))
 			t = val = tb = None
 		self.process = None
+		if self.verbose:
+			self.send_message("{} thread ended gracefully.".format(self.program_name))
+		self.quit()
+
+
+class LivestreamerRecordingWorker(LivestreamerWorker):
+	"""Runs livestreamer with the stream written to stdout, which is then recorded and optionally fed to a player."""
+
+	player_process = None
+
+	def __init__(self, command, recorder, player_command=None, verbose=True, collect_metrics=False):
+		super().__init__(command, verbose, collect_metrics)
+		self.recorder = recorder
+		self.player_command = player_command
+		if self.recorder.report is None:
+			self.recorder.report = self.send_message
+		if self.recorder.metric is None:
+			self.recorder.metric = self.send_metric
+
+	def term_process(self):
+		self.recorder.stop()
+		super().term_process()
+		if self.player_process is not None:
+			self.player_process.terminate()
+
+	def forward_log_lines(self, stream):
+		# Livestreamer logs to stderr when the stream itself goes to stdout
+		for line in read_lines(stream):
+			self.handle_line(line)
+
+	def run(self):
+		try:
+			if self.verbose:
+				self.send_message("Running command: {}".format(' '.join(self.command)))
+
+			startup_info = self.get_startup_info()
+			try:
+				self.process = subprocess.Popen(self.command, shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startup_info)
+			except Exception as e:
+				self.keep_running = False
+				self.send_message("Failed to run Livestreamer; {}".format(str(e)))
+
+			if self.keep_running:
+				log_thread = threading.Thread(target=self.forward_log_lines, args=(self.process.stderr,), daemon=True)
+				log_thread.start()
+
+				tee = None
+				if self.player_command is not None:
+					if self.verbose:
+						self.send_message("Running player: {}".format(' '.join(self.player_command)))
+					try:
+						self.player_process = subprocess.Popen(self.player_command, shell=False, stdin=subprocess.PIPE, bufsize=0, startupinfo=startup_info)
+						tee = self.player_process.stdin
+					except Exception as e:
+						self.send_message("Failed to run the player, recording only; {}".format(str(e)))
+
+				self.recorder.copy(self.process.stdout, tee)
+
+				self.keep_running = False
+				if self.player_process is not None:
+					try:
+						self.player_process.stdin.close()
+					except OSError:
+						pass
+				self.exit_code = self.process.wait()
+				log_thread.join(1)
+		except Exception:
+			t, val, tb = sys.exc_info()
+			self.send_message(''.join(traceback.format_exception(t, val, tb)))
+			t = val = tb = None
+		self.process = None
+		self.player_process = None
 		if self.verbose:
 			self.send_message("Livestreamer thread ended gracefully.")
 		self.quit()
+
+
+class LogSearchWorker(QtCore.QThread):
+	"""Searches the session logs in the background and hands the matches over in batches."""
+
+	batch_size = 200
+	results = QtCore.pyqtSignal(object)
+
+	def __init__(self, searcher, text, max_results, ignore_case=True):
+		super().__init__()
+		self.searcher = searcher
+		self.text = text
+		self.max_results = max_results
+		self.ignore_case = ignore_case
+		self.keep_running = True
+
+	def run(self):
+		batch = []
+		for match in self.searcher.search(self.text, self.max_results, self.ignore_case):
+			if not self.keep_running:
+				break
+			batch.append(match)
+			if len(batch) >= self.batch_size:
+				self.results.emit(batch)
+				batch = []
+		if batch:
+			self.results.emit(batch)
+		self.quit()
+
+
+class StreamUrlWorker(LivestreamerWorker):
+	"""Resolves the stream's URL with livestreamer, without playing it."""
+
+	resolved = QtCore.pyqtSignal(object)	# The URL, or None if it couldn't be resolved
+	url_timeout = 30						# How long resolving the URL can take in seconds
+
+	def resolve_url(self):
+		self.process = subprocess.Popen(self.command, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, startupinfo=self.get_startup_info())
+		try:
+			output, _ = self.process.communicate(timeout=self.url_timeout)
+		except subprocess.TimeoutExpired:
+			self.process.kill()
+			raise
+		finally:
+			process, self.process = self.process, None
+		lines = output.decode("utf-8", "replace").strip().splitlines()
+		if process.returncode != 0 or not lines or not lines[-1].startswith("http"):
+			raise ValueError(lines[-1] if lines else "livestreamer exited with code {}".format(process.returncode))
+		return lines[-1]
+
+	def run(self):
+		url = None
+		try:
+			url = self.resolve_url()
+		except Exception as e:
+			self.send_message("Resolving the stream URL failed; {}".format(str(e)))
+		self.resolved.emit(url)
+		self.quit()
+
+
+class ThroughputProbeWorker(StreamUrlWorker):
+	"""Resolves the stream's URL with livestreamer and measures the throughput by fetching a segment of it."""
+
+	measured = QtCore.pyqtSignal(object)	# Bytes per second, or None if the measurement failed
+
+	def run(self):
+		throughput = None
+		try:
+			throughput = measure_throughput(self.resolve_url())
+		except Exception as e:
+			self.send_message("Throughput test failed; {}".format(str(e)))
+		self.measured.emit(throughput)
+		self.quit()
+
+
+class StandbyWorker(LivestreamerWorker):
+	"""Runs livestreamer as a local HTTP server ahead of time, so switching to the channel only needs a player."""
+
+	player_process = None
+
+	def attach_player(self, player_command):
+		if self.verbose:
+			self.send_message("Running player: {}".format(' '.join(player_command)))
+		self.player_process = subprocess.Popen(player_command, shell=False, startupinfo=self.get_startup_info())
+		threading.Thread(target=self.wait_for_player, daemon=True).start()
+
+	def wait_for_player(self):
+		# The HTTP server would keep running without a player, so the session ends with the player
+		self.player_process.wait()
+		self.term_process()
+
+	def term_process(self):
+		super().term_process()
+		if self.player_process is not None and self.player_process.poll() is None:
+			self.player_process.terminate()
+
+
+class PlayerWorker(LivestreamerWorker):
+	"""Runs only the player, for streams livestreamer isn't needed to play, such as the local proxy's."""
+
+	program_name = "Player"
+	output_prefix = "(player) "
+
+
+class SupervisedWorker(LivestreamerWorker):
+	"""Runs livestreamer in the session supervisor, which keeps it running when the GUI is closed.
+
+	The worker either starts a session or attaches to one started by an earlier run of the GUI, and
+	polls the supervisor for the session's output. detach() ends the worker without ending the session."""
+
+	poll_interval = 200		# In milliseconds
+
+	def __init__(self, client, command, info=None, session_id=None, verbose=True, collect_metrics=False):
+		super().__init__(command, verbose, collect_metrics)
+		self.client = client
+		self.info = info
+		self.session_id = session_id
+		self.next_line = 0
+		self.detached = False
+
+	def term_process(self):
+		if self.session_id is not None:
+			try:
+				self.client.request("stop", id=self.session_id)
+			except Exception:
+				pass
+
+	def detach(self):
+		self.detached = True
+		self.keep_running = False
+
+	def run(self):
+		try:
+			if self.session_id is None:
+				if self.verbose:
+					self.send_message("Running command in the session supervisor: {}".format(' '.join(self.command)))
+				try:
+					self.session_id = self.client.request("start", arguments=self.command, info=self.info)["id"]
+				except Exception as e:
+					self.keep_running = False
+					self.send_message("Failed to run {}; {}".format(self.program_name, str(e)))
+			elif self.verbose:
+				self.send_message("Reattached to the session of the supervisor.")
+
+			while self.keep_running:
+				response = self.client.request("lines", id=self.session_id, since=self.next_line)
+				for number, line in response["lines"]:
+					self.next_line = number + 1
+					self.handle_line(line)
+				if not response["running"]:
+					self.exit_code = response["exit_code"]
+					self.client.request("forget", id=self.session_id)
+					break
+				QtCore.QThread.msleep(self.poll_interval)
+		except Exception:
+			t, val, tb = sys.exc_info()
+			self.send_message(''.join(traceback.format_exception(t, val, tb)))
+			t = val = tb = None
+		if self.verbose and not self.detached:
+			self.send_message("{} thread ended gracefully.".format(self.program_name))
+		self.quit()
@@ -0,0 +1,116 @@
+import gc
+import time
+import unittest
+import threading
+from collections import Counter
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from lsgui_lib.aio import EventLoopThread
+from lsgui_lib.hls_proxy import HLSProxy
+
+PLAYLIST = b"#EXTM3U\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:7\n#EXTINF:2.0,\n7.ts\n#EXTINF:2.0,\n8.ts\n#EXTINF:2.0,\n9.ts\n"
+
+
+class FakeOriginServer(ThreadingMixIn, HTTPServer):
+	"""Serves a live HLS media playlist whose segments are slow to download, and counts the requests of each path."""
+
+	daemon_threads = True
+
+	def __init__(self, missing=()):
+		super().__init__(("127.0.0.1", 0), FakeOriginHandler)
+		self.missing = set(missing)	# Segments that are answered with 404
+		self.requests = Counter()
+		self.lock = threading.Lock()
+
+	def get_url(self, path):
+		return "http://127.0.0.1:{}{}".format(self.server_address[1], path)
+
+
+class FakeOriginHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		with self.server.lock:
+			self.server.requests[self.path] += 1
+		if self.path == "/live/index.m3u8":
+			body = PLAYLIST
+		elif self.path.endswith(".ts") and self.path not in self.server.missing:
+			# Slow enough for the clients to ask for the segment while it's still being fetched
+			time.sleep(0.2)
+			body = self.path.encode("ascii") * 1000
+		else:
+			self.send_error(404)
+			return
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class HLSProxyTest(unittest.TestCase):
+
+	def start(self, missing=()):
+		self.origin = FakeOriginServer(missing)
+		threading.Thread(target=self.origin.serve_forever, daemon=True).start()
+		self.loop_thread = EventLoopThread()
+		self.loop_thread.start()
+		self.loop_errors = []
+		self.loop_thread.loop.set_exception_handler(lambda loop, context: self.loop_errors.append(context))
+		self.proxy = HLSProxy(self.loop_thread)
+		self.proxy.start()
+		self.proxy.add_feed("chan", self.origin.get_url("/live/index.m3u8"))
+
+	def tearDown(self):
+		self.proxy.stop()
+		self.loop_thread.stop()
+		self.origin.shutdown()
+		self.origin.server_close()
+
+	def play(self, results):
+		"""Fetches the proxy's playlist and all the segments in it, like a player."""
+		playlist_url = self.proxy.get_url("chan")
+		with urlopen(playlist_url, timeout=5) as response:
+			playlist = response.read().decode("utf-8")
+		for line in playlist.splitlines():
+			if line and not line.startswith("#"):
+				with urlopen(playlist_url.replace("playlist.m3u8", line), timeout=5) as response:
+					results.append((line, response.read()))
+
+	def test_segments_are_fetched_once_for_all_clients(self):
+		self.start()
+		results = [[], []]
+		clients = [threading.Thread(target=self.play, args=(result,)) for result in results]
+		for client in clients:
+			client.start()
+		for client in clients:
+			client.join(10)
+		self.assertEqual(results[0], results[1])
+		self.assertEqual([path for path, data in results[0]], ["segment/7.ts", "segment/8.ts", "segment/9.ts"])
+		self.assertEqual(results[0][0][1], b"/live/7.ts" * 1000)
+		self.assertEqual(self.origin.requests["/live/index.m3u8"], 1)
+		for segment in ("/live/7.ts", "/live/8.ts", "/live/9.ts"):
+			self.assertEqual(self.origin.requests[segment], 1)
+
+	def test_failed_prefetch_is_not_left_unretrieved(self):
+		self.start(missing=["/live/8.ts"])
+		with urlopen(self.proxy.get_url("chan"), timeout=5) as response:
+			response.read()
+		# Nobody asks for the segment that fails
+		time.sleep(0.5)
+		self.loop_thread.submit(self.collect_garbage()).result()
+		self.assertEqual(self.loop_errors, [])
+		with self.assertRaises(HTTPError) as error:
+			urlopen(self.proxy.get_url("chan").replace("playlist.m3u8", "segment/8.ts"), timeout=5)
+		self.assertEqual(error.exception.code, 502)
+
+	async def collect_garbage(self):
+		gc.collect()
+
+
+if __name__ == "__main__":
+	unittest.main()
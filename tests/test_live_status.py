@@ -0,0 +1,102 @@
+import json
+import time
+import unittest
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs
+
+from lsgui_lib.live_status import TwitchStatusProvider, LiveStatusError
+
+
+class FakeTwitchServer(ThreadingMixIn, HTTPServer):
+	"""Stands in for the streams endpoint of the Twitch API, and counts the requests and connections it gets."""
+
+	daemon_threads = True
+
+	def __init__(self, live):
+		super().__init__(("127.0.0.1", 0), FakeTwitchHandler)
+		self.live = set(live)
+		self.requests = []		# The logins of each request
+		self.connections = 0
+		self.status = 200
+
+	@property
+	def base_url(self):
+		return "http://127.0.0.1:{}/helix".format(self.server_address[1])
+
+
+class FakeTwitchHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"	# Keep-alive
+
+	def setup(self):
+		self.server.connections += 1
+		super().setup()
+
+	def do_GET(self):
+		url = urlsplit(self.path)
+		logins = parse_qs(url.query).get("user_login", [])
+		self.server.requests.append(logins)
+		if url.path != "/helix/streams":
+			self.send_error(404)
+			return
+		if self.server.status != 200:
+			self.send_error(self.server.status)
+			return
+		body = json.dumps({"data": [{"user_login": login, "type": "live"} for login in logins if login in self.server.live]}).encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class TwitchStatusProviderTest(unittest.TestCase):
+
+	def setUp(self):
+		self.server = FakeTwitchServer(["c7", "c120"])
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.provider = TwitchStatusProvider(self.server.base_url, "client", "token", ttl=60)
+
+	def tearDown(self):
+		self.provider.close()
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_channels_are_looked_up_in_chunks(self):
+		logins = ["c{}".format(i) for i in range(250)]
+		status = self.provider.get_live_status(logins)
+		self.assertEqual([len(logins) for logins in self.server.requests], [100, 100, 50])
+		self.assertEqual({login for login, live in status.items() if live}, {"c7", "c120"})
+
+	def test_requests_reuse_the_connection(self):
+		self.provider.get_live_status(["c{}".format(i) for i in range(250)])
+		self.provider.forget(["c7"])
+		self.assertTrue(self.provider.is_live("c7"))
+		self.assertEqual(len(self.server.requests), 4)
+		self.assertEqual(self.server.connections, 1)
+
+	def test_answers_are_cached_until_the_ttl_expires(self):
+		self.provider.ttl = 0.2
+		self.assertTrue(self.provider.is_live("c7", ["c8"]))
+		self.assertFalse(self.provider.is_live("c8"))
+		self.assertEqual(len(self.server.requests), 1)
+		time.sleep(0.3)
+		self.assertFalse(self.provider.is_live("c8"))
+		self.assertEqual(len(self.server.requests), 2)
+
+	def test_errors_are_raised(self):
+		self.server.status = 401
+		with self.assertRaises(LiveStatusError):
+			self.provider.is_live("c7")
+
+	def test_invalid_url_is_rejected(self):
+		with self.assertRaises(ValueError):
+			TwitchStatusProvider("ftp://example.com")
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,25 @@
+import io
+import unittest
+
+from lsgui_lib.output import read_lines
+
+
+class ReadLinesTest(unittest.TestCase):
+
+	def read(self, data, size=4096):
+		return list(read_lines(io.BytesIO(data), size))
+
+	def test_carriage_returns_end_lines(self):
+		data = b"[cli][info] Writing stream to output\r\nWritten 1.0 MB (1s @ 1.0 MB/s)\rWritten 2.0 MB (2s @ 1.0 MB/s)\r\nStream ended\n"
+		expected = [b"[cli][info] Writing stream to output\n", b"Written 1.0 MB (1s @ 1.0 MB/s)\n", b"Written 2.0 MB (2s @ 1.0 MB/s)\n", b"Stream ended\n"]
+		self.assertEqual(self.read(data), expected)
+		# A line end split between two reads ends only one line
+		self.assertEqual(self.read(data, 3), expected)
+
+	def test_last_line_without_end(self):
+		self.assertEqual(self.read(b"one\n\ntwo"), [b"one\n", b"two"])
+		self.assertEqual(self.read(b""), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
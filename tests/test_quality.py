@@ -0,0 +1,105 @@
+import unittest
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from lsgui_lib.quality import measure_throughput, choose_quality, lower_quality
+
+
+class FakeOriginServer(ThreadingMixIn, HTTPServer):
+	"""Serves HLS playlists and segments from a dict of paths, and records the paths requested."""
+
+	daemon_threads = True
+
+	def __init__(self, files):
+		super().__init__(("127.0.0.1", 0), FakeOriginHandler)
+		self.files = files
+		self.requests = []
+
+	def get_url(self, path):
+		return "http://127.0.0.1:{}{}".format(self.server_address[1], path)
+
+
+class FakeOriginHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		self.server.requests.append(self.path)
+		body = self.server.files.get(self.path)
+		if body is None:
+			self.send_error(404)
+			return
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class MeasureThroughputTest(unittest.TestCase):
+
+	def setUp(self):
+		self.server = FakeOriginServer({
+			"/master.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=400000\nlow/index.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=6000000\nsource/index.m3u8\n",
+			"/low/index.m3u8": b"#EXTM3U\n#EXT-X-TARGETDURATION:2\n#EXTINF:2.0,\n1.ts\n#EXTINF:2.0,\n2.ts\n",
+			"/low/2.ts": b"\x47" * 300000,
+			"/empty.m3u8": b"#EXTM3U\n#EXT-X-TARGETDURATION:2\n",
+			"/loop.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nloop.m3u8\n",
+		})
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_playlists_are_followed_to_the_newest_segment(self):
+		self.assertGreater(measure_throughput(self.server.get_url("/master.m3u8")), 0)
+		self.assertEqual(self.server.requests, ["/master.m3u8", "/low/index.m3u8", "/low/2.ts"])
+
+	def test_download_is_limited(self):
+		self.assertGreater(measure_throughput(self.server.get_url("/low/2.ts"), max_bytes=1000, chunk_size=100), 0)
+
+	def test_broken_playlists_are_errors(self):
+		with self.assertRaises(ValueError):
+			measure_throughput(self.server.get_url("/empty.m3u8"))
+		with self.assertRaises(ValueError):
+			measure_throughput(self.server.get_url("/loop.m3u8"))
+		with self.assertRaises(OSError):
+			measure_throughput(self.server.get_url("/missing.m3u8"))
+
+
+class ChooseQualityTest(unittest.TestCase):
+
+	QUALITIES = ["audio", "best", "high", "low", "medium", "mobile", "source", "worst"]
+
+	def test_highest_quality_within_the_throughput(self):
+		# 3 Mbit/s with 1.5x headroom needs 562500 bytes/s
+		self.assertEqual(choose_quality(self.QUALITIES, 562500, 1.5), "high")
+		self.assertEqual(choose_quality(self.QUALITIES, 562499, 1.5), "medium")
+		self.assertEqual(choose_quality(self.QUALITIES, 10 ** 7, 1.5), "source")
+
+	def test_lowest_quality_if_nothing_fits(self):
+		self.assertEqual(choose_quality(self.QUALITIES, 1, 1.5), "mobile")
+		self.assertEqual(choose_quality(["audio", "best"], 1, 1.5), "audio")
+
+	def test_resolution_names(self):
+		self.assertEqual(choose_quality(["360p", "720p", "720p60", "1080p60"], 600000, 1.5), "720p")
+
+	def test_unknown_names_fall_back_to_best(self):
+		self.assertEqual(choose_quality(["best", "worst", "hd"], 10 ** 7), "best")
+		self.assertIsNone(choose_quality(["hd"], 10 ** 7))
+
+
+class LowerQualityTest(unittest.TestCase):
+
+	def test_one_step_down(self):
+		qualities = ["audio", "high", "low", "medium", "mobile", "source"]
+		self.assertEqual(lower_quality(qualities, "source"), "high")
+		self.assertEqual(lower_quality(qualities, "low"), "mobile")
+		self.assertIsNone(lower_quality(qualities, "mobile"))
+		self.assertIsNone(lower_quality(qualities, "best"))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from lsgui_lib.reconnect import ReconnectPolicy, classify_exit
+
+
+class ClassifyExitTest(unittest.TestCase):
+
+	def test_user_stops(self):
+		self.assertEqual(classify_exit(1, [b"[cli][info] Player closed"]), "stopped")
+		self.assertEqual(classify_exit(130, [b"Interrupted! Exiting..."]), "stopped")
+		self.assertEqual(classify_exit(1, [b"[cli][error] Read timeout"], stop_requested=True), "stopped")
+
+	def test_errors_are_drops(self):
+		self.assertEqual(classify_exit(1, []), "dropped")
+		self.assertEqual(classify_exit(0, [b"[cli][error] Error when reading from stream: Read timeout"]), "dropped")
+		self.assertEqual(classify_exit(0, [b"[stream.hls][error] Failed to reload playlist"]), "dropped")
+
+	def test_errors_without_exit_code_are_drops(self):
+		self.assertEqual(classify_exit(None, [b"[cli][error] Read timeout"]), "dropped")
+		self.assertEqual(classify_exit(None, [b"[cli][info] Opening stream: best (hls)"]), "finished")
+		self.assertEqual(classify_exit(None, []), "finished")
+
+	def test_stream_ended(self):
+		lines = [b"[cli][info] Stream ended"]
+		self.assertEqual(classify_exit(0, lines), "finished")
+		self.assertEqual(classify_exit(0, lines, uptime=5, stable_time=120), "dropped")
+		self.assertEqual(classify_exit(0, lines, uptime=600, stable_time=120), "finished")
+		self.assertEqual(classify_exit(1, lines, uptime=600, stable_time=120), "dropped")
+
+	def test_clean_exit_finished(self):
+		self.assertEqual(classify_exit(0, [b"[cli][info] Closing currently open stream..."]), "finished")
+
+
+class ReconnectPolicyTest(unittest.TestCase):
+
+	def test_delays_grow_exponentially_up_to_the_maximum(self):
+		policy = ReconnectPolicy(max_attempts=6, initial_delay=2, max_delay=20)
+		self.assertEqual([policy.get_delay(attempt) for attempt in range(1, 7)], [2, 4, 8, 16, 20, 20])
+
+	def test_budget_is_spent_after_max_attempts(self):
+		policy = ReconnectPolicy(max_attempts=2)
+		self.assertIsNotNone(policy.get_delay(2))
+		self.assertIsNone(policy.get_delay(3))
+
+	def test_no_attempts(self):
+		self.assertIsNone(ReconnectPolicy(max_attempts=0).get_delay(1))
+
+
+if __name__ == "__main__":
+	unittest.main()